@@ -1,42 +1,523 @@
 # Import necessary libraries
-import json
+import asyncio
+import functools
 import math
 import os
-import sys
 import time
-from datetime import datetime, timedelta
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 
 # Import fun libraries
 import numpy as np
-import pandas as pd
-import tulipy as ti
-import yfinance as yf  # I'll figure this out later
 
 # Importing API
 from alpaca.common.exceptions import APIError
-from alpaca.trading.models import OrderSide, OrderType, TimeInForce
-from alpaca.trading.requests import OrderRequest
-
+from alpaca.trading.models import OrderClass, OrderSide, OrderType, TimeInForce
+from alpaca.trading.requests import (
+    LimitOrderRequest,
+    OrderRequest,
+    ReplaceOrderRequest,
+    StopLossRequest,
+    TakeProfitRequest,
+)
+
+from barstore import BarStore, period_start, resample_bars
+from cache import BarCache, interval_seconds, next_bar_close
+from checkpoint import CLOSED_ORDER_STATUSES, CheckpointStore
+from datasource import AlpacaSource, YFinanceSource, empty_bars
+from indicators import IndicatorEngine
 from logger import *
+from metrics import CallbackCounter, registry, timed
+from positions import PositionCache
+from resilience import Resilience, RetryPolicy, retry
+from ringbuffer import BarRings
+from settings import config
+from signals import (
+    RSI,
+    Price,
+    SignalEvaluator,
+    Stochastic,
+    emas,
+    filter_rules,
+    trend_rules,
+)
+
+
+def wait_policy(attempts, sleep_time):
+    """
+    Get a RetryPolicy for waiting on the broker, backing off up to sleep_time
+    between attempts and giving up after the attempts * sleep_time that fixed
+    waits would take.
+    """
+    return RetryPolicy(
+        attempts=attempts,
+        base_delay=config["retryBaseDelay"],
+        max_delay=sleep_time,
+        budget=attempts * sleep_time,
+    )
+
+
+def fetch_start(interval, since, now):
+    """
+    Get where a download resuming after the newest stored bar should start.
+
+    Args:
+        interval (str): The time interval for data aggregation.
+        since (int): The newest stored bar time, or None if nothing is stored.
+        now (float): The current UNIX timestamp.
+
+    Returns:
+        datetime: The start, or None to download the whole period.
+    """
+    # Intraday history only goes back 60 days, download the period instead
+    if since is None or (
+        interval_seconds(interval) < 86400 and now - since > 59 * 86400
+    ):
+        return None
+    return datetime.fromtimestamp(since, tz=timezone.utc)
+
+
+def load_stored_bars(ticker, interval, period, start=None):
+    """
+    Load bars from the local bar store, downloading only the missing tail.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        interval (str): The time interval for data aggregation.
+        period (str): The period for which to retrieve data.
+        start (int, optional): Return the bars from this UNIX time on only.
+            Defaults to the start of the period.
+
+    Returns:
+        dict: OHLCV arrays covering the period, including the bar being built.
+    """
+    now = time.time()
+    start = period_start(period, now) if start is None else start
+
+    def fetch(since):
+        start = fetch_start(interval, since, now)
+        return get_resilience().call(
+            "data.bars", get_data_source().bars, ticker, interval, period, start=start
+        )
+
+    return get_bar_store().sync(ticker, interval, fetch, start=start, now=now)
+
+
+def load_last_price(ticker):
+    """
+    Get the latest traded price of a ticker from the data source.
+
+    Returns:
+        float: The price, or None if the ticker has not traded today.
+    """
+    return get_resilience().call(
+        "data.last_price", get_data_source().last_price, ticker
+    )
+
+
+def keep_recent(ticker, interval, period, bars, complete_from=None):
+    """
+    Add loaded bars to the ring buffer of the ticker and interval.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        interval (str): The time interval for data aggregation.
+        period (str): The period the returned bars cover.
+        bars (dict): OHLCV arrays, oldest first.
+        complete_from (int, optional): The start the bars were loaded from, when
+            they hold the whole period (see BarRing.extend).
+
+    Returns:
+        Bars: A copy of the buffered bars within the period, safe to cache as
+            later loads for any period do not change it.
+    """
+    ring = get_bar_rings().get(ticker, interval)
+    ring.extend(bars, complete_from=complete_from)
+    return ring.snapshot(since=period_start(period, time.time()))
+
+
+def is_resampled(interval):
+    """
+    Tell if bars of an interval are built from the baseInterval bars instead
+    of being downloaded.
+    """
+    return (
+        interval in config["resampledIntervals"] and interval != config["baseInterval"]
+    )
+
+
+def load_recent_bars(ticker, interval, period):
+    """
+    Same as load_stored_bars, through the ticker's ring buffer: once it holds
+    the whole period, only the bars from the newest buffered one on are read
+    from the store.
+
+    Intervals in resampledIntervals are built locally from the baseInterval
+    bars the filters already read, only from the start of the last buffered
+    bar, so every bar costs a single download.
+    """
+    ring = get_bar_rings().get(ticker, interval)
+    start = period_start(period, time.time())
+    covered = ring.covers(start)
+
+    if not is_resampled(interval):
+        if covered:
+            tail = load_stored_bars(ticker, interval, period, start=ring.last_time())
+            return keep_recent(ticker, interval, period, tail)
+        bars = load_stored_bars(ticker, interval, period, start=start)
+        return keep_recent(ticker, interval, period, bars, complete_from=start)
+
+    base_interval = config["baseInterval"]
+    last = ring.last_time()
+
+    # The base bars the filters read, shared through the bar cache
+    base = get_bar_cache().get(ticker, base_interval, "1d")
+    if not covered or not len(base.time) or base.time[0] > last:
+        # Not the whole period buffered yet, or older than the cached base bars go
+        base = load_stored_bars(ticker, base_interval, period, start=start)
+        return keep_recent(
+            ticker, interval, period, resample_bars(base, interval), complete_from=start
+        )
+
+    first = np.searchsorted(base.time, last, side="left")
+    base = {field: values[first:] for field, values in base._asdict().items()}
+    return keep_recent(ticker, interval, period, resample_bars(base, interval))
+
+
+def load_stored_bars_many(tickers, interval, period):
+    """
+    Load bars of many tickers from the local bar store, downloading the missing
+    tails in batched requests.
+
+    Tickers are grouped by where their download has to start (the whole period
+    or the oldest newest-stored bar) and every group is downloaded in chunks of
+    downloadBatchSize tickers, one request per chunk.
+
+    Args:
+        tickers (list): The stock ticker symbols.
+        interval (str): The time interval for data aggregation.
+        period (str): The period for which to retrieve data.
+
+    Returns:
+        dict: Ticker -> OHLCV arrays like load_stored_bars.
+    """
+    now = time.time()
+    store = get_bar_store()
+
+    # Tickers with nothing usable stored need the whole period
+    starts = {
+        ticker: fetch_start(interval, store.last_time(ticker, interval), now)
+        for ticker in tickers
+    }
+    full = [ticker for ticker, start in starts.items() if start is None]
+    tails = [ticker for ticker, start in starts.items() if start is not None]
+    groups = (
+        (full, None),
+        (tails, min((starts[ticker] for ticker in tails), default=None)),
+    )
+
+    fetched = {}
+    source = get_data_source()
+    resilience = get_resilience()
+    size = config["downloadBatchSize"]
+    for group, start in groups:
+        for first in range(0, len(group), size):
+            fetched.update(
+                resilience.call(
+                    "data.bars_many",
+                    source.bars_many,
+                    group[first : first + size],
+                    interval,
+                    period,
+                    start,
+                )
+            )
+
+    # What a ticker the download had nothing for returns
+    empty = empty_bars()
+    return {
+        ticker: store.sync(
+            ticker,
+            interval,
+            lambda since, ticker=ticker: fetched.get(ticker, empty),
+            start=period_start(period, now),
+            now=now,
+        )
+        for ticker in tickers
+    }
+
+
+def load_bars_many(tickers, interval, period):
+    """
+    Same as load_stored_bars_many, building the resampledIntervals bars from
+    the baseInterval ones.
+    """
+    if not is_resampled(interval):
+        return load_stored_bars_many(tickers, interval, period)
+
+    return {
+        ticker: resample_bars(values, interval)
+        for ticker, values in load_stored_bars_many(
+            tickers, config["baseInterval"], period
+        ).items()
+    }
+
+
+def warm_up(tickers, requests=(("30m", "5d"), ("5m", "1d"))):
+    """
+    Load the bars every Trader starts with for many tickers at once and keep
+    them in the shared bar cache.
+
+    Args:
+        tickers (list): The stock ticker symbols.
+        requests (tuple, optional): The (interval, period) pairs to load.
+    """
+    cache = get_bar_cache()
+    for interval, period in requests:
+        started = time.perf_counter()
+        start = period_start(period, time.time())
+        bars = load_bars_many(tickers, interval, period)
+        for ticker, values in bars.items():
+            cache.put(
+                ticker,
+                interval,
+                period,
+                keep_recent(ticker, interval, period, values, complete_from=start),
+            )
+        logging.info(
+            f"Loaded {interval} bars of {len(bars)} tickers in {time.perf_counter() - started:.1f}s"
+        )
+
 
-# Open the JSON file for reading
-with open("config.json", "r") as f:
-    config = json.load(f)
+@functools.lru_cache(maxsize=None)
+def get_resilience():
+    """
+    Retries and circuit breakers shared by every broker and data call.
+    """
+    return Resilience(
+        RetryPolicy(
+            attempts=config["retryAttempts"],
+            base_delay=config["retryBaseDelay"],
+            max_delay=config["retryMaxDelay"],
+            budget=config["retryBudget"],
+        ),
+        failures=config["breakerFailures"],
+        reset_time=config["breakerResetTime"],
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_data_source():
+    """
+    Where bars are downloaded from, config["dataSource"] being 'alpaca' or 'yfinance'.
+
+    Alpaca needs the API keys, without them bars come from yfinance.
+    """
+    if config["dataSource"] == "alpaca":
+        if config["API_KEY"] and config["SECRET_KEY"]:
+            return AlpacaSource(
+                config["API_KEY"],
+                config["SECRET_KEY"],
+                feed=config["alpacaDataFeed"],
+                pool_size=config["maxWorkers"],
+            )
+        logging.warning("No Alpaca API keys, downloading bars from yfinance")
+    return YFinanceSource()
+
+
+@functools.lru_cache(maxsize=None)
+def get_bar_store():
+    """
+    History kept on disk so restarts only download what is missing.
+    """
+    return BarStore(config["barStoreFolder"])
+
+
+@functools.lru_cache(maxsize=None)
+def get_checkpoint_store():
+    """
+    The trades and indicator state kept on disk so restarts resume them.
+    """
+    return CheckpointStore(config["checkpointFolder"])
+
+
+@functools.lru_cache(maxsize=None)
+def get_bar_rings():
+    """
+    The latest bars of every ticker and interval, in fixed-size buffers.
+    """
+    return BarRings(config["barBufferSize"])
+
+
+@functools.lru_cache(maxsize=None)
+def get_bar_cache():
+    """
+    Bars shared by every Trader so each download is reused until its bar closes.
+    """
+    bar_cache = BarCache(load_recent_bars, max_size=config["barCacheSize"])
+
+    registry.register(
+        CallbackCounter(
+            "pockettrader_bar_cache_hits_total",
+            "Bar reads served from the shared bar cache.",
+            lambda: bar_cache.hits,
+        )
+    )
+    registry.register(
+        CallbackCounter(
+            "pockettrader_bar_cache_misses_total",
+            "Bar reads that had to load bars.",
+            lambda: bar_cache.misses,
+        )
+    )
+    return bar_cache
+
+
+@functools.lru_cache(maxsize=None)
+def get_indicator_engine():
+    """
+    Indicator state shared by every Trader, updated one closed bar at a time.
+    """
+    return IndicatorEngine(
+        ema_periods=config["emaPeriods"],
+        rsi_period=config["rsiPeriod"],
+        stoch_periods=config["stochPeriods"],
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_trend_rules():
+    """
+    The general trend rules of signals with the configured periods.
+    """
+    return SignalEvaluator(trend_rules(config["emaPeriods"], "30m"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_filter_rules():
+    """
+    The confirmation filters of signals with the configured periods.
+    """
+    return SignalEvaluator(
+        filter_rules(
+            config["emaPeriods"], config["rsiPeriod"], config["stochPeriods"], "5m"
+        )
+    )
+
+
+def evaluate_rules(rules, interval, data, values):
+    """
+    Evaluate signal rules on the bars of one ticker.
+
+    The bars are one-column matrices and the indicators are not computed
+    again from them: their nodes take the readings of the indicator state.
+
+    Args:
+        rules (SignalEvaluator): Rules reading the interval's bars.
+        interval (str): The interval of the bars, e.g. '5m'.
+        data (Bars): The bars the indicator state was synced with.
+        values (IndicatorValues): The readings of the indicator state.
+
+    Returns:
+        dict: Name -> latest value of every rule.
+    """
+
+    def reading(value):
+        return np.array([[np.nan if value is None else value]])
+
+    known = dict(
+        zip(
+            emas(config["emaPeriods"], interval),
+            map(reading, (values.ema_fast, values.ema_mid, values.ema_slow)),
+        )
+    )
+    known[RSI(Price(interval, "close"), config["rsiPeriod"])] = reading(values.rsi)
+    known[Stochastic(interval, *config["stochPeriods"])] = (
+        reading(values.stoch_k),
+        reading(values.stoch_d),
+    )
+
+    bars = {
+        interval: {
+            field: np.asarray(column)[:, None]
+            for field, column in data._asdict().items()
+        }
+    }
+    return {name: value[0] for name, value in rules.evaluate(bars, known).items()}
+
+
+class FilterVerdict(
+    namedtuple(
+        "FilterVerdict",
+        ["instant_trend", "rsi", "stochastic", "values", "bar_time", "evaluated_at"],
+    )
+):
+    """
+    The confirmation filters evaluated together on one snapshot of bars.
+
+    Truthy when every filter passed. bar_time is the open time of the newest
+    bar read (UNIX seconds) and evaluated_at when the snapshot was evaluated.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.instant_trend and self.rsi and self.stochastic)
 
 
 class Trader:
-    def __init__(self, ticker, api):
+    def __init__(
+        self,
+        ticker,
+        api,
+        cache=None,
+        indicators=None,
+        price_monitor=None,
+        positions=None,
+        orders=None,
+        checkpoints=None,
+        last_price=load_last_price,
+        sleep=time.sleep,
+        clock=time.time,
+    ):
         """
         Initialize the Trader class with the given ticker and API key.
 
         Args:
             ticker (str): The ticker symbol for the stock.
             api: The API key to be used for trading.
+            cache (BarCache, optional): The bar cache to read from. Defaults to the shared one.
+            indicators (IndicatorEngine, optional): The indicator state. Defaults to the shared one.
+            price_monitor (PriceMonitor, optional): Streams prices for the position. Defaults to polling.
+            positions (PositionCache, optional): Shared position snapshots. Defaults to a new one.
+            orders (OrderTracker, optional): Trade update tracker for fills. Defaults to polling.
+            checkpoints (CheckpointStore, optional): Where trades are saved to resume them. Defaults to none.
+            last_price (callable, optional): Returns the latest traded price of a ticker. Defaults to the data source's.
+            sleep (callable, optional): Used for every wait. Defaults to time.sleep.
+            clock (callable, optional): Returns the current UNIX timestamp. Defaults to time.time.
         """
         logging.info(f"Trader initialized with ticker {ticker}")
         self.ticker = ticker
         self.api = api
+        self.cache = cache if cache is not None else get_bar_cache()
+        self.indicators = (
+            indicators if indicators is not None else get_indicator_engine()
+        )
+        self.price_monitor = price_monitor
+        self.last_price = last_price
+        self.sleep = sleep
+        self.clock = clock
+        self.positions = (
+            positions
+            if positions is not None
+            else PositionCache(api, ttl=config["positionCacheTTL"], clock=clock)
+        )
+        self.orders = orders
+        self.checkpoints = checkpoints
+        self.order_id = None
+        self.exit_legs = None  # 'stop_loss' and 'take_profit' order IDs
+        self.trade_orders = []  # IDs of the orders of the current trade
 
     def is_tradable(self, ticker):
         """
@@ -74,20 +555,17 @@ class Trader:
         Raises:
             ValueError: If an invalid trend is provided.
         """
-        try:
-            if trend == "long":
-                stop_loss = entry_price - (entry_price * config["stopLossMargin"])
-                logging.info(f"Stop loss set for long at {stop_loss:.2f}")
-                return stop_loss
-            elif trend == "short":
-                stop_loss = entry_price + (entry_price * config["stopLossMargin"])
-                logging.info(f"Stop loss set for short at {stop_loss:.2f}")
-                return stop_loss
-            else:
-                raise ValueError
-        except Exception as e:
-            logging.error(f"The trend value doesn't make sense: {trend}")
-            sys.exit()
+        if trend == "long":
+            stop_loss = entry_price - (entry_price * config["stopLossMargin"])
+            logging.info(f"Stop loss set for long at {stop_loss:.2f}")
+            return stop_loss
+        elif trend == "short":
+            stop_loss = entry_price + (entry_price * config["stopLossMargin"])
+            logging.info(f"Stop loss set for short at {stop_loss:.2f}")
+            return stop_loss
+
+        logging.error(f"The trend value doesn't make sense: {trend}")
+        raise ValueError(f"Trend must be 'long' or 'short', not {trend}")
 
     def set_takeprofit(self, entry_price, trend):
         """
@@ -103,24 +581,21 @@ class Trader:
         Raises:
             ValueError: If an invalid trend is provided.
         """
-        try:
-            if trend == "long":
-                take_profit = entry_price + (entry_price * config["takeProfitMargin"])
-                logging.info(f"Take profit set for long at {take_profit:.2f}")
-                return take_profit
-            elif trend == "short":
-                take_profit = entry_price - (entry_price * config["takeProfitMargin"])
-                logging.info(f"Take profit set for short at {take_profit:.2f}")
-                return take_profit
-            else:
-                raise ValueError
-        except Exception as e:
-            logging.error(f"The trend value doesn't make sense: {trend}")
-            sys.exit()
+        if trend == "long":
+            take_profit = entry_price + (entry_price * config["takeProfitMargin"])
+            logging.info(f"Take profit set for long at {take_profit:.2f}")
+            return take_profit
+        elif trend == "short":
+            take_profit = entry_price - (entry_price * config["takeProfitMargin"])
+            logging.info(f"Take profit set for short at {take_profit:.2f}")
+            return take_profit
+
+        logging.error(f"The trend value doesn't make sense: {trend}")
+        raise ValueError(f"Trend must be 'long' or 'short', not {trend}")
 
     def load_historical_data(self, ticker, interval, period):
         """
-        Load historical stock data.
+        Load historical stock data, reusing the cached bars when possible.
 
         Args:
             ticker (str): The stock ticker symbol.
@@ -128,20 +603,17 @@ class Trader:
             period (str): The period for which to retrieve data (e.g. '1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max').
 
         Returns:
-            DataFrame: A pandas DataFrame containing the historical stock data.
+            Bars: Views of the time and OHLCV arrays, oldest first.
 
         Raises:
-            Exception: If there is an error while loading historical data.
+            Exception: If the bars could not be downloaded, retries included.
         """
         try:
-            ticker_data = yf.Ticker(ticker)  # We can change this out for Alpaca API
-            historical_data = ticker_data.history(period=period, interval=interval)
+            return self.cache.get(ticker, interval, period)
         except Exception as e:
             logging.error("There are some issues with loading historical data")
             logging.error(e)
-            sys.exit()
-
-        return historical_data
+            raise
 
     def get_open_positions(self, asset_id):
         """
@@ -151,14 +623,35 @@ class Trader:
             asset_id (str): The asset's unique identifier.
 
         Returns:
-            bool: True if there is an open position for the asset, False otherwise.
+            bool: True if there is an open position for the asset, False if the
+                broker reports none.
+
+        Raises:
+            Exception: If the broker could not be reached, retries included, as
+                the position may still be open.
         """
-        try:
-            position = self.api.get_open_position(asset_id)
-            return True
-        except APIError as e:
-            logging.info(f"No open position found for {asset_id}: {e}")
+        if self.positions.get(asset_id) is None:
+            logging.info(f"No open position found for {asset_id}")
             return False
+        return True
+
+    def get_position(self, ticker):
+        """
+        Get the shared snapshot of an open position.
+
+        Args:
+            ticker (str): The asset's ticker symbol.
+
+        Returns:
+            PositionSnapshot: The current price, average entry price and quantity.
+
+        Raises:
+            Exception: If there is no open position for the ticker.
+        """
+        position = self.positions.get(ticker)
+        if position is None:
+            raise Exception(f"No open position found for {ticker}")
+        return position
 
     def submit_order(
         self, order_type, trend, ticker, shares_qty, current_price, exit=False
@@ -166,6 +659,11 @@ class Trader:
         """
         Submit an order for a given asset.
 
+        With config["bracketOrders"], a limit entry is sent as a bracket order:
+        its stop loss and take profit legs are set from the limit price, the
+        price the entry fills at or better, so they stay on the right side of
+        it, and wait at the broker once the entry fills (see amend_exit_legs).
+
         Args:
             order_type (str): The type of order (e.g., 'limit', 'market').
             trend (str): The trade direction ('long' or 'short').
@@ -196,22 +694,61 @@ class Trader:
             raise ValueError("Trend must be 'long' or 'short'")
 
         try:
-            order_data = OrderRequest(
-                symbol=ticker,
-                qty=shares_qty,
-                side=side,
-                type=order_type,
-                time_in_force=TimeInForce.GTC,
-            )
-
             if order_type == "limit":
                 logging.info(
                     f"Current price: {current_price:.2f} // Limit price: {limit_price:.2f}"
                 )
-                order_data.limit_price = limit_price
+                bracket = {}
+                if config["bracketOrders"] and not exit:
+                    bracket = dict(
+                        order_class=OrderClass.BRACKET,
+                        stop_loss=StopLossRequest(
+                            stop_price=round(self.set_stoploss(limit_price, trend), 2)
+                        ),
+                        take_profit=TakeProfitRequest(
+                            limit_price=round(
+                                self.set_takeprofit(limit_price, trend), 2
+                            )
+                        ),
+                    )
+                order_data = LimitOrderRequest(
+                    symbol=ticker,
+                    qty=shares_qty,
+                    side=side,
+                    type=order_type,
+                    time_in_force=TimeInForce.GTC,
+                    limit_price=limit_price,
+                    **bracket,
+                )
+            else:
+                order_data = OrderRequest(
+                    symbol=ticker,
+                    qty=shares_qty,
+                    side=side,
+                    type=order_type,
+                    time_in_force=TimeInForce.GTC,
+                )
 
             order = self.api.submit_order(order_data)
+            self.positions.invalidate(ticker)
             self.order_id = order.id
+            if not exit:
+                self.exit_legs = None
+            if getattr(order, "legs", None):
+                self.exit_legs = {
+                    (
+                        "stop_loss"
+                        if str(getattr(leg.type, "value", leg.type)).lower() == "stop"
+                        else "take_profit"
+                    ): str(leg.id)
+                    for leg in order.legs
+                }
+            self.trade_orders.append(str(order.id))
+            if getattr(order, "legs", None):
+                self.trade_orders.extend(self.exit_legs.values())
+            if self.orders is not None:
+                self.orders.track(order.id, ticker)
+            return True
 
         except APIError as e:
             logging.error("APIError occurred when submitting order")
@@ -224,64 +761,212 @@ class Trader:
 
     def cancel_pending_order(self, ticker):
         """
-        Cancel a pending order for the given ticker, retrying if necessary.
+        Cancel a pending order for the given ticker.
+
+        An order the broker already closed without filling it (cancelled,
+        rejected, expired) has nothing left to cancel. Transient broker failures
+        are retried by the client (see resilience.py).
 
         Args:
             ticker (str): The asset's ticker symbol.
 
         Returns:
-            bool: True if the order was cancelled successfully, False otherwise.
+            bool: True if the order is no longer pending, False if it may still fill.
         """
+        if self.is_order_closed(self.order_id):
+            logging.info(f"Order {self.order_id} is already closed, nothing to cancel")
+            self.exit_legs = None
+            return True
+
         logging.info(f"Cancelling order {self.order_id} for {ticker}")
 
-        for attempt in range(1, config["maxAttemptsCPO"] + 1):
-            try:
-                self.api.cancel_order_by_id(self.order_id)
-                logging.info(f"Order {self.order_id} cancelled correctly")
-                return True
-            except Exception as e:
-                logging.warning(
-                    f"Attempt {attempt}: Order could not be cancelled, retrying... ({e})"
-                )
-                time.sleep(config["sleepTimeCPO"])
+        try:
+            self.api.cancel_order_by_id(self.order_id)
+            self.positions.invalidate(ticker)
+            self.exit_legs = None  # cancelled with the entry
+            logging.info(f"Order {self.order_id} cancelled correctly")
+            return True
+        except Exception as e:
+            logging.error(f"The order could not be cancelled: {e}")
+            logging.info(f"Client order ID: {self.order_id}")
+
+        # Closed while it was being cancelled
+        if self.is_order_closed(self.order_id):
+            self.exit_legs = None
+            return True
+        return False
+
+    def is_order_closed(self, order_id):
+        """
+        Tell if an order was closed without being filled, from its trade updates
+        or else from the broker.
 
-        logging.error(
-            f"The order could not be cancelled after {config['maxAttemptsCPO']} attempts"
+        Returns:
+            bool: True if it was cancelled, rejected or expired, False if it is
+                still open, filled, or its status could not be read.
+        """
+        if self.orders is not None:
+            state = self.orders.track(order_id, self.ticker)
+            if state.done.is_set():
+                return state.status != "fill"
+
+        try:
+            status = self.get_order_status(order_id)
+        except Exception as e:
+            logging.warning(f"Could not get the status of order {order_id}: {e}")
+            return False
+        return status in CLOSED_ORDER_STATUSES and status != "filled"
+
+    def forget_orders(self):
+        """
+        Stop following the orders of the last trade once it is over, so the
+        trade updates of past orders do not pile up in the tracker.
+        """
+        if self.orders is not None:
+            for order_id in self.trade_orders:
+                self.orders.forget(order_id)
+        self.trade_orders = []
+
+    def get_order_status(self, order_id):
+        """
+        Get the status of an order from the broker (e.g. 'new', 'filled').
+        """
+        status = self.api.get_order_by_id(order_id).status
+        return str(getattr(status, "value", status)).lower()
+
+    def save_checkpoint(self, stage, **state):
+        """
+        Save the stage of the trade and what is needed to resume it, if trades
+        are checkpointed.
+        """
+        if self.checkpoints is not None:
+            self.checkpoints.save(self.ticker, stage, **state)
+
+    def clear_checkpoint(self):
+        if self.checkpoints is not None:
+            self.checkpoints.clear(self.ticker)
+
+    def reconcile(self, ticker):
+        """
+        Check the trade saved before a restart against the broker.
+
+        A trade waiting for its filters resumes while its general trend bar is
+        still open. An entry order resumes in position if it filled meanwhile,
+        or keeps waiting if it is still open. A trade in position or exiting
+        resumes only if the position is still open.
+
+        Args:
+            ticker (str): The ticker symbol of the asset.
+
+        Returns:
+            dict: The saved state with the 'stage' to resume from and whether
+                its order is still open ('order_open'), or None to start over.
+        """
+        state = self.checkpoints.get(ticker) if self.checkpoints is not None else None
+        if state is None:
+            return None
+
+        self.positions.invalidate(ticker)
+        position = self.positions.get(ticker)
+        order_open = (
+            state.get("order_id") is not None
+            and self.get_order_status(state["order_id"]) not in CLOSED_ORDER_STATUSES
         )
-        logging.info(f"Client order ID: {self.order_id}")
-        sys.exit()
 
-    def check_position(self, ticker, do_not_find=False):
+        stage = state["stage"]
+        if stage == "confirm":
+            trend_open = self.clock() < next_bar_close("30m", state["saved_at"])
+            resume = "confirm" if position is None and trend_open else None
+        elif stage == "order":
+            resume = (
+                "in position"
+                if position is not None
+                else "order" if order_open else None
+            )
+        elif stage in ("in position", "exit"):
+            resume = stage if position is not None else None
+        else:
+            resume = None
+
+        if resume is None:
+            logging.info(f"Saved {stage} stage of {ticker} is over, starting over")
+            self.clear_checkpoint()
+            return None
+
+        if resume == "in position" and stage == "order":
+            # Filled while the bot was down, the levels follow its entry price
+            state["shares_qty"] = abs(float(position.qty))
+
+        logging.info(f"Resuming {ticker} from the {stage} stage as {resume}")
+        self.order_id = state.get("order_id")
+        self.trade_orders = [
+            str(order_id)
+            for order_id in [self.order_id, *(state.get("exit_legs") or {}).values()]
+            if order_id is not None
+        ]
+        return dict(state, stage=resume, order_open=order_open)
+
+    def amend_exit_legs(self, ticker, entry_price, trend):
         """
-        Check if a position exists for the given ticker.
+        Move the bracket's stop loss and take profit to the actual entry price.
+
+        The legs were set from the price before the entry filled. A leg that
+        cannot be replaced keeps its level, which still protects the position.
 
         Args:
             ticker (str): The asset's ticker symbol.
-            do_not_find (bool, optional): If True, the function returns False if the position is not found.
-                                        Defaults to False.
+            entry_price (float): The average entry price of the position.
+            trend (str): The trade direction ('long' or 'short').
 
         Returns:
-            bool: True if the position is found, False otherwise.
+            tuple: The stop loss and take profit prices.
         """
-        for attempt in range(1, config["maxAttemptsCP"] + 1):
+        stop_loss = self.set_stoploss(entry_price, trend)
+        take_profit = self.set_takeprofit(entry_price, trend)
+
+        for name, order_data in (
+            ("stop_loss", ReplaceOrderRequest(stop_price=round(stop_loss, 2))),
+            ("take_profit", ReplaceOrderRequest(limit_price=round(take_profit, 2))),
+        ):
             try:
-                position = self.api.get_open_position(ticker)
-                current_price = float(position.current_price)
-                logging.info(
-                    f"The position was found. Current price is: {current_price:.2f}"
-                )
-                return True
+                order = self.api.replace_order_by_id(self.exit_legs[name], order_data)
+                self.exit_legs[name] = str(order.id)
+                self.trade_orders.append(str(order.id))
             except Exception as e:
-                if do_not_find:
-                    logging.info("Position not found, this is good!")
-                    return False
+                logging.error(f"The {name} leg of {ticker} could not be amended: {e}")
 
-                logging.info(f"Exception: {e}")
-                logging.info("Position not found, waiting for it...")
-                time.sleep(config["sleepTimeME"])
+        return stop_loss, take_profit
 
-        logging.info(f"Position not found for {ticker}, not waiting any more")
-        return False
+    def cancel_exit_legs(self, ticker):
+        """
+        Cancel the bracket's exit legs before closing the position another way,
+        as they hold its shares.
+
+        Args:
+            ticker (str): The asset's ticker symbol.
+
+        Returns:
+            bool: True if the position is still open and must be closed, False
+                if a leg closed it first.
+        """
+        if not self.exit_legs:
+            return True
+
+        filled = False
+        for name, order_id in self.exit_legs.items():
+            try:
+                self.api.cancel_order_by_id(order_id)
+            except Exception as e:
+                # Filled, or cancelled with the other leg
+                logging.info(f"The {name} leg {order_id} was not cancelled: {e}")
+            filled = filled or self.get_order_status(order_id) == "filled"
+
+        self.exit_legs = None
+        self.positions.invalidate(ticker)
+        if filled:
+            logging.info(f"The {ticker} position was closed by an exit leg")
+            return False
+        return self.get_open_positions(ticker)
 
     def get_shares_amount(self, asset_price):
         """
@@ -334,22 +1019,24 @@ class Trader:
         Raises:
             Exception: If the position is not found after the maximum number of attempts.
         """
-        for attempt in range(1, config["maxAttemptsGCP"] + 1):
-            try:
-                position = self.api.get_open_position(ticker)
-                current_price = float(position.current_price)
-                logging.info(
-                    f"The position was checked. Current price is: {current_price:.2f}"
-                )
-                return current_price
-            except Exception as e:
-                logging.info(
-                    "Position not found, cannot check price, waiting for it..."
-                )
-                time.sleep(config["sleepTimeGCP"])  # wait a defined time and retry
+        # Waits for the position to show up after a fill
+        try:
+            position = retry(
+                self.get_position,
+                wait_policy(config["maxAttemptsGCP"], config["sleepTimeGCP"]),
+                ticker,
+                step="current_price",
+                transient=lambda e: True,
+                sleep=self.sleep,
+                clock=self.clock,
+            )
+        except Exception as e:
+            logging.error(f"Position not found for {ticker}, not waiting any more")
+            raise Exception("Position not found after maximum attempts") from e
 
-        logging.error(f"Position not found for {ticker}, not waiting any more")
-        raise Exception("Position not found after maximum attempts")
+        current_price = float(position.current_price)
+        logging.info(f"The position was checked. Current price is: {current_price:.2f}")
+        return current_price
 
     def get_avg_entry_price(self, ticker):
         """
@@ -364,222 +1051,237 @@ class Trader:
         Raises:
             Exception: If the position is not found after the maximum number of attempts.
         """
-        for attempt in range(1, config["maxAttemptsGAEP"] + 1):
-            try:
-                position = self.api.get_open_position(ticker)
-                avg_entry_price = float(position.avg_entry_price)
-                logging.info(
-                    f"The position was checked. Average entry price is: {avg_entry_price:.2f}"
-                )
-                return avg_entry_price
-            except Exception as e:
-                logging.info(
-                    "Position not found, cannot check price, waiting for it..."
-                )
-                time.sleep(config["sleepTimeGAEP"])  # wait a defined time and retry
+        # Waits for the position to show up after a fill
+        try:
+            position = retry(
+                self.get_position,
+                wait_policy(config["maxAttemptsGAEP"], config["sleepTimeGAEP"]),
+                ticker,
+                step="avg_entry_price",
+                transient=lambda e: True,
+                sleep=self.sleep,
+                clock=self.clock,
+            )
+        except Exception as e:
+            logging.error(f"Position not found for {ticker}, not waiting any more")
+            raise Exception("Position not found after maximum attempts") from e
 
-        logging.error(f"Position not found for {ticker}, not waiting any more")
-        raise Exception("Position not found after maximum attempts")
+        avg_entry_price = float(position.avg_entry_price)
+        logging.info(
+            f"The position was checked. Average entry price is: {avg_entry_price:.2f}"
+        )
+        return avg_entry_price
 
-    def get_general_trend(self, ticker):
+    @timed("evaluate_general_trend")
+    def evaluate_general_trend(self, ticker):
         """
-        Get general trend: detect interesting trend (UP / DOWN / NO TREND)
+        Evaluate the general trend once on the latest 30 minute bars.
 
         Args:
             ticker (str): The ticker symbol of the asset.
 
         Returns:
             str: Trend direction - 'long', 'short', or 'no trend'.
+        """
+        # period = 50 samples of 30 minutes = around 5 days (8h each) of data
+        # ask for 30 min candles
+        data = self.load_historical_data(ticker, interval="30m", period="5d")
 
-        Raises:
-            Exception: If no trend is detected after maximum attempts.
+        # update the EMAs with the new bars
+        values = self.indicators.sync(ticker, "30m", data)
+        ema9, ema26, ema50 = values.ema_fast, values.ema_mid, values.ema_slow
+
+        logging.info(
+            f"{ticker} general trend EMAs = [EMA9:{ema9:.2f}, EMA26:{ema26:.2f}, EMA50:{ema50:.2f}]"
+        )
+
+        # checking EMAs relative position
+        trend = evaluate_rules(get_trend_rules(), "30m", data, values)
+        if trend["long"]:
+            logging.info(f"Trend detected for {ticker}: long")
+            return "long"
+        elif trend["short"]:
+            logging.info(f"Trend detected for {ticker}: short")
+            return "short"
+        else:
+            logging.info(f"Trend not clear for {ticker}")
+            return "no trend"
+
+    @timed("evaluate_instant_trend")
+    def evaluate_instant_trend(self, ticker, trend):
         """
-        logging.info("\nGENERAL TREND ANALYSIS entered")
+        Evaluate the instant trend once on the latest 5 minute bars.
 
-        for attempt in range(1, config["maxAttemptsGGT"] + 1):
-            try:
-                # period = 50 samples of 30 minutes = around 5 days (8h each) of data
-                # ask for 30 min candles
-                data = self.load_historical_data(ticker, interval="30m", period="5d")
-                close = data.Close.values
+        Args:
+            ticker (str): The ticker symbol of the asset.
+            trend (str): The expected trend - 'long' or 'short'.
 
-                # calculate EMAs
-                ema9 = ti.ema(close, 9)[-1]
-                ema26 = ti.ema(close, 26)[-1]
-                ema50 = ti.ema(close, 50)[-1]
+        Returns:
+            bool: True if trend is confirmed, False otherwise.
+        """
+        # period = 50 samples of 5 minutes = less than 1 day (8h) of data
+        data = self.load_historical_data(ticker, interval="5m", period="1d")
 
-                logging.info(
-                    f"{ticker} general trend EMAs = [EMA9:{ema9:.2f}, EMA26:{ema26:.2f}, EMA50:{ema50:.2f}]"
-                )
+        # update the EMAs with the new bars
+        values = self.indicators.sync(ticker, "5m", data)
+        ema9, ema26, ema50 = values.ema_fast, values.ema_mid, values.ema_slow
 
-                # checking EMAs relative position
-                if (ema50 < ema26) and (ema26 < ema9):
-                    logging.info(f"Trend detected for {ticker}: long")
-                    return "long"
-                elif (ema50 > ema26) and (ema26 > ema9):
-                    logging.info(f"Trend detected for {ticker}: short")
-                    return "short"
-                else:
-                    logging.info(f"Trend not clear for {ticker}, waiting...")
-                    time.sleep(config["sleepTimeGGT"] * config["maxAttemptsGGT"])
+        logging.info(
+            f"{ticker} instant trend EMAs = [EMA9:{ema9:.2f}, EMA26:{ema26:.2f}, EMA50:{ema50:.2f}]"
+        )
 
-            except Exception as e:
-                logging.error(f"Error occurred while detecting trend for {ticker}: {e}")
-                continue
+        filters = evaluate_rules(get_filter_rules(), "5m", data, values)
+        if filters[f"instant_trend_{trend}"]:
+            logging.info(f"{trend.capitalize()} trend confirmed for {ticker}")
+            return True
 
-        logging.info(f"Trend NOT detected and timeout reached for {ticker}")
-        raise Exception("Trend not detected after maximum attempts")
+        logging.info(f"Trend not clear for {ticker}")
+        return False
 
-    def get_instant_trend(self, ticker, trend):
+    @timed("evaluate_rsi")
+    def evaluate_rsi(self, ticker, trend):
         """
-        Get instant trend: confirm the trend detected by GT analysis.
+        Evaluate the RSI once on the latest 5 minute bars.
 
         Args:
             ticker (str): The ticker symbol of the asset.
             trend (str): The expected trend - 'long' or 'short'.
 
         Returns:
-            bool: True if trend is confirmed, False otherwise.
-
-        Raises:
-            Exception: If an error occurs during the trend detection.
+            bool: True if trend is confirmed by RSI, False otherwise.
         """
-        logging.info("\nINSTANT TREND ANALYSIS entered")
-
-        for attempt in range(1, config["maxAttemptsGIT"] + 1):
-            try:
-                # period = 50 samples of 5 minutes = less than 1 day (8h) of data
-                data = self.load_historical_data(ticker, interval="5m", period="1d")
-                close = data.Close.values
+        # period = 50 samples of 5 minutes = less than 1 day (8h) of data
+        data = self.load_historical_data(ticker, interval="5m", period="1d")
 
-                # calculate the EMAs
-                ema9 = ti.ema(close, 9)[-1]
-                ema26 = ti.ema(close, 26)[-1]
-                ema50 = ti.ema(close, 50)[-1]
+        # update the RSI with the new bars, it uses a rsiPeriod-sample window
+        values = self.indicators.sync(ticker, "5m", data)
 
-                logging.info(
-                    f"{ticker} instant trend EMAs = [EMA9:{ema9:.2f}, EMA26:{ema26:.2f}, EMA50:{ema50:.2f}]"
-                )
+        if values.rsi is None:
+            logging.info(f"Not enough data for {ticker} RSI")
+            return False
 
-                if (trend == "long" and ema9 > ema26 > ema50) or (
-                    trend == "short" and ema9 < ema26 < ema50
-                ):
-                    logging.info(f"{trend.capitalize()} trend confirmed for {ticker}")
-                    return True
-                else:
-                    logging.info(f"Trend not clear for {ticker}, waiting...")
-                    time.sleep(config["sleepTimeGIT"])
+        logging.info(f"{ticker} rsi = [{values.rsi:.2f}]")
 
-            except Exception as e:
-                logging.error(
-                    f"Error occurred while confirming instant trend for {ticker}: {e}"
-                )
-                sys.exit()
+        filters = evaluate_rules(get_filter_rules(), "5m", data, values)
+        if filters[f"rsi_{trend}"]:
+            logging.info(f"{trend.capitalize()} trend confirmed for {ticker}")
+            return True
 
-        logging.info(f"Trend NOT detected and timeout reached for {ticker}")
+        logging.info(f"Trend not clear for {ticker}")
         return False
 
-    def get_rsi(self, ticker, trend):
+    @timed("evaluate_stochastic")
+    def evaluate_stochastic(self, ticker, trend):
         """
-        Perform RSI analysis.
+        Evaluate the Stochastic once on the latest 5 minute bars.
 
         Args:
             ticker (str): The ticker symbol of the asset.
             trend (str): The expected trend - 'long' or 'short'.
 
         Returns:
-            bool: True if trend is confirmed by RSI, False otherwise.
-
-        Raises:
-            Exception: If an error occurs during the RSI analysis.
+            bool: True if trend is confirmed by Stochastic, False otherwise.
         """
-        logging.info("\nRSI ANALYSIS entered")
-
-        for attempt in range(1, config["maxAttemptsRSI"] + 1):
-            try:
-                # period = 50 samples of 5 minutes = less than 1 day (8h) of data
-                data = self.load_historical_data(ticker, interval="5m", period="1d")
+        # period = 50 samples of 5 minutes = less than 1 day (8h) of data
+        data = self.load_historical_data(ticker, interval="5m", period="1d")
 
-                # calculate the RSI
-                rsi = ti.rsi(data.Close.values, 14)[-1]  # it uses 14-sample window
+        # update the Stochastic with the new bars
+        values = self.indicators.sync(ticker, "5m", data)
+        stoch_k, stoch_d = values.stoch_k, values.stoch_d
 
-                logging.info(f"{ticker} rsi = [{rsi:.2f}]")
+        if stoch_k is None:
+            logging.info(f"Not enough data for {ticker} Stochastic")
+            return False
 
-                if (trend == "long" and 50 < rsi < 80) or (
-                    trend == "short" and 20 < rsi < 50
-                ):
-                    logging.info(f"{trend.capitalize()} trend confirmed for {ticker}")
-                    return True
-                else:
-                    logging.info(f"Trend not clear for {ticker}, waiting...")
-                    time.sleep(config["sleepTimeRSI"])
+        logging.info(
+            f"{ticker} stochastic = [K_FAST:{stoch_k:.2f},D_SLOW:{stoch_d:.2f}]"
+        )
 
-            except Exception as e:
-                logging.error(
-                    f"Error occurred while performing RSI analysis for {ticker}: {e}"
-                )
-                sys.exit()
+        filters = evaluate_rules(get_filter_rules(), "5m", data, values)
+        if filters[f"stochastic_{trend}"]:
+            logging.info(f"{trend.capitalize()} trend confirmed for {ticker}")
+            return True
 
-        logging.info(f"Trend NOT detected and timeout reached for {ticker}")
+        logging.info(f"Trend not clear for {ticker}")
         return False
 
-    def get_stochastic(self, ticker, trend):
+    @timed("evaluate_filters")
+    def evaluate_filters(self, ticker, trend):
         """
-        Perform Stochastic analysis.
+        Evaluate the instant trend, RSI and Stochastic together on one snapshot
+        of the latest 5 minute bars.
 
         Args:
             ticker (str): The ticker symbol of the asset.
             trend (str): The expected trend - 'long' or 'short'.
 
         Returns:
-            bool: True if trend is confirmed by Stochastic, False otherwise.
+            FilterVerdict: Every filter's outcome, truthy if they all passed.
+        """
+        data = self.load_historical_data(ticker, interval="5m", period="1d")
+        values = self.indicators.sync(ticker, "5m", data)
+        filters = evaluate_rules(get_filter_rules(), "5m", data, values)
+
+        verdict = FilterVerdict(
+            bool(filters[f"instant_trend_{trend}"]),
+            bool(filters[f"rsi_{trend}"]),
+            bool(filters[f"stochastic_{trend}"]),
+            values,
+            int(data.time[-1]),
+            self.clock(),
+        )
+        logging.info(
+            f"{ticker} {trend} filters on bar {verdict.bar_time}: instant trend "
+            f"{verdict.instant_trend}, rsi {verdict.rsi}, stochastic {verdict.stochastic}"
+        )
+        return verdict
 
-        Raises:
-            Exception: If an error occurs during the Stochastic analysis.
+    def get_last_close(self, ticker):
         """
-        logging.info("\nSTOCHASTIC ANALYSIS entered")
+        Get the latest traded price, the one orders are placed at.
 
-        for attempt in range(1, config["maxAttemptsSTC"] + 1):
-            try:
-                # period = 50 samples of 5 minutes = less than 1 day (8h) of data
-                data = self.load_historical_data(ticker, interval="5m", period="1d")
+        It is the last streamed price when prices are streamed, or else a live
+        quote of the data source. The cached bars may be a whole bar old, their
+        latest close is only used when there is no quote.
 
-                # calculate the Stochastic
-                stoch_k, stoch_d = ti.stoch(
-                    data.High.values, data.Low.values, data.Close.values, 9, 6, 9
-                )
-                stoch_k, stoch_d = stoch_k[-1], stoch_d[-1]
+        Args:
+            ticker (str): The ticker symbol of the asset.
 
-                logging.info(
-                    f"{ticker} stochastic = [K_FAST:{stoch_k:.2f},D_SLOW:{stoch_d:.2f}]"
-                )
+        Returns:
+            float: The last price, rounded to cents.
+        """
+        price = None
+        if self.price_monitor is not None:
+            price = self.price_monitor.last_price(ticker)
+        if price is None:
+            price = self.last_price(ticker)
+        if price is None:
+            logging.warning(f"No quote for {ticker}, using the last 5m close")
+            data = self.load_historical_data(ticker, interval="5m", period="1d")
+            price = data.close[-1]
+        return round(float(price), 2)
+
+    def next_evaluation_time(self, interval, sleep_time):
+        """
+        Get when a check on bars of an interval is worth running again.
 
-                if (
-                    trend == "long"
-                    and stoch_k > stoch_d
-                    and stoch_k < 80
-                    and stoch_d < 80
-                ) or (
-                    trend == "short"
-                    and stoch_k < stoch_d
-                    and stoch_k > 20
-                    and stoch_d > 20
-                ):
-                    logging.info(f"{trend.capitalize()} trend confirmed for {ticker}")
-                    return True
-                else:
-                    logging.info(f"Trend not clear for {ticker}, waiting...")
-                    time.sleep(config["sleepTimeSTC"])
+        With alignToBarClose this is when the bar being built closes, plus
+        barCloseGrace seconds for the data source to publish it. Otherwise it is
+        sleep_time from now.
 
-            except Exception as e:
-                logging.error(
-                    f"Error occurred while performing Stochastic analysis for {ticker}: {e}"
-                )
-                sys.exit()
+        Args:
+            interval (str): The bar interval the check reads.
+            sleep_time (float): The fixed wait used without alignment.
 
-        logging.info(f"Trend NOT detected and timeout reached for {ticker}")
-        return False
+        Returns:
+            float: The UNIX timestamp to wake up at.
+        """
+        now = self.clock()
+        if config["alignToBarClose"]:
+            return next_bar_close(interval, now) + config["barCloseGrace"]
+        return now + sleep_time
 
+    @timed("check_stochastic_crossing")
     def check_stochastic_crossing(self, ticker, trend):
         """
         Check whether the Stochastic curves have crossed or not depending on the trend.
@@ -599,11 +1301,13 @@ class Trader:
         # period = 50 samples of 5 minutes = less than 1 day (8h) of data
         data = self.load_historical_data(ticker, interval="5m", period="1d")
 
-        # calculate the Stochastic
-        stoch_k, stoch_d = ti.stoch(
-            data.High.values, data.Low.values, data.Close.values, 9, 6, 9
-        )
-        stoch_k, stoch_d = stoch_k[-1], stoch_d[-1]
+        # update the Stochastic with the new bars
+        values = self.indicators.sync(ticker, "5m", data)
+        stoch_k, stoch_d = values.stoch_k, values.stoch_d
+
+        if stoch_k is None:
+            logging.info(f"Not enough data for {ticker} Stochastic yet")
+            return False
 
         logging.info(
             f"{ticker} stochastic = [K_FAST:{stoch_k:.2f},D_SLOW:{stoch_d:.2f}]"
@@ -627,78 +1331,39 @@ class Trader:
             )
             return False
 
-    def enter_position_mode(self, ticker, trend):
+    def is_exit_price(self, current_price, trend, stop_loss, take_profit):
         """
-        Check the conditions in parallel once inside the position.
+        Check whether a price reaches the take profit or the stop loss.
 
         Args:
-            ticker (str): The ticker symbol of the asset.
-            trend (str): The expected trend - 'long' or 'short'.
+            current_price (float): The current price of the asset.
+            trend (str): The trade direction - 'long' or 'short'.
+            stop_loss (float): The stop loss price.
+            take_profit (float): The take profit price.
 
         Returns:
-            bool: True if conditions for exit are met, False otherwise.
-
-        Raises:
-            Exception: If an error occurs during the check.
+            bool: True if the position should be closed, False otherwise.
         """
-        logging.info("Entering position mode...")
-
-        # Get average entry price
-        entry_price = self.get_avg_entry_price(ticker)
-
-        # Set the take profit
-        take_profit = self.set_takeprofit(entry_price, trend)
-
-        # Set the stop loss
-        stop_loss = self.set_stoploss(entry_price, trend)
-
-        try:
-            for attempt in range(1, config["maxAttemptsEPM"] + 1):
-                self.current_price = self.get_current_price(ticker)
-
-                # Check if take profit or stop loss is met
-                if (
-                    trend == "long"
-                    and (
-                        self.current_price >= take_profit
-                        or self.current_price <= stop_loss
-                    )
-                ) or (
-                    trend == "short"
-                    and (
-                        self.current_price <= take_profit
-                        or self.current_price >= stop_loss
-                    )
-                ):
-                    logging.info(
-                        f'{"Take profit" if self.current_price >= take_profit else "Stop loss"} met at {self.current_price:.2f}. Current price is {self.current_price:.2f}'
-                    )
-                    return True
-
-                # Check stochastic crossing
-                elif self.check_stochastic_crossing(ticker, trend):
-                    logging.info(
-                        f"Stochastic curves crossed. Current price is {self.current_price:.2f}"
-                    )
-                    return True
-
-                # Waiting inside position
-                logging.info(f"Waiting inside position, attempt #{attempt}")
-                logging.info(
-                    f"SL {stop_loss:.2f} <-- {self.current_price:.2f} --> {take_profit:.2f} TP"
-                )
-                time.sleep(config["sleepTimeEPM"])
-
-            logging.info("Timeout reached at enter position, too late")
-            return False
+        if (
+            trend == "long"
+            and (current_price >= take_profit or current_price <= stop_loss)
+        ) or (
+            trend == "short"
+            and (current_price <= take_profit or current_price >= stop_loss)
+        ):
+            logging.info(
+                f'{"Take profit" if current_price >= take_profit else "Stop loss"} met at {current_price:.2f}. Current price is {current_price:.2f}'
+            )
+            return True
 
-        except Exception as e:
-            logging.error(f"Error occurred while in position mode for {ticker}: {e}")
-            return False
+        return False
 
     def run(self, ticker):
         """
-        Run the trading operation.
+        Run the trading operation, from trend detection to exit.
+
+        The stages are the ones of scheduler.TraderPipeline, driven on an event
+        loop of its own, and every wait uses this Trader's sleep.
 
         Args:
             ticker (str): The ticker symbol of the asset.
@@ -706,74 +1371,7 @@ class Trader:
         Returns:
             bool: True if the operation was successful, False otherwise.
         """
-        logging.info("Running trading operation...")
-
-        while True:
-            # Check if there is an open position with the ticker
-            if self.check_position(ticker, do_not_find=True):
-                logging.info(
-                    f"There is already an open position with {ticker}! Aborting..."
-                )
-                return False
-
-            # Find general trend
-            trend = self.get_general_trend(ticker)
-            if not trend:
-                logging.info(f"No general trend found for {ticker}! Aborting...")
-                return False
-
-            # Confirm instant trend
-            if not self.get_instant_trend(ticker, trend):
-                logging.info("The instant trend is not confirmed. Retrying...")
-                continue
+        from scheduler import TraderPipeline
 
-            # Perform RSI and STOCHASTIC analysis
-            if not self.get_rsi(ticker, trend) or not self.get_stochastic(
-                ticker, trend
-            ):
-                logging.info(
-                    "The RSI or STOCHASTIC analysis is not confirmed. Retrying..."
-                )
-                continue
-
-            logging.info("All filtering passed, carrying on with the order!")
-
-            # Get current price
-            current_price = round(
-                float(
-                    self.load_historical_data(
-                        ticker, interval="5m", period="1d"
-                    ).Close.values[-1]
-                ),
-                2,
-            )
-
-            # Decide the total amount to invest
-            shares_qty = self.get_shares_amount(current_price)
-
-            logging.info(f"DESIRED ENTRY PRICE: {current_price:.2f}")
-
-            # Submit limit order
-            if not self.submit_order("limit", trend, ticker, shares_qty, current_price):
-                continue
-
-            # Check position
-            if not self.check_position(ticker):
-                self.cancel_pending_order(ticker)
-                continue
-
-            # Enter position mode
-            successful_operation = self.enter_position_mode(ticker, trend)
-
-            # Submit market order to exit
-            self.submit_order(
-                "market", trend, ticker, shares_qty, current_price, exit=True
-            )
-
-            # Check the position is cleared
-            while not self.check_position(ticker, do_not_find=True):
-                logging.info("WARNING! THE POSITION SHOULD BE CLOSED! Retrying...")
-                time.sleep(config["sleepTimeCP"])  # wait 10 seconds
-
-            # End of execution
-            return successful_operation
+        logging.info("Running trading operation...")
+        return asyncio.run(TraderPipeline(self).run_once())
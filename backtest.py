@@ -0,0 +1,266 @@
+# Import necessary libraries
+import sys
+import time
+
+import numpy as np
+
+from settings import config, load_config
+from signals import SignalEvaluator, filter_rules, trend_rules
+
+
+def default_params():
+    """
+    Get the strategy knobs used when a backtest does not override them.
+    """
+    return {
+        "stopLossMargin": config["stopLossMargin"],
+        "takeProfitMargin": config["takeProfitMargin"],
+        "maxVar": config["maxVar"],
+        "emaPeriods": config["emaPeriods"],
+        "rsiPeriod": config["rsiPeriod"],
+        "stochPeriods": config["stochPeriods"],
+        "maxHoldSeconds": config["maxAttemptsEPM"] * config["sleepTimeEPM"],
+        "cooldownSeconds": config["sleepTimeME"],
+    }
+
+
+# Exit reasons stored with every trade
+EXIT_REASONS = ("stop loss", "take profit", "stochastic", "timeout")
+
+
+def _columns(bars):
+    """
+    Make the OHLCV arrays of one ticker the one-column matrices signals reads.
+    """
+    return {field: np.asarray(values)[:, None] for field, values in bars.items()}
+
+
+def entry_signals(bars, trend_bars, params):
+    """
+    Evaluate the entry rules of Trader.run at the close of every base bar.
+
+    The general trend comes from the last closed trend bar, then the instant
+    trend, RSI and Stochastic filters have to agree on the base bars. The
+    rules are the ones of signals.trend_rules and signals.filter_rules.
+
+    Args:
+        bars (dict): The 5 minute OHLCV arrays.
+        trend_bars (dict): The 30 minute OHLCV arrays.
+        params (dict): The strategy knobs.
+
+    Returns:
+        tuple: The direction of every bar (1, -1 or 0) and the stochastic arrays.
+    """
+    base_seconds = np.median(np.diff(bars["time"])) if len(bars["time"]) > 1 else 0
+    trend_seconds = (
+        np.median(np.diff(trend_bars["time"])) if len(trend_bars["time"]) > 1 else 0
+    )
+
+    trend = SignalEvaluator(trend_rules(params["emaPeriods"], "30m")).evaluate_series(
+        {"30m": _columns(trend_bars)}
+    )
+    filters = SignalEvaluator(
+        filter_rules(
+            params["emaPeriods"], params["rsiPeriod"], params["stochPeriods"], "5m"
+        )
+    ).evaluate_series({"5m": _columns(bars)})
+
+    # General trend, only from trend bars already closed at each base bar close
+    closed = (
+        np.searchsorted(
+            trend_bars["time"] + trend_seconds,
+            bars["time"] + base_seconds,
+            side="right",
+        )
+        - 1
+    )
+    is_closed = closed >= 0
+    closed = np.maximum(closed, 0)
+
+    long_ok = is_closed & trend["long"][closed, 0] & filters["long"][:, 0]
+    short_ok = is_closed & trend["short"][closed, 0] & filters["short"][:, 0]
+
+    return (
+        np.where(long_ok, 1, np.where(short_ok, -1, 0)),
+        filters["stoch_k"][:, 0],
+        filters["stoch_d"][:, 0],
+    )
+
+
+def _pad(values, count, fill=np.nan):
+    """
+    Append count fill values so every bar has a full holding window after it.
+    """
+    return np.concatenate((values, np.full(count, fill)))
+
+
+class BacktestResult:
+    def __init__(self, trades, bars_count, elapsed):
+        """
+        Trades of a backtest run.
+
+        Args:
+            trades (dict): One array per trade field.
+            bars_count (int): The number of base bars replayed.
+            elapsed (float): The seconds the run took.
+        """
+        self.trades = trades
+        self.bars_count = bars_count
+        self.elapsed = elapsed
+
+    def summary(self):
+        """
+        Get the headline statistics of the run.
+
+        Returns:
+            dict: Trade count, win rate, returns, drawdown and profit factor.
+        """
+        returns = self.trades["return"]
+        equity = np.cumprod(1 + returns)
+        peak = np.maximum.accumulate(np.concatenate(([1.0], equity)))[1:]
+        gains, losses = returns[returns > 0].sum(), -returns[returns < 0].sum()
+
+        return {
+            "trades": len(returns),
+            "win_rate": float((returns > 0).mean()) if len(returns) else 0.0,
+            "total_return": float(equity[-1] - 1) if len(returns) else 0.0,
+            "avg_return": float(returns.mean()) if len(returns) else 0.0,
+            "max_drawdown": float((1 - equity / peak).max()) if len(returns) else 0.0,
+            "profit_factor": float(gains / losses) if losses else float("inf"),
+        }
+
+
+def run_backtest(bars, trend_bars, params=None):
+    """
+    Replay the Trader strategy over stored bars.
+
+    Entries are limit orders placed at the close of a signal bar and filled at
+    the next open if it is within maxVar. Stop loss and take profit are set like
+    set_stoploss/set_takeprofit and checked against each bar's high and low
+    (stop loss first when both are touched); the stochastic crossing and the
+    position timeout are checked at each close. Only one position is open at a
+    time and a new one waits cooldownSeconds after the last exit, like main.py.
+
+    Args:
+        bars (dict): The 5 minute OHLCV arrays (see barstore.bars_from_frame).
+        trend_bars (dict): The 30 minute OHLCV arrays.
+        params (dict, optional): Overrides of default_params().
+
+    Returns:
+        BacktestResult: The trades of the run.
+    """
+    started = time.perf_counter()
+    params = {**default_params(), **(params or {})}
+
+    times = bars["time"]
+    open_, high, low, close = bars["open"], bars["high"], bars["low"], bars["close"]
+    size = len(close)
+    bar_seconds = np.median(np.diff(times)) if size > 1 else 1
+
+    signal, stoch_k, stoch_d = entry_signals(bars, trend_bars, params)
+
+    # Candidate entries: signal at the close of i, filled at the open of i + 1
+    signal_bars = np.flatnonzero(signal[:-1])
+    direction = signal[signal_bars]
+    limit = close[signal_bars] * (1 + direction * params["maxVar"])
+    entry_bars = signal_bars + 1
+    entry_price = open_[entry_bars]
+    filled = direction * (limit - entry_price) >= 0
+    signal_bars, direction = signal_bars[filled], direction[filled]
+    entry_bars, entry_price = entry_bars[filled], entry_price[filled]
+
+    stop_loss = entry_price * (1 - direction * params["stopLossMargin"])
+    take_profit = entry_price * (1 + direction * params["takeProfitMargin"])
+
+    # Look at every candidate's holding window at once
+    hold = max(1, int(params["maxHoldSeconds"] // bar_seconds))
+    windows = np.lib.stride_tricks.sliding_window_view
+    window_high = windows(_pad(high, hold), hold)[entry_bars]
+    window_low = windows(_pad(low, hold), hold)[entry_bars]
+    window_open = windows(_pad(open_, hold), hold)[entry_bars]
+    with np.errstate(invalid="ignore"):
+        crossed = np.where(stoch_k <= stoch_d, 1, 0) - np.where(
+            stoch_k >= stoch_d, 1, 0
+        )
+    window_cross = windows(_pad(crossed, hold, 0), hold)[entry_bars]
+
+    is_long = (direction == 1)[:, None]
+    with np.errstate(invalid="ignore"):
+        hit_stop = np.where(
+            is_long,
+            window_low <= stop_loss[:, None],
+            window_high >= stop_loss[:, None],
+        )
+        hit_profit = np.where(
+            is_long,
+            window_high >= take_profit[:, None],
+            window_low <= take_profit[:, None],
+        )
+    hit_cross = np.where(is_long, window_cross == 1, window_cross == -1)
+
+    exits = hit_stop | hit_profit | hit_cross
+    first = np.argmax(exits, axis=1)
+    rows = np.arange(len(entry_bars))
+    has_exit = exits[rows, first]
+    last_bar = np.minimum(entry_bars + hold - 1, size - 1)
+    exit_bars = np.where(has_exit, entry_bars + first, last_bar)
+
+    reason = np.select(
+        [
+            has_exit & hit_stop[rows, first],
+            has_exit & hit_profit[rows, first],
+            has_exit,
+        ],
+        [0, 1, 2],
+        default=3,
+    )
+    level = np.where(reason == 0, stop_loss, take_profit)
+    gap_open = window_open[rows, first]
+    gapped = np.where(
+        reason == 0, direction * (gap_open - level) < 0, False
+    ) | np.where(reason == 1, direction * (gap_open - level) > 0, False)
+    exit_price = np.where(
+        reason <= 1, np.where(gapped, gap_open, level), close[exit_bars]
+    )
+
+    # Walk the candidates, one position at a time with a cooldown after each exit
+    cooldown = max(1, int(params["cooldownSeconds"] // bar_seconds))
+    taken = []
+    position = 0
+    while position < len(signal_bars):
+        taken.append(position)
+        position = np.searchsorted(
+            signal_bars, exit_bars[position] + cooldown, side="left"
+        )
+    taken = np.asarray(taken, dtype=int)
+
+    returns = direction[taken] * (exit_price[taken] / entry_price[taken] - 1)
+    trades = {
+        "entry_time": times[entry_bars[taken]],
+        "exit_time": times[exit_bars[taken]],
+        "direction": direction[taken],
+        "entry_price": entry_price[taken],
+        "exit_price": exit_price[taken],
+        "reason": np.asarray(EXIT_REASONS, dtype=object)[reason[taken]],
+        "return": returns,
+    }
+
+    return BacktestResult(trades, size, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    from PocketTrader import load_stored_bars
+
+    load_config()
+    ticker = sys.argv[1] if len(sys.argv) > 1 else "SPY"
+    result = run_backtest(
+        load_stored_bars(ticker, "5m", "60d"),
+        load_stored_bars(ticker, "30m", "60d"),
+    )
+    print(f"{ticker}: {result.bars_count} bars in {result.elapsed * 1000:.1f} ms")
+    for name, value in result.summary().items():
+        print(
+            f"  {name}: {value:.4f}"
+            if isinstance(value, float)
+            else f"  {name}: {value}"
+        )
@@ -0,0 +1,263 @@
+# Import necessary libraries
+import os
+import re
+import time
+
+import numpy as np
+
+from cache import interval_seconds
+
+# Layout of one bar on disk, bars are appended oldest first
+BAR_DTYPE = np.dtype(
+    [
+        ("time", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+
+FIELDS = BAR_DTYPE.names
+
+
+def bars_from_frame(data):
+    """
+    Convert a yfinance DataFrame into OHLCV arrays.
+
+    Args:
+        data (DataFrame): Bars with Open, High, Low, Close and Volume columns.
+
+    Returns:
+        dict: 'time' (bar open as UNIX seconds) and one float array per column.
+    """
+    return {
+        "time": data.index.values.astype("datetime64[s]").astype("int64"),
+        "open": data.Open.values.astype(float),
+        "high": data.High.values.astype(float),
+        "low": data.Low.values.astype(float),
+        "close": data.Close.values.astype(float),
+        "volume": data.Volume.values.astype(float),
+    }
+
+
+def frame_from_bars(bars):
+    """
+    Convert OHLCV arrays back into a yfinance-like DataFrame.
+
+    Args:
+        bars (dict): 'time' and one array per column.
+
+    Returns:
+        DataFrame: Open, High, Low, Close and Volume indexed by UTC bar time.
+    """
+    import pandas as pd
+
+    index = pd.to_datetime(np.asarray(bars["time"]), unit="s", utc=True)
+    return pd.DataFrame(
+        {
+            "Open": bars["open"],
+            "High": bars["high"],
+            "Low": bars["low"],
+            "Close": bars["close"],
+            "Volume": bars["volume"],
+        },
+        index=index,
+    )
+
+
+def concat_bars(*parts):
+    """
+    Join several OHLCV array dicts, oldest first.
+    """
+    return {field: np.concatenate([part[field] for part in parts]) for field in FIELDS}
+
+
+# Hourly bars start at half past, when US sessions open
+RESAMPLE_OFFSETS = {"60m": 1800, "1h": 1800}
+
+
+def resample_bars(bars, interval):
+    """
+    Aggregate OHLCV arrays into bars of a longer interval.
+
+    Each bar goes into the longer bar its open time falls in. The last longer
+    bar is still being built if its base bars do not cover it yet.
+
+    Args:
+        bars (dict): OHLCV arrays of the base interval, oldest first.
+        interval (str): The longer interval (e.g. '15m', '30m', '1h').
+
+    Returns:
+        dict: The OHLCV arrays of the longer bars.
+    """
+    seconds = interval_seconds(interval)
+    offset = RESAMPLE_OFFSETS.get(interval, 0)
+    times = np.asarray(bars["time"])
+    if not len(times):
+        return {field: np.asarray(bars[field]) for field in FIELDS}
+
+    keys = (times - offset) // seconds
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    ends = np.append(starts[1:], len(times))
+
+    return {
+        "time": keys[starts] * seconds + offset,
+        "open": np.asarray(bars["open"])[starts],
+        "high": np.maximum.reduceat(np.asarray(bars["high"]), starts),
+        "low": np.minimum.reduceat(np.asarray(bars["low"]), starts),
+        "close": np.asarray(bars["close"])[ends - 1],
+        "volume": np.add.reduceat(np.asarray(bars["volume"]), starts),
+    }
+
+
+def period_start(period, now):
+    """
+    Get the first bar time covered by a yfinance period.
+
+    Args:
+        period (str): The period (e.g. '1d', '5d', '1mo', '1y', 'ytd', 'max').
+        now (float): The current UNIX timestamp.
+
+    Returns:
+        int: The UNIX timestamp the period starts at, or None for 'max'.
+    """
+    import pandas as pd
+
+    stamp = pd.Timestamp(now, unit="s", tz="UTC")
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+
+    if period == "max":
+        return None
+    elif period == "ytd":
+        start = stamp.normalize().replace(month=1, day=1)
+    elif match is None:
+        raise ValueError(f"Unknown period: {period}")
+    else:
+        count, unit = int(match.group(1)), match.group(2)
+        offset = {
+            "d": pd.offsets.BDay(count),
+            "wk": pd.DateOffset(weeks=count),
+            "mo": pd.DateOffset(months=count),
+            "y": pd.DateOffset(years=count),
+        }[unit]
+        start = stamp - offset
+
+    return int(start.timestamp())
+
+
+class BarStore:
+    def __init__(self, folder="bars"):
+        """
+        Local on-disk bar history, one append-only file per ticker and interval.
+
+        Every file is a flat array of BAR_DTYPE records without a header, so it
+        can be memory-mapped as is and grows by appending the newest bars.
+
+        Args:
+            folder (str, optional): Where the files are kept. Defaults to 'bars'.
+        """
+        self.folder = os.path.join(".", folder)
+        os.makedirs(self.folder, exist_ok=True)
+
+    def path(self, ticker, interval):
+        return os.path.join(self.folder, f"{ticker}_{interval}.bars")
+
+    def _map(self, ticker, interval):
+        path = self.path(ticker, interval)
+        count = (
+            os.path.getsize(path) // BAR_DTYPE.itemsize if os.path.exists(path) else 0
+        )
+        if count == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+        return np.memmap(path, dtype=BAR_DTYPE, mode="r", shape=(count,))
+
+    def last_time(self, ticker, interval):
+        """
+        Get the time of the newest stored bar.
+
+        Returns:
+            int: The bar open as UNIX seconds, or None if nothing is stored.
+        """
+        records = self._map(ticker, interval)
+        return int(records["time"][-1]) if len(records) else None
+
+    def read(self, ticker, interval, start=None, end=None):
+        """
+        Read a range of stored bars without copying them.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            interval (str): The bar interval.
+            start (int, optional): First bar time to include, as UNIX seconds.
+            end (int, optional): Bar times before this are included, as UNIX seconds.
+
+        Returns:
+            dict: One read-only array view per field, oldest first.
+        """
+        records = self._map(ticker, interval)
+        times = records["time"]
+        lo = np.searchsorted(times, start, side="left") if start is not None else 0
+        hi = np.searchsorted(times, end, side="left") if end is not None else len(times)
+        return {field: records[field][lo:hi] for field in FIELDS}
+
+    def append(self, ticker, interval, bars):
+        """
+        Append bars newer than the stored ones.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            interval (str): The bar interval.
+            bars (dict): OHLCV arrays, oldest first.
+
+        Returns:
+            int: The number of bars written.
+        """
+        last = self.last_time(ticker, interval)
+        new = np.ones(len(bars["time"]), dtype=bool)
+        if last is not None:
+            new = np.asarray(bars["time"]) > last
+
+        records = np.empty(int(new.sum()), dtype=BAR_DTYPE)
+        for field in FIELDS:
+            records[field] = np.asarray(bars[field])[new]
+
+        if len(records):
+            with open(self.path(ticker, interval), "ab") as f:
+                f.write(records.tobytes())
+
+        return len(records)
+
+    def sync(self, ticker, interval, fetch, start=None, now=None):
+        """
+        Download the bars missing from the store and read a range.
+
+        Only closed bars are written; bars still being built are returned after
+        the stored ones but never persisted.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            interval (str): The bar interval.
+            fetch (callable): Called as fetch(since) with the newest stored bar time
+                (None when empty); returns OHLCV arrays from that time on.
+            start (int, optional): First bar time to return, as UNIX seconds.
+            now (float, optional): The current UNIX timestamp.
+
+        Returns:
+            dict: OHLCV arrays from start, including the bar being built.
+        """
+        now = time.time() if now is None else now
+        fresh = fetch(self.last_time(ticker, interval))
+
+        closed = np.asarray(fresh["time"]) + interval_seconds(interval) <= now
+        self.append(ticker, interval, {field: fresh[field][closed] for field in FIELDS})
+
+        stored = self.read(ticker, interval, start=start)
+        forming = {field: fresh[field][~closed] for field in FIELDS}
+        if len(stored["time"]):
+            # Drop anything the store already covers
+            keep = forming["time"] > stored["time"][-1]
+            forming = {field: values[keep] for field, values in forming.items()}
+
+        return concat_bars(stored, forming)
@@ -0,0 +1,237 @@
+# Import necessary libraries
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from barstore import BarStore
+from logger import *
+from settings import config, load_config
+from simbroker import SimulatedBroker, run_session, simulated_trader, synthetic_bars
+
+
+def recorded_bars(ticker, store=None):
+    """
+    Get the 5 and 30 minute bars of a ticker from the local bar store.
+
+    Falls back to synthetic bars when less than 10 days are stored, so the
+    suite also runs on machines that never downloaded anything.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        store (BarStore, optional): Where to read from. Defaults to config["barStoreFolder"].
+
+    Returns:
+        dict: (ticker, interval) -> OHLCV arrays, for SimulatedBroker.
+    """
+    store = store or BarStore(config["barStoreFolder"])
+    bars = {
+        (ticker, interval): {
+            field: np.array(values)
+            for field, values in store.read(ticker, interval).items()
+        }
+        for interval in ("5m", "30m")
+    }
+
+    if min(len(values["time"]) for values in bars.values()) < 130:
+        print(f"Not enough stored bars for {ticker}, using synthetic bars")
+        return synthetic_bars(ticker)
+    return bars
+
+
+def measure(func, iterations, warmup=5, alloc_iterations=None):
+    """
+    Time a call and trace its allocations.
+
+    Timing and allocation tracing are done in separate passes, tracemalloc
+    slows every allocation down and would skew the latencies.
+
+    Args:
+        func (callable): The call to measure, without arguments.
+        iterations (int): The number of timed calls.
+        warmup (int, optional): Untimed calls made first. Defaults to 5.
+        alloc_iterations (int, optional): Traced calls. Defaults to a tenth of iterations.
+
+    Returns:
+        dict: Latency percentiles in microseconds and the mean peak allocation in KiB.
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        started = time.perf_counter_ns()
+        func()
+        latencies[i] = time.perf_counter_ns() - started
+    latencies /= 1000
+
+    alloc_iterations = alloc_iterations or max(1, iterations // 10)
+    peaks = np.empty(alloc_iterations)
+    tracemalloc.start()
+    try:
+        for i in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func()
+            peaks[i] = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        "iterations": iterations,
+        "p50_us": float(p50),
+        "p90_us": float(p90),
+        "p99_us": float(p99),
+        "max_us": float(latencies.max()),
+        "peak_kib": float(peaks.mean() / 1024),
+    }
+
+
+def hot_paths(bars, ticker):
+    """
+    Build the benchmarked calls against a simulated broker halfway through the
+    replay, with bars and indicators already warm.
+
+    Returns:
+        dict: Benchmark name -> call without arguments.
+    """
+    base_times = bars[(ticker, "5m")]["time"]
+    broker = SimulatedBroker(bars, start=int(base_times[len(base_times) // 2]))
+    trader = simulated_trader(broker, ticker)
+
+    data = trader.load_historical_data(ticker, interval="5m", period="1d")
+    price = trader.get_last_close(ticker)
+
+    def decision_cycle():
+        # The filters of one Trader.run pass, each reading the cached bars
+        trend = trader.evaluate_general_trend(ticker)
+        trend = trend if trend != "no trend" else "long"
+        trader.evaluate_instant_trend(ticker, trend)
+        trader.evaluate_rsi(ticker, trend)
+        trader.evaluate_stochastic(ticker, trend)
+
+    def build_order():
+        trader.submit_order("limit", "long", ticker, 10, price)
+        broker.cancel_order_by_id(trader.order_id)
+
+    # Open a position for the position tick
+    trader.submit_order("market", "long", ticker, 10, price)
+    broker.sleep(300)
+    entry_price = trader.get_avg_entry_price(ticker)
+    stop_loss = trader.set_stoploss(entry_price, "long")
+    take_profit = trader.set_takeprofit(entry_price, "long")
+
+    def position_tick():
+        # Ticks are further apart than the position snapshot TTL
+        trader.positions.invalidate(ticker)
+        current_price = trader.get_current_price(ticker)
+        trader.is_exit_price(current_price, "long", stop_loss, take_profit)
+        trader.check_stochastic_crossing(ticker, "long")
+
+    return {
+        "indicators.sync": lambda: trader.indicators.sync(ticker, "5m", data),
+        "decision_cycle": decision_cycle,
+        "filter_snapshot": lambda: trader.evaluate_filters(ticker, "long"),
+        "submit_order": build_order,
+        "position_tick": position_tick,
+    }
+
+
+def run_benchmarks(bars, ticker, iterations=1000, sessions=20):
+    """
+    Measure every hot path and full simulated sessions.
+
+    Args:
+        bars (dict): (ticker, interval) -> OHLCV arrays, with '5m' and '30m' bars.
+        ticker (str): The ticker of the bars.
+        iterations (int, optional): Calls per hot path. Defaults to 1000.
+        sessions (int, optional): Simulated Trader.run sessions. Defaults to 20.
+
+    Returns:
+        dict: Benchmark name -> measurements (see measure).
+    """
+    results = {
+        name: measure(func, iterations)
+        for name, func in hot_paths(bars, ticker).items()
+    }
+    results["session"] = measure(
+        lambda: run_session(bars, ticker), sessions, warmup=1, alloc_iterations=2
+    )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Find the benchmarks whose median latency regressed past the tolerance.
+
+    Args:
+        results (dict): The current measurements.
+        baseline (dict): The saved measurements.
+        tolerance (float): The allowed slowdown, 0.25 being 25%.
+
+    Returns:
+        list: The names of the regressed benchmarks.
+    """
+    return [
+        name
+        for name, result in results.items()
+        if name in baseline
+        and result["p50_us"] > baseline[name]["p50_us"] * (1 + tolerance)
+    ]
+
+
+if __name__ == "__main__":
+    load_config()
+
+    parser = argparse.ArgumentParser(description="Benchmark the Trader hot paths")
+    parser.add_argument("ticker", nargs="?", default="SPY")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--baseline", default=config["benchmarkBaseline"])
+    parser.add_argument("--save", action="store_true", help="Save as the baseline")
+    parser.add_argument(
+        "--compare", action="store_true", help="Fail on regressions from the baseline"
+    )
+    args = parser.parse_args()
+
+    # Measure the code, not the log handlers
+    logging.disable(logging.CRITICAL)
+
+    results = run_benchmarks(
+        recorded_bars(args.ticker), args.ticker, args.iterations, args.sessions
+    )
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    print(
+        f"{'benchmark':<16}{'p50 us':>12}{'p90 us':>12}{'p99 us':>12}{'peak KiB':>12}{'vs base':>10}"
+    )
+    for name, result in results.items():
+        change = (
+            f"{result['p50_us'] / baseline[name]['p50_us'] - 1:+.0%}"
+            if name in baseline
+            else "-"
+        )
+        print(
+            f"{name:<16}{result['p50_us']:>12.1f}{result['p90_us']:>12.1f}"
+            f"{result['p99_us']:>12.1f}{result['peak_kib']:>12.1f}{change:>10}"
+        )
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        regressed = compare(results, baseline, config["benchmarkTolerance"])
+        if regressed:
+            print(f"Regressed: {', '.join(regressed)}")
+            sys.exit(1)
@@ -0,0 +1,150 @@
+# Import necessary libraries
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# Length of each yfinance interval in seconds
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "2m": 120,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "90m": 5400,
+    "1h": 3600,
+    "1d": 86400,
+    "5d": 432000,
+    "1wk": 604800,
+    "1mo": 2592000,
+    "3mo": 7776000,
+}
+
+
+def interval_seconds(interval):
+    """
+    Get the length of a bar interval in seconds.
+
+    Args:
+        interval (str): The bar interval (e.g. '1m', '5m', '30m', '1h', '1d').
+
+    Returns:
+        int: The number of seconds covered by one bar.
+
+    Raises:
+        ValueError: If the interval is not known.
+    """
+    try:
+        return INTERVAL_SECONDS[interval]
+    except KeyError:
+        raise ValueError(f"Unknown bar interval: {interval}")
+
+
+def next_bar_close(interval, now):
+    """
+    Get the time at which the bar currently being built will close.
+
+    Args:
+        interval (str): The bar interval (e.g. '5m', '30m').
+        now (float): The current UNIX timestamp.
+
+    Returns:
+        float: The UNIX timestamp of the next bar boundary.
+    """
+    seconds = interval_seconds(interval)
+    return (math.floor(now / seconds) + 1) * seconds
+
+
+class BarCache:
+    def __init__(self, loader, max_size=64, clock=time.time):
+        """
+        Initialize a bar cache shared by every filter of a trading cycle.
+
+        Entries are keyed by (ticker, interval, period) and stay valid until the
+        bar they were downloaded in closes, so every filter evaluated within the
+        same bar reads one snapshot. Concurrent requests for a key that is being
+        downloaded wait for that download instead of starting their own.
+
+        Args:
+            loader (callable): Called as loader(ticker, interval, period) on a miss.
+            max_size (int, optional): Maximum number of entries kept. Defaults to 64.
+            clock (callable, optional): Returns the current UNIX timestamp.
+        """
+        self.loader = loader
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, data)
+        self._in_flight = {}  # key -> threading.Event
+        self._lock = threading.Lock()
+
+    def get(self, ticker, interval, period):
+        """
+        Get the bars for a key, downloading them only if needed.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            interval (str): The time interval for data aggregation.
+            period (str): The period for which to retrieve data.
+
+        Returns:
+            The data returned by the loader for that key.
+
+        Raises:
+            Exception: Whatever the loader raises on a failed download.
+        """
+        key = (ticker, interval, period)
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+
+                event = self._in_flight.get(key)
+                if event is None:
+                    # Nobody is downloading this key, we do it
+                    event = threading.Event()
+                    self._in_flight[key] = event
+                    self.misses += 1
+                    break
+
+            # Someone else is downloading it, wait and check again
+            event.wait()
+
+        try:
+            data = self.loader(ticker, interval, period)
+            self.put(ticker, interval, period, data)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+        return data
+
+    def put(self, ticker, interval, period, data):
+        """
+        Store bars loaded elsewhere, e.g. by a batched download, until their bar closes.
+        """
+        key = (ticker, interval, period)
+        with self._lock:
+            self._entries[key] = (next_bar_close(interval, self.clock()), data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, ticker=None):
+        """
+        Drop cached entries.
+
+        Args:
+            ticker (str, optional): Only drop entries for this ticker. Defaults to all.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if ticker is None or key[0] == ticker:
+                    del self._entries[key]
@@ -0,0 +1,128 @@
+# Import necessary libraries
+import json
+import os
+import threading
+import time
+
+from logger import *
+
+# Order statuses after which an order will not fill any more
+CLOSED_ORDER_STATUSES = {
+    "filled",
+    "canceled",
+    "expired",
+    "rejected",
+    "done_for_day",
+    "replaced",
+}
+
+
+class CheckpointStore:
+    def __init__(self, folder="checkpoints", clock=time.time):
+        """
+        The state of every ticker's trade kept on disk, so a restarted bot
+        resumes its trades instead of starting over.
+
+        trades.json holds one entry per ticker with the stage of its trade and
+        what is needed to carry on (trend, order ID, quantity, entry price, stop
+        loss, take profit). indicators.json holds the indicator state shared by
+        every ticker. Files are written to a temporary file and renamed over the
+        old one, so a crash while saving leaves the previous checkpoint.
+
+        Args:
+            folder (str, optional): Where the files are kept. Defaults to 'checkpoints'.
+            clock (callable, optional): Returns the current UNIX timestamp.
+        """
+        self.folder = os.path.join(".", folder)
+        self.clock = clock
+        self._lock = threading.Lock()
+        os.makedirs(self.folder, exist_ok=True)
+        self._trades = self._read("trades.json") or {}
+
+    def _path(self, name):
+        return os.path.join(self.folder, name)
+
+    def _read(self, name):
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            return None
+
+    def _write(self, name, values):
+        path = self._path(name)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(values, f)
+        os.replace(temporary, path)
+
+    def get(self, ticker):
+        """
+        Get the saved trade of a ticker.
+
+        Returns:
+            dict: 'stage', 'saved_at' and the saved state, or None if there is none.
+        """
+        with self._lock:
+            state = self._trades.get(ticker)
+            return dict(state) if state is not None else None
+
+    def tickers(self):
+        """
+        Get the tickers with a saved trade.
+        """
+        with self._lock:
+            return list(self._trades)
+
+    def order_ids(self):
+        """
+        Get the IDs of the orders saved trades are waiting on: their entry or
+        exit order and the stop loss and take profit legs of their bracket.
+        """
+        with self._lock:
+            ids = set()
+            for state in self._trades.values():
+                if state.get("order_id") is not None:
+                    ids.add(state["order_id"])
+                ids.update((state.get("exit_legs") or {}).values())
+            return ids
+
+    def save(self, ticker, stage, **state):
+        """
+        Save the trade of a ticker, replacing the previous one.
+
+        Args:
+            ticker (str): The asset's ticker symbol.
+            stage (str): The stage of the trade (see scheduler.Stage).
+            **state: What is needed to resume it, JSON serializable.
+        """
+        with self._lock:
+            self._trades[ticker] = dict(state, stage=stage, saved_at=self.clock())
+            self._write("trades.json", self._trades)
+
+    def clear(self, ticker):
+        """
+        Forget the trade of a ticker, once it is closed or cannot be resumed.
+        """
+        with self._lock:
+            if self._trades.pop(ticker, None) is not None:
+                self._write("trades.json", self._trades)
+
+    def save_indicators(self, snapshot):
+        """
+        Save the indicator state (see IndicatorEngine.snapshot).
+        """
+        with self._lock:
+            self._write("indicators.json", snapshot)
+
+    def indicators(self):
+        """
+        Get the saved indicator state, or None if there is none.
+        """
+        with self._lock:
+            return self._read("indicators.json")
@@ -0,0 +1,305 @@
+# Import necessary libraries
+from datetime import datetime, timezone
+
+import numpy as np
+
+from barstore import BAR_DTYPE, FIELDS, bars_from_frame, period_start
+from metrics import timed
+
+# Alpaca bar sizes of the yfinance intervals
+ALPACA_TIMEFRAMES = {
+    "1m": "1Min",
+    "2m": "2Min",
+    "5m": "5Min",
+    "15m": "15Min",
+    "30m": "30Min",
+    "60m": "1Hour",
+    "1h": "1Hour",
+    "1d": "1Day",
+    "1wk": "1Week",
+    "1mo": "1Month",
+    "3mo": "3Month",
+}
+
+# Alpaca's historical stock bars and latest trade endpoints
+ALPACA_BARS_URL = "https://data.alpaca.markets/v2/stocks/bars"
+ALPACA_LATEST_TRADE_URL = "https://data.alpaca.markets/v2/stocks/{symbol}/trades/latest"
+
+# The regular trading session, in seconds after midnight New York time
+MARKET_OPEN = 9 * 3600 + 30 * 60
+MARKET_CLOSE = 16 * 3600
+
+
+def empty_bars():
+    """
+    Get OHLCV arrays without any bar.
+    """
+    records = np.empty(0, dtype=BAR_DTYPE)
+    return {field: records[field] for field in FIELDS}
+
+
+def regular_hours(bars):
+    """
+    Keep only the bars opening in the regular session, 9:30 to 16:00 New York
+    time, like the intraday bars of yfinance.
+
+    Args:
+        bars (dict): Intraday OHLCV arrays, oldest first.
+
+    Returns:
+        dict: The OHLCV arrays of the regular session bars.
+    """
+    from zoneinfo import ZoneInfo
+
+    times = bars["time"]
+    if not len(times):
+        return bars
+
+    # The New York UTC offset of every day the bars span, daylight saving included
+    new_york = ZoneInfo("America/New_York")
+    days, day = np.unique(times // 86400, return_inverse=True)
+    offsets = np.array(
+        [
+            datetime.fromtimestamp(int(d) * 86400 + 43200, tz=new_york)
+            .utcoffset()
+            .total_seconds()
+            for d in days
+        ],
+        dtype="int64",
+    )
+
+    seconds = (times + offsets[day]) % 86400
+    keep = (seconds >= MARKET_OPEN) & (seconds < MARKET_CLOSE)
+    if keep.all():
+        return bars
+    return {field: values[keep] for field, values in bars.items()}
+
+
+class DataSource:
+    """
+    Base class for where historical bars are downloaded from.
+
+    Subclasses implement bars_many(), which gets OHLCV arrays (see
+    barstore.bars_from_frame) for several tickers at once, and may override
+    bars() and last_price() when they can be fetched in a cheaper way.
+    """
+
+    def bars(self, ticker, interval, period, start=None):
+        """
+        Download the bars of one ticker.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            interval (str): The time interval for data aggregation.
+            period (str): The period for which to retrieve data.
+            start (datetime, optional): Download from this time instead of the whole period.
+
+        Returns:
+            dict: OHLCV arrays, oldest first.
+        """
+        return self.bars_many([ticker], interval, period, start).get(
+            ticker, empty_bars()
+        )
+
+    def bars_many(self, tickers, interval, period, start=None):
+        """
+        Download the bars of several tickers.
+
+        Returns:
+            dict: Ticker -> OHLCV arrays, for the tickers with data.
+        """
+        raise NotImplementedError
+
+    def last_price(self, ticker):
+        """
+        Get the latest traded price of a ticker, the close of its latest 1
+        minute bar.
+
+        Returns:
+            float: The price, or None if the ticker has not traded today.
+        """
+        close = self.bars(ticker, "1m", "1d")["close"]
+        return float(close[-1]) if len(close) else None
+
+
+class YFinanceSource(DataSource):
+    """
+    Bars scraped from Yahoo Finance by yfinance.
+    """
+
+    @timed("yfinance.history", count=True)
+    def bars(self, ticker, interval, period, start=None):
+        # yfinance (and pandas with it) is only imported once data is first needed
+        import yfinance as yf
+
+        ticker_data = yf.Ticker(ticker)
+        if start is not None:
+            return bars_from_frame(ticker_data.history(start=start, interval=interval))
+        return bars_from_frame(ticker_data.history(period=period, interval=interval))
+
+    @timed("yfinance.download", count=True)
+    def bars_many(self, tickers, interval, period, start=None):
+        import pandas as pd
+        import yfinance as yf
+
+        # Same adjustments and time zones as Ticker.history
+        data = yf.download(
+            list(tickers),
+            start=start,
+            period=period if start is None else None,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,
+            ignore_tz=False,
+            threads=True,
+            progress=False,
+            show_errors=False,
+        )
+
+        if not isinstance(data.columns, pd.MultiIndex):
+            frames = {tickers[0]: data}
+        else:
+            frames = {
+                ticker: data[ticker]
+                for ticker in tickers
+                if ticker in data.columns.get_level_values(0)
+            }
+
+        # Tickers are aligned on the same index, drop the rows a ticker has no bar in
+        frames = {
+            ticker: frame.dropna(subset=["Close"]) for ticker, frame in frames.items()
+        }
+        return {
+            ticker: bars_from_frame(frame)
+            for ticker, frame in frames.items()
+            if len(frame)
+        }
+
+
+class AlpacaSource(DataSource):
+    def __init__(self, api_key, secret_key, feed="iex", pool_size=16, timeout=10):
+        """
+        Bars from Alpaca's market data API.
+
+        Every request goes through one HTTP session of its own, so connections
+        are kept alive and reused, with up to pool_size of them open for
+        concurrent Traders. Responses are asked for gzip-compressed, and read as
+        raw JSON straight into arrays instead of being wrapped in models.
+
+        Intraday bars are kept to the regular session, pre and post-market bars
+        of the feed being dropped, so they match the bars of yfinance.
+
+        Args:
+            api_key (str): The Alpaca API key.
+            secret_key (str): The Alpaca secret API key.
+            feed (str, optional): The data feed, 'iex' or 'sip'. Defaults to 'iex'.
+            pool_size (int, optional): Connections kept open. Defaults to 16.
+            timeout (float, optional): Seconds to wait for a response. Defaults to 10.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.feed = feed
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+        self.session.headers.update(
+            {
+                "APCA-API-KEY-ID": api_key,
+                "APCA-API-SECRET-KEY": secret_key,
+                "Accept-Encoding": "gzip, deflate",
+            }
+        )
+
+    @staticmethod
+    def timeframe(interval):
+        """
+        Get the Alpaca timeframe of a yfinance interval, e.g. '5Min' for '5m'.
+
+        Raises:
+            ValueError: If Alpaca has no such bar size.
+        """
+        if interval not in ALPACA_TIMEFRAMES:
+            raise ValueError(f"Alpaca has no {interval} bars")
+        return ALPACA_TIMEFRAMES[interval]
+
+    def _get(self, params, url=ALPACA_BARS_URL):
+        """
+        Get one page of bars, or the answer of another market data endpoint.
+
+        Raises:
+            APIError: If Alpaca answered with an error status.
+        """
+        from alpaca.common.exceptions import APIError
+        from requests import HTTPError
+
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+        except HTTPError as http_error:
+            # Same error as the alpaca-py clients, see resilience.is_transient
+            raise APIError(response.text, http_error)
+        return response.json()
+
+    @timed("alpaca.bars", count=True)
+    def bars_many(self, tickers, interval, period, start=None):
+        if start is None:
+            first = period_start(period, datetime.now(timezone.utc).timestamp())
+            start = (
+                datetime.fromtimestamp(first, tz=timezone.utc)
+                if first is not None
+                else None
+            )
+
+        timeframe = self.timeframe(interval)
+        params = {
+            "symbols": ",".join(tickers),
+            "timeframe": timeframe,
+            "adjustment": "all",
+            "feed": self.feed,
+            "limit": 10000,
+        }
+        if start is not None:
+            params["start"] = start.astimezone(timezone.utc).strftime(
+                "%Y-%m-%dT%H:%M:%SZ"
+            )
+
+        # Pages hold up to limit bars across the symbols, in symbol order
+        rows_by_ticker = {}
+        while True:
+            page = self._get(params)
+            for ticker, rows in (page.get("bars") or {}).items():
+                rows_by_ticker.setdefault(ticker, []).extend(rows)
+            if not page.get("next_page_token"):
+                break
+            params["page_token"] = page["next_page_token"]
+
+        intraday = timeframe.endswith(("Min", "Hour"))
+        bars = {}
+        for ticker, rows in rows_by_ticker.items():
+            ticker_bars = self._to_bars(rows)
+            if intraday:
+                ticker_bars = regular_hours(ticker_bars)
+            if len(ticker_bars["time"]):
+                bars[ticker] = ticker_bars
+        return bars
+
+    @timed("alpaca.latest_trade", count=True)
+    def last_price(self, ticker):
+        url = ALPACA_LATEST_TRADE_URL.format(symbol=ticker)
+        trade = self._get({"feed": self.feed}, url=url).get("trade")
+        return float(trade["p"]) if trade else None
+
+    @staticmethod
+    def _to_bars(rows):
+        # 't' is the bar open in RFC 3339, e.g. '2023-05-01T13:30:00Z'
+        return {
+            "time": np.array(
+                [row["t"][:19] for row in rows], dtype="datetime64[s]"
+            ).astype("int64"),
+            "open": np.array([row["o"] for row in rows], dtype=float),
+            "high": np.array([row["h"] for row in rows], dtype=float),
+            "low": np.array([row["l"] for row in rows], dtype=float),
+            "close": np.array([row["c"] for row in rows], dtype=float),
+            "volume": np.array([row["v"] for row in rows], dtype=float),
+        }
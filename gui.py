@@ -5,6 +5,8 @@ import customtkinter
 import tkinter.messagebox as msgbox
 from tkinter import Label
 
+from settings import config
+
 
 class PocketTraderGUI(customtkinter.CTk):
     def __init__(self):
@@ -109,7 +111,7 @@ class PocketTraderGUI(customtkinter.CTk):
 
     def update_config(self):
         # Read the existing config data
-        with open("config.json", "r") as f:
+        with open(config.path, "r") as f:
             config_data = json.load(f)
 
         # Update values based on GUI entries
@@ -144,7 +146,7 @@ class PocketTraderGUI(customtkinter.CTk):
 
         # Write the updated data back to the config file
         try:
-            with open("config.json", "w") as f:
+            with open(config.path, "w") as f:
                 json.dump(config_data, f, indent=4)
             msgbox.showinfo("Success", "Configuration updated successfully!")
         except Exception as e:
@@ -0,0 +1,433 @@
+# Import necessary libraries
+import copy
+import json
+import math
+import threading
+from collections import deque, namedtuple
+
+import numpy as np
+
+# Latest indicator readings for one ticker and interval
+IndicatorValues = namedtuple(
+    "IndicatorValues", ["ema_fast", "ema_mid", "ema_slow", "rsi", "stoch_k", "stoch_d"]
+)
+
+
+class EMA:
+    def __init__(self, period):
+        """
+        Exponential moving average, seeded with the first value like tulipy.
+
+        Args:
+            period (int): The number of samples of the moving average.
+        """
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = None
+
+    def update(self, close):
+        if self.value is None:
+            self.value = close
+        else:
+            self.value = (close - self.value) * self.alpha + self.value
+        return self.value
+
+    def peek(self, close):
+        if self.value is None:
+            return close
+        return (close - self.value) * self.alpha + self.value
+
+
+class RSI:
+    def __init__(self, period=14):
+        """
+        Relative Strength Index with Wilder smoothing, like tulipy.
+
+        Args:
+            period (int, optional): The window of the RSI. Defaults to 14.
+        """
+        self.period = period
+        self.prev_close = None
+        self.count = 0
+        self.smooth_up = 0.0
+        self.smooth_down = 0.0
+
+    def update(self, close):
+        if self.prev_close is None:
+            self.prev_close = close
+            return None
+
+        upward = max(close - self.prev_close, 0.0)
+        downward = max(self.prev_close - close, 0.0)
+        self.prev_close = close
+        self.count += 1
+
+        if self.count < self.period:
+            # Still summing up the first window
+            self.smooth_up += upward
+            self.smooth_down += downward
+            return None
+        elif self.count == self.period:
+            self.smooth_up = (self.smooth_up + upward) / self.period
+            self.smooth_down = (self.smooth_down + downward) / self.period
+        else:
+            self.smooth_up += (upward - self.smooth_up) / self.period
+            self.smooth_down += (downward - self.smooth_down) / self.period
+
+        total = self.smooth_up + self.smooth_down
+        return 100.0 * self.smooth_up / total if total else math.nan
+
+    def peek(self, close):
+        # The state is only scalars, a shallow copy is enough
+        return copy.copy(self).update(close)
+
+
+class Stochastic:
+    def __init__(self, k_period=9, k_slowing=6, d_period=9):
+        """
+        Stochastic oscillator (slow %K and %D), like tulipy's stoch.
+
+        Args:
+            k_period (int, optional): The %K lookback. Defaults to 9.
+            k_slowing (int, optional): The %K smoothing. Defaults to 6.
+            d_period (int, optional): The %D smoothing. Defaults to 9.
+        """
+        self.highs = deque(maxlen=k_period)
+        self.lows = deque(maxlen=k_period)
+        self.fast_k = deque(maxlen=k_slowing)
+        self.slow_k = deque(maxlen=d_period)
+
+    def update(self, high, low, close):
+        self.highs.append(high)
+        self.lows.append(low)
+        if len(self.highs) < self.highs.maxlen:
+            return None
+
+        highest, lowest = max(self.highs), min(self.lows)
+        diff = highest - lowest
+        self.fast_k.append(100 * (close - lowest) / diff if diff else 0.0)
+        if len(self.fast_k) < self.fast_k.maxlen:
+            return None
+
+        k = sum(self.fast_k) / len(self.fast_k)
+        self.slow_k.append(k)
+        if len(self.slow_k) < self.slow_k.maxlen:
+            return None
+
+        return k, sum(self.slow_k) / len(self.slow_k)
+
+    def peek(self, high, low, close):
+        # Shallow copies of the windows are enough, they only hold floats
+        state = Stochastic.__new__(Stochastic)
+        state.highs, state.lows = self.highs.copy(), self.lows.copy()
+        state.fast_k, state.slow_k = self.fast_k.copy(), self.slow_k.copy()
+        return state.update(high, low, close)
+
+
+class IndicatorSet:
+    def __init__(self, ema_periods=(9, 26, 50), rsi_period=14, stoch_periods=(9, 6, 9)):
+        """
+        All the indicators used by the strategy for one ticker and interval.
+
+        Args:
+            ema_periods (tuple, optional): Fast, mid and slow EMA periods.
+            rsi_period (int, optional): The RSI window.
+            stoch_periods (tuple, optional): The stochastic %K, slowing and %D periods.
+        """
+        self.emas = [EMA(period) for period in ema_periods]
+        self.rsi = RSI(rsi_period)
+        self.stoch = Stochastic(*stoch_periods)
+
+    @staticmethod
+    def _values(emas, rsi, stoch):
+        stoch_k, stoch_d = stoch if stoch is not None else (None, None)
+        return IndicatorValues(*emas, rsi, stoch_k, stoch_d)
+
+    def update(self, high, low, close):
+        """
+        Add a closed bar and get the new readings.
+        """
+        return self._values(
+            [ema.update(close) for ema in self.emas],
+            self.rsi.update(close),
+            self.stoch.update(high, low, close),
+        )
+
+    def peek(self, high, low, close):
+        """
+        Get the readings including a bar that has not closed yet.
+        """
+        return self._values(
+            [ema.peek(close) for ema in self.emas],
+            self.rsi.peek(close),
+            self.stoch.peek(high, low, close),
+        )
+
+    def warm_up(self, highs, lows, closes):
+        """
+        Feed a history of closed bars, oldest first.
+        """
+        for high, low, close in zip(highs, lows, closes):
+            self.update(high, low, close)
+
+    def state(self):
+        """
+        Get the state as plain numbers and lists, e.g. to save it as JSON.
+        """
+        rsi, stoch = self.rsi, self.stoch
+        return {
+            "emas": [ema.value for ema in self.emas],
+            "rsi": [rsi.prev_close, rsi.count, rsi.smooth_up, rsi.smooth_down],
+            "stoch": [
+                list(window)
+                for window in (stoch.highs, stoch.lows, stoch.fast_k, stoch.slow_k)
+            ],
+        }
+
+    def load_state(self, state):
+        """
+        Replace the state with one returned by state().
+        """
+        for ema, value in zip(self.emas, state["emas"]):
+            ema.value = value
+
+        rsi = self.rsi
+        rsi.prev_close, rsi.count, rsi.smooth_up, rsi.smooth_down = state["rsi"]
+
+        stoch = self.stoch
+        for window, values in zip(
+            (stoch.highs, stoch.lows, stoch.fast_k, stoch.slow_k), state["stoch"]
+        ):
+            window.clear()
+            window.extend(values)
+
+
+class IndicatorEngine:
+    def __init__(self, **periods):
+        """
+        Keep one IndicatorSet per (ticker, interval) and update it bar by bar.
+
+        Args:
+            **periods: Passed to every IndicatorSet that is created.
+        """
+        self.periods = periods
+        self._states = {}  # (ticker, interval) -> [IndicatorSet, last closed bar time]
+        self._lock = threading.Lock()
+
+    def sync(self, ticker, interval, data):
+        """
+        Bring the indicators up to date with downloaded bars and read them.
+
+        Every bar except the last one is considered closed; closed bars newer than
+        the ones already seen are added to the state. The last bar is still being
+        built, so it is only used for the returned readings.
+
+        Args:
+            ticker (str): The ticker symbol of the asset.
+            interval (str): The bar interval of the data.
+            data (Bars): Bars with time, high, low and close arrays, oldest first.
+
+        Returns:
+            IndicatorValues: The latest readings (None where still warming up).
+        """
+        times, highs, lows, closes = data.time, data.high, data.low, data.close
+
+        with self._lock:
+            key = (ticker, interval)
+            if key not in self._states:
+                self._states[key] = [IndicatorSet(**self.periods), None]
+            state = self._states[key]
+
+            # Closed bars newer than the last one seen
+            first = 0 if state[1] is None else np.searchsorted(times, state[1], "right")
+            for i in range(first, len(closes) - 1):
+                state[0].update(highs[i], lows[i], closes[i])
+                state[1] = times[i]
+
+            return state[0].peek(highs[-1], lows[-1], closes[-1])
+
+    def snapshot(self):
+        """
+        Get the state of every ticker and interval, e.g. to save it as JSON.
+
+        Returns:
+            dict: The periods and one [ticker, interval, last closed bar time,
+                IndicatorSet state] entry per state.
+        """
+        with self._lock:
+            return {
+                "periods": self.periods,
+                "states": [
+                    [ticker, interval, int(last), indicators.state()]
+                    for (ticker, interval), (indicators, last) in self._states.items()
+                    if last is not None
+                ],
+            }
+
+    def restore(self, snapshot):
+        """
+        Load the states of a snapshot, so the next sync only adds the bars that
+        closed since. Snapshots taken with other periods are ignored.
+
+        Args:
+            snapshot (dict): Returned by snapshot().
+
+        Returns:
+            int: The number of states restored.
+        """
+        periods = json.loads(json.dumps(self.periods))
+        if snapshot is None or snapshot["periods"] != periods:
+            return 0
+
+        with self._lock:
+            for ticker, interval, last, state in snapshot["states"]:
+                indicators = IndicatorSet(**self.periods)
+                indicators.load_state(state)
+                self._states[(ticker, interval)] = [indicators, last]
+            return len(snapshot["states"])
+
+    def reset(self, ticker=None):
+        """
+        Forget the indicator state.
+
+        Args:
+            ticker (str, optional): Only forget this ticker. Defaults to all.
+        """
+        with self._lock:
+            for key in list(self._states):
+                if ticker is None or key[0] == ticker:
+                    del self._states[key]
+
+
+def _exp_smooth(values, alpha, initial):
+    """
+    Compute y[t] = y[t-1] + alpha * (x[t] - y[t-1]) with y[-1] = initial.
+
+    The recursion is solved in closed form over blocks of bars, so the work is
+    done by NumPy instead of a Python loop over every bar. Time runs along the
+    first axis, a 2D array holds one series per column.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.empty_like(values)
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    # Keep decay ** -block within a safe floating point range
+    block = max(1, int(50.0 / -math.log(decay)) + 1)
+    powers = (decay ** np.arange(block)).reshape((-1,) + (1,) * (values.ndim - 1))
+    previous = initial
+
+    for start in range(0, len(values), block):
+        chunk = values[start : start + block]
+        n = len(chunk)
+        scaled = np.cumsum(chunk / powers[:n], axis=0)
+        out[start : start + n] = (
+            decay * powers[:n] * previous + alpha * powers[:n] * scaled
+        )
+        previous = out[start + n - 1]
+
+    return out
+
+
+def _rolling_mean(values, period):
+    """
+    Mean over the last period values along the first axis, NaN until the
+    window is full.
+    """
+    out = np.full(values.shape, np.nan)
+    if len(values) >= period:
+        sums = np.cumsum(np.insert(values, 0, 0.0, axis=0), axis=0)
+        out[period - 1 :] = (sums[period:] - sums[:-period]) / period
+    return out
+
+
+def ema_series(close, period):
+    """
+    Vectorized EMA over a whole array, matching tulipy's ema.
+
+    Args:
+        close (ndarray): The close prices, oldest first, or one column per ticker.
+        period (int): The number of samples of the moving average.
+
+    Returns:
+        ndarray: The EMA at every bar.
+    """
+    close = np.asarray(close, dtype=float)
+    if len(close) == 0:
+        return close.copy()
+    return _exp_smooth(close, 2 / (period + 1), close[0])
+
+
+def rsi_series(close, period=14):
+    """
+    Vectorized RSI over a whole array, matching tulipy's rsi.
+
+    Args:
+        close (ndarray): The close prices, oldest first, or one column per ticker.
+        period (int, optional): The window of the RSI. Defaults to 14.
+
+    Returns:
+        ndarray: The RSI at every bar, NaN for the first period bars.
+    """
+    close = np.asarray(close, dtype=float)
+    out = np.full(close.shape, np.nan)
+    if len(close) <= period:
+        return out
+
+    diff = np.diff(close, axis=0)
+    upward, downward = np.maximum(diff, 0.0), np.maximum(-diff, 0.0)
+
+    first_up, first_down = upward[:period].mean(axis=0), downward[:period].mean(axis=0)
+    smooth_up = np.concatenate(
+        (first_up[np.newaxis], _exp_smooth(upward[period:], 1 / period, first_up))
+    )
+    smooth_down = np.concatenate(
+        (
+            first_down[np.newaxis],
+            _exp_smooth(downward[period:], 1 / period, first_down),
+        )
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[period:] = 100.0 * smooth_up / (smooth_up + smooth_down)
+    return out
+
+
+def stoch_series(high, low, close, k_period=9, k_slowing=6, d_period=9):
+    """
+    Vectorized stochastic oscillator over whole arrays, matching tulipy's stoch.
+
+    Args:
+        high (ndarray): The high prices, oldest first, or one column per ticker.
+        low (ndarray): The low prices, same shape.
+        close (ndarray): The close prices, same shape.
+        k_period (int, optional): The %K lookback. Defaults to 9.
+        k_slowing (int, optional): The %K smoothing. Defaults to 6.
+        d_period (int, optional): The %D smoothing. Defaults to 9.
+
+    Returns:
+        tuple: The slow %K and %D at every bar, NaN while warming up.
+    """
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    size = len(close)
+    start = k_period + k_slowing + d_period - 3
+    stoch_k, stoch_d = np.full(close.shape, np.nan), np.full(close.shape, np.nan)
+    if size <= start:
+        return stoch_k, stoch_d
+
+    windows = np.lib.stride_tricks.sliding_window_view
+    highest = windows(high, k_period, axis=0).max(axis=-1)
+    lowest = windows(low, k_period, axis=0).min(axis=-1)
+    diff = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fast_k = np.where(diff != 0, 100 * (close[k_period - 1 :] - lowest) / diff, 0.0)
+
+    slow_k = _rolling_mean(fast_k, k_slowing)
+    slow_d = _rolling_mean(slow_k[k_slowing - 1 :], d_period)
+
+    offset = k_period - 1
+    stoch_k[start:] = slow_k[start - offset :]
+    stoch_d[start:] = slow_d[start - offset - (k_slowing - 1) :]
+    return stoch_k, stoch_d
@@ -1,9 +1,126 @@
+import atexit
+import contextvars
+import gzip
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+# What the current thread or task is working on, added to every log record
+_log_ticker = contextvars.ContextVar("log_ticker", default=None)
+_log_stage = contextvars.ContextVar("log_stage", default=None)
+_log_stage_started = contextvars.ContextVar("log_stage_started", default=None)
+
+# The background writer, once logging is initialized
+_listener = None
+
+
+def set_log_context(ticker=None, stage=None):
+    """
+    Tag the following log records of this thread or task with a ticker and stage.
+
+    Returns:
+        tuple: Tokens to give to reset_log_context.
+    """
+    return (
+        _log_ticker.set(ticker),
+        _log_stage.set(stage),
+        _log_stage_started.set(time.perf_counter()),
+    )
+
+
+def reset_log_context(tokens):
+    for var, token in zip((_log_ticker, _log_stage, _log_stage_started), tokens):
+        var.reset(token)
+
+
+@contextmanager
+def log_context(ticker=None, stage=None):
+    """
+    Tag the log records emitted inside the block with a ticker and stage.
+    """
+    tokens = set_log_context(ticker, stage)
+    try:
+        yield
+    finally:
+        reset_log_context(tokens)
+
+
+class ContextFilter(logging.Filter):
+    def filter(self, record):
+        # Runs on the emitting thread, where the context is known
+        started = _log_stage_started.get()
+        record.ticker = _log_ticker.get()
+        record.stage = _log_stage.get()
+        record.stage_elapsed = (
+            round(time.perf_counter() - started, 6) if started is not None else None
+        )
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 6),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+            "ticker": getattr(record, "ticker", None),
+            "stage": getattr(record, "stage", None),
+            "stage_elapsed": getattr(record, "stage_elapsed", None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    # Rotated files are compressed, only the live file is plain text
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def initialize_logging(
+    log_level=logging.DEBUG,
+    log_folder="logs",
+    max_bytes=10 * 1024 * 1024,
+    backup_count=20,
+    structured=True,
+):
+    """
+    Send log records through a queue to a background writer.
+
+    The trading threads only put records on a queue; a listener thread writes
+    them to a size-rotated file (older files gzip-compressed) and the console.
+    File records are JSON lines with the ticker, stage and time spent in the
+    stage; the console stays human-readable.
+
+    Args:
+        log_level (int, optional): The minimum level logged. Defaults to DEBUG.
+        log_folder (str, optional): Where the log files go. Defaults to 'logs'.
+        max_bytes (int, optional): The size a file is rotated at. Defaults to 10 MB.
+        backup_count (int, optional): The rotated files kept. Defaults to 20.
+        structured (bool, optional): Write JSON lines instead of text. Defaults to True.
+
+    Returns:
+        QueueListener: The background writer.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
 
-def initialize_logging(log_level=logging.DEBUG, log_folder="logs"):
     # Create a logs directory if it doesn't already exist
     log_path = os.path.join(".", log_folder)
     os.makedirs(log_path, exist_ok=True)
@@ -13,11 +130,42 @@ def initialize_logging(log_level=logging.DEBUG, log_folder="logs"):
     log_name = datetime.now().strftime("%Y-%m-%d_%H-%M-%S.log")
     log_file = os.path.join(log_path, log_name)
 
-    logging.basicConfig(
-        filename=log_file,
-        format="%(asctime)s - %(levelname)s: %(message)s",
-        encoding="utf-8",
-        level=log_level,
+    text_format = "%(asctime)s - %(levelname)s: %(message)s"
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    file_handler.namer = _gzip_namer
+    file_handler.rotator = _gzip_rotator
+    file_handler.setFormatter(
+        JsonFormatter() if structured else logging.Formatter(text_format)
     )
 
-    logging.getLogger().addHandler(logging.StreamHandler())
+    console_handler = logging.StreamHandler()
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(log_level)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    # Write what is still queued when the program exits
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """
+    Write the queued records and stop the background writer.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,21 +1,12 @@
 # encoding: utf-8
+import argparse
+import asyncio
 import sys
-import time
-import json
 
-# Importing API
-from alpaca.trading.client import TradingClient
-from alpaca.data import CryptoHistoricalDataClient, StockHistoricalDataClient
-from alpaca.data.live import StockDataStream
-
-# Importing necessary files
+# Importing necessary files, the heavy ones are imported when they are needed
+from checkpoint import CLOSED_ORDER_STATUSES
 from logger import *
-from PocketTrader import Trader
-from GUI import PocketTraderGUI
-
-# Open the JSON file for reading
-with open("config.json", "r") as f:
-    config = json.load(f)
+from settings import config, load_config
 
 
 def check_account_status(api):
@@ -23,23 +14,42 @@ def check_account_status(api):
         account = api.get_account()
         if account.status != "ACTIVE":
             logging.info("The account is not ACTIVE, aborting")
-            sys.exit()
+            sys.exit(1)
     except Exception as e:
         logging.error("Could not get account info, aborting")
         logging.info(str(e))
-        sys.exit()
+        sys.exit(1)
 
 
-def cancel_all_orders(api):
+def cancel_all_orders(api, keep=()):
     logging.info("Cancelling all orders...")
 
     try:
-        api.cancel_orders()
-        logging.info("All orders cancelled")
+        if not keep:
+            api.cancel_orders()
+        else:
+            # The orders of resumed trades are still waited on
+            for order in api.get_orders():
+                if str(order.id) not in keep:
+                    cancel_order(api, order.id)
+        logging.info(f"All orders cancelled, kept {len(keep)} of saved trades")
     except Exception as e:
         logging.error("Could not cancel all orders")
         logging.error(e)
-        sys.exit()
+        sys.exit(1)
+
+
+def cancel_order(api, order_id):
+    """
+    Cancel an open order, unless it closed meanwhile (e.g. a bracket leg
+    cancelled with its entry).
+    """
+    try:
+        api.cancel_order_by_id(order_id)
+    except Exception:
+        status = api.get_order_by_id(order_id).status
+        if str(getattr(status, "value", status)).lower() not in CLOSED_ORDER_STATUSES:
+            raise
 
 
 def is_asset_tradable(api, ticker):
@@ -50,57 +60,168 @@ def is_asset_tradable(api, ticker):
             return True
         else:
             logging.info("Asset exists but not tradable, exiting")
-            sys.exit()
+            sys.exit(1)
     except Exception as e:
         logging.error("Asset does not exist or something happened!")
         logging.error(e)
-        sys.exit()
-
+        sys.exit(1)
 
-def main():
-    # Always open the GUI at startup
-    gui = PocketTraderGUI()
-    gui.mainloop()
 
-    # Reload the config file after GUI closes
-    with open("config.json", "r") as f:
-        config = json.load(f)
+def ask_settings():
+    """
+    Open the GUI to set the API keys and settings, until the keys are set.
+    """
+    from gui import PocketTraderGUI
 
-    # Check if API keys are not empty
-    while not config["API_KEY"] or not config["SECRET_KEY"]:
-        print("API keys are missing. Please enter valid API keys.")
+    while True:
         gui = PocketTraderGUI()
         gui.mainloop()
-        with open("config.json", "r") as f:
-            config = json.load(f)
 
-    # paper=True enables paper trading
-    api = TradingClient(config["API_KEY"], config["SECRET_KEY"], paper=True)
+        # Reload the config file after GUI closes
+        load_config()
+        if config["API_KEY"] and config["SECRET_KEY"]:
+            return
 
-    # keys required - real time data for later
-    # stock_stream = StockDataStream(config["API_KEY"], config["SECRET_KEY"])
-
-    initialize_logging()
-
-    check_account_status(api)
-
-    cancel_all_orders(api)
-
-    ticker = config["ticker"]
+        print("API keys are missing. Please enter valid API keys.")
 
-    is_asset_tradable(api, ticker)
 
-    trader = Trader(ticker, api)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run PocketTrader")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Skip the GUI and trade with the settings file as it is",
+    )
+    parser.add_argument(
+        "--config", default=None, help="The settings file. Defaults to config.json"
+    )
+    parser.add_argument(
+        "tickers", nargs="*", help="Tickers to trade instead of the configured ones"
+    )
+    args = parser.parse_args(argv)
+
+    load_config(args.config)
+
+    if not args.headless:
+        # Always open the GUI at startup
+        ask_settings()
+    elif not config["API_KEY"] or not config["SECRET_KEY"]:
+        print(f"API keys are missing in {config.path}, aborting")
+        sys.exit(2)
+
+    from alpaca.trading.client import TradingClient
+
+    from metrics import CallbackCounter, InstrumentedClient, registry, start_server
+    from positions import PositionCache
+    from PocketTrader import (
+        Trader,
+        get_checkpoint_store,
+        get_indicator_engine,
+        get_resilience,
+        warm_up,
+    )
+    from resilience import ResilientClient
+    from scheduler import run_pipelines
+
+    # paper=True enables paper trading, every call is timed and counted, and
+    # retried with backoff behind a circuit breaker per endpoint
+    api = ResilientClient(
+        InstrumentedClient(
+            TradingClient(config["API_KEY"], config["SECRET_KEY"], paper=True)
+        ),
+        get_resilience(),
+    )
+
+    initialize_logging(
+        max_bytes=config["logMaxBytes"],
+        backup_count=config["logBackupCount"],
+        structured=config["logJson"],
+    )
+
+    # Stage latencies and call counters for Prometheus
+    if config["metricsPort"]:
+        start_server(config["metricsPort"])
 
-    while True:
-        trading_success = trader.run(ticker)
+    check_account_status(api)
 
-        if not trading_success:
-            logging.info("Trading was not successful, locking asset")
-            time.sleep(config["sleepTimeME"])
-        else:
-            logging.info("Trading was successful!")
-            time.sleep(config["sleepTimeME"])
+    # Trades saved before a restart are resumed, with their orders
+    checkpoints = get_checkpoint_store()
+    cancel_all_orders(api, keep=checkpoints.order_ids())
+
+    # Trade the given tickers, the best screened ones, the ticker list, or the
+    # single GUI ticker
+    tickers = args.tickers
+    if not tickers and config["screenerUniverse"]:
+        from screener import screen
+
+        candidates = screen(config["screenerUniverse"], config["screenerTop"])
+        logging.info(f"Screener candidates: {[c.ticker for c in candidates]}")
+        tickers = [candidate.ticker for candidate in candidates]
+    tickers = tickers or config["tickers"] or [config["ticker"]]
+
+    # A saved trade is carried on even if its ticker was not picked this time
+    tickers += [ticker for ticker in checkpoints.tickers() if ticker not in tickers]
+
+    for ticker in tickers:
+        is_asset_tradable(api, ticker)
+
+    # Real time prices to check stop loss and take profit as trades happen
+    price_monitor = None
+    if config["streamPrices"]:
+        from stream import AlpacaTransport, PriceMonitor
+
+        transport = AlpacaTransport(config["API_KEY"], config["SECRET_KEY"])
+        price_monitor = PriceMonitor(transport, tickers)
+        price_monitor.start()
+
+    # One position snapshot per ticker and TTL, whichever check asks first
+    positions = PositionCache(api, ttl=config["positionCacheTTL"])
+    registry.register(
+        CallbackCounter(
+            "pockettrader_position_cache_hits_total",
+            "Position reads served from a snapshot.",
+            lambda: positions.hits,
+        )
+    )
+    registry.register(
+        CallbackCounter(
+            "pockettrader_position_cache_misses_total",
+            "Position reads that went to the broker.",
+            lambda: positions.misses,
+        )
+    )
+
+    # Fills and cancels are pushed by the broker instead of polled
+    orders = None
+    if config["streamTradeUpdates"]:
+        from orders import AlpacaTradeUpdates, OrderTracker
+
+        orders = OrderTracker(
+            AlpacaTradeUpdates(config["API_KEY"], config["SECRET_KEY"], paper=True)
+        )
+        orders.add_listener(lambda state: positions.invalidate(state.symbol))
+        orders.start()
+
+    # Indicators pick up from the saved state, then every ticker's starting
+    # bars come in a few batched downloads of what is missing
+    restored = get_indicator_engine().restore(checkpoints.indicators())
+    logging.info(f"Restored {restored} indicator states")
+    warm_up(tickers)
+
+    traders = [
+        Trader(
+            ticker,
+            api,
+            price_monitor=price_monitor,
+            positions=positions,
+            orders=orders,
+            checkpoints=checkpoints,
+        )
+        for ticker in tickers
+    ]
+
+    # Every ticker runs as a coroutine on the same event loop
+    asyncio.run(run_pipelines(traders))
 
 
 if __name__ == "__main__":
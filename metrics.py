@@ -0,0 +1,309 @@
+# Import necessary libraries
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from logger import *
+
+# Histogram buckets in seconds, from an in-memory indicator update to a long wait
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    300,
+    1800,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        """
+        A value that only goes up, one per combination of label values.
+
+        Args:
+            name (str): The metric name.
+            help (str): The description shown on the endpoint.
+            labelnames (tuple, optional): The label names.
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class CallbackCounter:
+    def __init__(self, name, help, func):
+        """
+        A counter read from somewhere else when the endpoint is scraped, e.g.
+        the hits of a cache.
+
+        Args:
+            name (str): The metric name.
+            help (str): The description shown on the endpoint.
+            func (callable): Returns the current value.
+        """
+        self.name = name
+        self.help = help
+        self.func = func
+
+    def render(self):
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {self.func()}",
+        ]
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        A distribution of observed values, one per combination of label values.
+
+        Args:
+            name (str): The metric name.
+            help (str): The description shown on the endpoint.
+            labelnames (tuple, optional): The label names.
+            buckets (tuple, optional): The bucket upper bounds. Defaults to DEFAULT_BUCKETS.
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry = self._values[key]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels):
+        entry = self._values.get(tuple(labels[name] for name in self.labelnames))
+        return entry[2] if entry else 0
+
+    def render(self):
+        names = self.labelnames + ("le",)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    lines.append(
+                        f"{self.name}_bucket{_labels(names, key + (bound,))} {cumulative}"
+                    )
+                lines.append(
+                    f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {count}"
+                )
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+                lines.append(
+                    f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+                )
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        """
+        The metrics exposed on the endpoint.
+        """
+        self.metrics = {}  # name -> metric
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        Add a metric, replacing any metric of the same name.
+        """
+        with self._lock:
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """
+        Get every metric in the Prometheus text format.
+        """
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+# Metrics shared by every Trader
+registry = Registry()
+
+STAGE_SECONDS = registry.register(
+    Histogram(
+        "pockettrader_stage_seconds",
+        "Time spent in each stage of a trading operation, waits included.",
+        ["ticker", "stage"],
+    )
+)
+CALL_SECONDS = registry.register(
+    Histogram(
+        "pockettrader_call_seconds",
+        "Latency of broker, data and indicator calls.",
+        ["call"],
+    )
+)
+API_CALLS = registry.register(
+    Counter(
+        "pockettrader_api_calls_total",
+        "Broker and data calls by outcome.",
+        ["call", "outcome"],
+    )
+)
+RETRIES = registry.register(
+    Counter(
+        "pockettrader_retries_total",
+        "Checks and calls that did not pass and are tried again.",
+        ["step"],
+    )
+)
+BREAKER_OPENS = registry.register(
+    Counter(
+        "pockettrader_circuit_opens_total",
+        "Circuit breakers opened after repeated failures of an endpoint.",
+        ["endpoint"],
+    )
+)
+
+
+@contextmanager
+def span(stage, ticker=""):
+    """
+    Time a stage of a trading operation into STAGE_SECONDS, tagging the log
+    records emitted meanwhile with the ticker and stage.
+    """
+    started = time.perf_counter()
+    try:
+        with log_context(ticker, stage):
+            yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, ticker=ticker, stage=stage)
+
+
+def timed(call, count=False):
+    """
+    Decorator timing every call of a function into CALL_SECONDS.
+
+    Args:
+        call (str): The call label.
+        count (bool, optional): Also count it in API_CALLS by outcome. Defaults to False.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                CALL_SECONDS.observe(time.perf_counter() - started, call=call)
+                if count:
+                    API_CALLS.inc(call=call, outcome=outcome)
+
+        return wrapper
+
+    return decorator
+
+
+class InstrumentedClient:
+    def __init__(self, api, prefix="broker"):
+        """
+        Wrap a TradingClient so every method call is timed and counted.
+
+        Args:
+            api: The client to wrap.
+            prefix (str, optional): Prepended to the call labels. Defaults to 'broker'.
+        """
+        self._api = api
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attribute = getattr(self._api, name)
+        if not callable(attribute):
+            return attribute
+        return timed(f"{self._prefix}.{name}", count=True)(attribute)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are too frequent to be logged
+        pass
+
+
+def start_server(port, host="127.0.0.1"):
+    """
+    Serve the metrics on http://host:port/metrics from a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The server, call shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever, name="MetricsServer", daemon=True
+    ).start()
+    logging.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+    return server
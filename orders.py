@@ -0,0 +1,183 @@
+# Import necessary libraries
+import threading
+
+# Importing API
+from alpaca.trading.stream import TradingStream
+
+from logger import *
+
+# Trade update events after which an order will not change any more
+FINAL_EVENTS = {"fill", "canceled", "expired", "rejected", "done_for_day", "replaced"}
+
+
+class AlpacaTradeUpdates:
+    def __init__(self, api_key, secret_key, paper=True):
+        """
+        Trade updates from Alpaca's trading websocket.
+
+        Args:
+            api_key (str): The Alpaca API key.
+            secret_key (str): The Alpaca secret API key.
+            paper (bool, optional): Use the paper trading account. Defaults to True.
+        """
+        self.stream = TradingStream(api_key, secret_key, paper=paper)
+
+    def subscribe(self, handler):
+        """
+        Call handler(event, order_id, symbol, filled_qty, filled_avg_price) per update.
+        """
+
+        async def on_update(update):
+            order = update.order
+            handler(
+                str(getattr(update.event, "value", update.event)),
+                str(order.id),
+                order.symbol,
+                float(order.filled_qty or 0),
+                float(order.filled_avg_price) if order.filled_avg_price else None,
+            )
+
+        self.stream.subscribe_trade_updates(on_update)
+
+    def run(self):
+        self.stream.run()
+
+    def stop(self):
+        self.stream.stop()
+
+
+class LocalTradeUpdates:
+    def __init__(self):
+        """
+        In-process stand-in for the trading websocket, updates are pushed with emit().
+        """
+        self.handlers = []
+        self._stopped = threading.Event()
+
+    def subscribe(self, handler):
+        self.handlers.append(handler)
+
+    def emit(self, event, order_id, symbol, filled_qty=0, filled_avg_price=None):
+        """
+        Deliver a trade update to every handler.
+        """
+        for handler in self.handlers:
+            handler(event, str(order_id), symbol, filled_qty, filled_avg_price)
+
+    def run(self):
+        self._stopped.wait()
+
+    def stop(self):
+        self._stopped.set()
+
+
+class OrderState:
+    def __init__(self, order_id, symbol):
+        """
+        What is known about one order from its trade updates.
+
+        Args:
+            order_id (str): The broker's order ID.
+            symbol (str): The ticker symbol of the order.
+        """
+        self.order_id = order_id
+        self.symbol = symbol
+        self.status = "new"
+        self.filled_qty = 0
+        self.filled_avg_price = None
+        self.done = threading.Event()
+        self.callbacks = []
+
+    def add_callback(self, callback):
+        """
+        Call callback(state) once the order reaches a final status.
+        """
+        self.callbacks.append(callback)
+        if self.done.is_set():
+            callback(self)
+
+
+class OrderTracker:
+    def __init__(self, transport):
+        """
+        Follow the lifecycle of submitted orders from the broker's trade updates.
+
+        Waiters are released as soon as an order is filled, cancelled, expired
+        or rejected instead of polling the open positions.
+
+        Args:
+            transport: AlpacaTradeUpdates, LocalTradeUpdates or anything with subscribe/run/stop.
+        """
+        self.transport = transport
+        self.listeners = []
+        self._orders = {}  # order_id -> OrderState
+        self._lock = threading.Lock()
+        self._thread = None
+        self.transport.subscribe(self.on_update)
+
+    def start(self):
+        """
+        Run the transport in a background thread.
+        """
+        self._thread = threading.Thread(
+            target=self.transport.run, name="OrderTracker", daemon=True
+        )
+        self._thread.start()
+        logging.info("Listening to trade updates")
+
+    def stop(self):
+        self.transport.stop()
+
+    def add_listener(self, listener):
+        """
+        Call listener(state) after every trade update.
+        """
+        self.listeners.append(listener)
+
+    def track(self, order_id, symbol):
+        """
+        Start following an order. Updates that arrived before are kept.
+
+        Returns:
+            OrderState: The state of the order.
+        """
+        order_id = str(order_id)
+        with self._lock:
+            if order_id not in self._orders:
+                self._orders[order_id] = OrderState(order_id, symbol)
+            return self._orders[order_id]
+
+    def on_update(self, event, order_id, symbol, filled_qty=0, filled_avg_price=None):
+        state = self.track(order_id, symbol)
+        state.status = event
+        state.filled_qty = filled_qty
+        state.filled_avg_price = filled_avg_price
+        logging.info(f"Order {order_id} for {symbol}: {event} ({filled_qty} filled)")
+
+        for listener in self.listeners:
+            listener(state)
+
+        if event in FINAL_EVENTS and not state.done.is_set():
+            state.done.set()
+            for callback in state.callbacks:
+                callback(state)
+
+    def wait(self, order_id, timeout=None):
+        """
+        Block until an order reaches a final status.
+
+        Args:
+            order_id (str): The broker's order ID.
+            timeout (float, optional): The maximum seconds to wait.
+
+        Returns:
+            str: The final event (e.g. 'fill', 'canceled'), or None on timeout.
+        """
+        state = self.track(order_id, None)
+        if state.done.wait(timeout):
+            return state.status
+        return None
+
+    def forget(self, order_id):
+        with self._lock:
+            self._orders.pop(str(order_id), None)
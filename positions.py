@@ -0,0 +1,107 @@
+# Import necessary libraries
+import threading
+import time
+from collections import namedtuple
+
+# Importing API
+from alpaca.common.exceptions import APIError
+
+# One read of an open position
+PositionSnapshot = namedtuple(
+    "PositionSnapshot",
+    ["ticker", "current_price", "avg_entry_price", "qty", "taken_at"],
+)
+
+
+class PositionCache:
+    def __init__(self, api, ttl=5, clock=time.time):
+        """
+        Short-lived snapshots of open positions shared by every position check.
+
+        Each ticker's position is read from the broker at most once per ttl
+        seconds, and every reader gets the price, entry price and quantity of the
+        same snapshot. "No position" answers are cached as well.
+
+        Args:
+            api: The TradingClient to read positions from.
+            ttl (float, optional): Seconds a snapshot is reused. Defaults to 5.
+            clock (callable, optional): Returns the current UNIX timestamp.
+        """
+        self.api = api
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = {}  # ticker -> (expires_at, PositionSnapshot or None)
+        self._in_flight = {}  # ticker -> threading.Event
+        self._lock = threading.Lock()
+
+    def get(self, ticker):
+        """
+        Get the latest snapshot of a position.
+
+        Args:
+            ticker (str): The asset's ticker symbol.
+
+        Returns:
+            PositionSnapshot: The position, or None if there is no open position.
+
+        Raises:
+            Exception: If the broker could not be reached.
+        """
+        while True:
+            with self._lock:
+                entry = self._snapshots.get(ticker)
+                if entry is not None and entry[0] > self.clock():
+                    self.hits += 1
+                    return entry[1]
+
+                event = self._in_flight.get(ticker)
+                if event is None:
+                    event = threading.Event()
+                    self._in_flight[ticker] = event
+                    self.misses += 1
+                    break
+
+            event.wait()
+
+        try:
+            snapshot = self._read(ticker)
+            with self._lock:
+                self._snapshots[ticker] = (self.clock() + self.ttl, snapshot)
+        finally:
+            with self._lock:
+                del self._in_flight[ticker]
+            event.set()
+
+        return snapshot
+
+    def _read(self, ticker):
+        try:
+            position = self.api.get_open_position(ticker)
+        except APIError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+        return PositionSnapshot(
+            ticker,
+            float(position.current_price),
+            float(position.avg_entry_price),
+            float(position.qty),
+            self.clock(),
+        )
+
+    def invalidate(self, ticker=None):
+        """
+        Drop snapshots so the next read goes to the broker, e.g. after an order
+        was submitted or a trade update arrived.
+
+        Args:
+            ticker (str, optional): Only drop this ticker. Defaults to all.
+        """
+        with self._lock:
+            if ticker is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(ticker, None)
@@ -0,0 +1,301 @@
+# Import necessary libraries
+import functools
+import random
+import threading
+import time
+
+from logger import *
+from metrics import BREAKER_OPENS, RETRIES
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an endpoint whose circuit breaker is open.
+    """
+
+
+def is_transient(error):
+    """
+    Tell if a failed call is worth trying again.
+
+    Connection problems, timeouts, rate limits (429) and server errors (5xx)
+    are; the broker refusing the request (other 4xx) is not.
+
+    Args:
+        error (Exception): What the call raised.
+
+    Returns:
+        bool: True if the call may succeed when tried again.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+
+    # APIError of alpaca-py, None when the request got no response
+    if hasattr(error, "status_code"):
+        status = error.status_code
+        return status is None or status == 429 or status >= 500
+
+    # The exceptions of requests are OSErrors too
+    return isinstance(error, (OSError, TimeoutError))
+
+
+class RetryPolicy:
+    def __init__(self, attempts=4, base_delay=0.5, max_delay=8.0, budget=None):
+        """
+        How a failing call is tried again.
+
+        The wait before retry n is random between 0 and base_delay * 2 ** n,
+        capped at max_delay ("full jitter"), so callers failing together do
+        not retry together.
+
+        Args:
+            attempts (int, optional): The maximum number of calls. Defaults to 4.
+            base_delay (float, optional): The seconds the waits start from. Defaults to 0.5.
+            max_delay (float, optional): The longest wait in seconds. Defaults to 8.
+            budget (float, optional): No retry starts later than this many seconds
+                after the first call. Defaults to no limit.
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def delay(self, retry):
+        """
+        Get the seconds to wait before a retry, the first one being 0.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+
+class CircuitBreaker:
+    def __init__(self, name, failures=5, reset_time=30.0, clock=time.monotonic):
+        """
+        Stop calling an endpoint that keeps failing.
+
+        After the given number of transient failures in a row the breaker opens
+        and calls fail at once with CircuitOpenError. Once reset_time seconds
+        have passed a single trial call is let through: the breaker closes if it
+        succeeds and opens again if it fails.
+
+        Args:
+            name (str): The endpoint, for logs and metrics.
+            failures (int, optional): Failures in a row that open it. Defaults to 5.
+            reset_time (float, optional): Seconds before a trial call. Defaults to 30.
+            clock (callable, optional): Returns the current time in seconds.
+        """
+        self.name = name
+        self.failures = failures
+        self.reset_time = reset_time
+        self.clock = clock
+        self.state = "closed"
+        self.failed_calls = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Tell if a call may go through now, turning an open breaker half-open
+        (for one trial call) once its reset time has passed.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if (
+                self.state == "open"
+                and self.clock() - self.opened_at >= self.reset_time
+            ):
+                self.state = "half-open"
+                return True
+            return False
+
+    def retry_in(self):
+        """
+        Get the seconds left until a trial call is let through.
+        """
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_time - (self.clock() - self.opened_at))
+
+    def succeeded(self):
+        with self._lock:
+            if self.state != "closed":
+                logging.info(f"Circuit of {self.name} closed")
+            self.state = "closed"
+            self.failed_calls = 0
+
+    def failed(self):
+        with self._lock:
+            self.failed_calls += 1
+            if self.state == "half-open" or (
+                self.state == "closed" and self.failed_calls >= self.failures
+            ):
+                logging.warning(
+                    f"Circuit of {self.name} opened after {self.failed_calls} failures"
+                )
+                BREAKER_OPENS.inc(endpoint=self.name)
+                self.state = "open"
+                self.opened_at = self.clock()
+
+
+def retry(
+    func,
+    policy,
+    *args,
+    step=None,
+    breaker=None,
+    transient=is_transient,
+    sleep=time.sleep,
+    clock=time.monotonic,
+    **kwargs,
+):
+    """
+    Call a function, trying again on transient failures as a policy says.
+
+    Args:
+        func (callable): The call.
+        policy (RetryPolicy): The attempts, waits and time budget.
+        *args: Passed to the call.
+        step (str, optional): The RETRIES label. Defaults to the function name.
+        breaker (CircuitBreaker, optional): Guards the call and records its outcomes.
+        transient (callable, optional): Tells if an exception is worth retrying.
+        sleep (callable, optional): Used for the waits. Defaults to time.sleep.
+        clock (callable, optional): Used for the time budget. Defaults to time.monotonic.
+        **kwargs: Passed to the call.
+
+    Returns:
+        The result of the call.
+
+    Raises:
+        CircuitOpenError: If the breaker is open.
+        Exception: What the last attempt raised.
+    """
+    step = step or getattr(func, "__name__", "call")
+    deadline = clock() + policy.budget if policy.budget is not None else None
+
+    for attempt in range(policy.attempts):
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(
+                f"{breaker.name} is unavailable, next try in {breaker.retry_in():.0f}s"
+            )
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not transient(e):
+                # The endpoint answered, it is up
+                if breaker is not None:
+                    breaker.succeeded()
+                raise
+
+            if breaker is not None:
+                breaker.failed()
+
+            delay = policy.delay(attempt)
+            if attempt + 1 == policy.attempts or (
+                deadline is not None and clock() + delay > deadline
+            ):
+                raise
+
+            logging.warning(
+                f"{step} failed ({e}), attempt {attempt + 1}, retrying in {delay:.2f}s"
+            )
+            RETRIES.inc(step=step)
+            sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.succeeded()
+            return result
+
+
+class Resilience:
+    def __init__(
+        self,
+        policy=None,
+        failures=5,
+        reset_time=30.0,
+        sleep=time.sleep,
+        clock=time.monotonic,
+    ):
+        """
+        The retry policy and per-endpoint circuit breakers shared by every
+        broker and data call.
+
+        Args:
+            policy (RetryPolicy, optional): The default policy. Defaults to RetryPolicy().
+            failures (int, optional): Failures in a row that open a breaker. Defaults to 5.
+            reset_time (float, optional): Seconds before a trial call. Defaults to 30.
+            sleep (callable, optional): Used for the waits. Defaults to time.sleep.
+            clock (callable, optional): Returns the current time in seconds.
+        """
+        self.policy = policy or RetryPolicy()
+        self.failures = failures
+        self.reset_time = reset_time
+        self.sleep = sleep
+        self.clock = clock
+        self._breakers = {}  # endpoint -> CircuitBreaker
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint):
+        """
+        Get the circuit breaker of an endpoint, creating it on first use.
+        """
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(
+                    endpoint, self.failures, self.reset_time, self.clock
+                )
+            return self._breakers[endpoint]
+
+    def call(self, endpoint, func, *args, policy=None, **kwargs):
+        """
+        Call an endpoint through its circuit breaker with retries.
+
+        Args:
+            endpoint (str): Names the breaker and the RETRIES step.
+            func (callable): The call.
+            *args: Passed to the call.
+            policy (RetryPolicy, optional): Overrides the default policy.
+            **kwargs: Passed to the call.
+
+        Returns:
+            The result of the call.
+        """
+        return retry(
+            func,
+            policy or self.policy,
+            *args,
+            step=endpoint,
+            breaker=self.breaker(endpoint),
+            sleep=self.sleep,
+            clock=self.clock,
+            **kwargs,
+        )
+
+
+class ResilientClient:
+    def __init__(self, api, resilience, prefix="broker", once=("submit_order",)):
+        """
+        Wrap a TradingClient so every method call goes through the resilience
+        layer, one circuit breaker per method.
+
+        Args:
+            api: The client to wrap.
+            resilience (Resilience): The policy and breakers.
+            prefix (str, optional): Prepended to the endpoint names. Defaults to 'broker'.
+            once (tuple, optional): Methods never retried, as a failed request may
+                still have been carried out. Defaults to submit_order.
+        """
+        self._api = api
+        self._resilience = resilience
+        self._prefix = prefix
+        self._once = set(once)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._api, name)
+        if not callable(attribute):
+            return attribute
+
+        policy = RetryPolicy(attempts=1) if name in self._once else None
+        return functools.partial(
+            self._resilience.call, f"{self._prefix}.{name}", attribute, policy=policy
+        )
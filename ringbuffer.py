@@ -0,0 +1,160 @@
+# Import necessary libraries
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from barstore import FIELDS
+
+# Read-only OHLCV arrays of the same length, oldest first
+Bars = namedtuple("Bars", FIELDS)
+
+
+class BarRing:
+    def __init__(self, capacity=256):
+        """
+        The latest bars of one ticker and interval in fixed-size arrays.
+
+        Every bar is written twice, at slot i and slot i + capacity, so the last
+        capacity bars are always one contiguous slice. Memory stays the same
+        however long the bot runs.
+
+        Once the ring holds a whole period (see covers), loads only need to add
+        the bars from the newest kept one on. snapshot() copies the kept bars
+        out, so what a reader was given does not change when the ring is
+        extended again.
+
+        Args:
+            capacity (int, optional): The number of bars kept. Defaults to 256.
+        """
+        self.capacity = capacity
+        self._times = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((len(FIELDS) - 1, 2 * capacity))
+        self._count = 0  # bars ever written
+        self._complete_from = None  # no bar is missing from this time on
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def last_time(self):
+        """
+        Get the time of the newest bar, or None if empty.
+        """
+        if not self._count:
+            return None
+        return int(self._times[(self._count - 1) % self.capacity])
+
+    def covers(self, start):
+        """
+        Tell if the ring holds every bar from a time on, so only newer bars
+        have to be loaded.
+
+        Args:
+            start (int): The UNIX time, e.g. the start of a period.
+        """
+        with self._lock:
+            if self._complete_from is None:
+                return False
+            complete_from = self._complete_from
+            if self._count > self.capacity:
+                # Older bars were overwritten
+                oldest = self._times[self._count % self.capacity]
+                complete_from = max(complete_from, int(oldest))
+            return complete_from <= start
+
+    def extend(self, bars, complete_from=None):
+        """
+        Add the bars newer than the ones kept, replacing the newest kept bar if
+        it comes again (the bar being built).
+
+        Args:
+            bars (dict): OHLCV arrays, oldest first (see barstore.bars_from_frame).
+            complete_from (int, optional): The UNIX time the bars hold every bar
+                from, when they were loaded for a whole period. Defaults to a
+                tail following the kept bars.
+        """
+        times = bars["time"]
+
+        with self._lock:
+            last = self.last_time()
+            if complete_from is not None:
+                # Bars older than the kept ones are dropped, and a load starting
+                # after the newest kept bar leaves a gap before it
+                if self._complete_from is None or last is None or complete_from > last:
+                    self._complete_from = complete_from
+                else:
+                    self._complete_from = min(self._complete_from, complete_from)
+
+            first = 0
+            if self._count:
+                first = np.searchsorted(times, self.last_time(), side="left")
+                if first < len(times) and times[first] == self.last_time():
+                    self._count -= 1
+
+            # Only the last capacity bars would survive anyway
+            first = max(first, len(times) - self.capacity)
+            size = len(times) - first
+            if size <= 0:
+                return
+
+            slots = (self._count + np.arange(size)) % self.capacity
+            for offset in (0, self.capacity):
+                self._times[slots + offset] = times[first:]
+                for row, field in enumerate(FIELDS[1:]):
+                    self._values[row, slots + offset] = bars[field][first:]
+            self._count += size
+
+    def view(self, since=None):
+        """
+        Get the kept bars as zero-copy views, only valid until the ring is
+        extended again.
+
+        Args:
+            since (int, optional): Skip the bars older than this UNIX time.
+
+        Returns:
+            Bars: The time and OHLCV arrays, oldest first.
+        """
+        with self._lock:
+            size = len(self)
+            start = self._count % self.capacity if self._count > self.capacity else 0
+            end = start + size
+
+            if since is not None:
+                start += np.searchsorted(self._times[start:end], since, side="left")
+
+            return Bars(self._times[start:end], *self._values[:, start:end])
+
+    def snapshot(self, since=None):
+        """
+        Get a copy of the kept bars, which later extends do not change.
+
+        Args:
+            since (int, optional): Skip the bars older than this UNIX time.
+
+        Returns:
+            Bars: The time and OHLCV arrays, oldest first.
+        """
+        with self._lock:
+            return Bars(*(values.copy() for values in self.view(since)))
+
+
+class BarRings:
+    def __init__(self, capacity=256):
+        """
+        One BarRing per (ticker, interval), created on first use.
+
+        Args:
+            capacity (int, optional): The number of bars kept per ring. Defaults to 256.
+        """
+        self.capacity = capacity
+        self._rings = {}  # (ticker, interval) -> BarRing
+        self._lock = threading.Lock()
+
+    def get(self, ticker, interval):
+        with self._lock:
+            key = (ticker, interval)
+            if key not in self._rings:
+                self._rings[key] = BarRing(self.capacity)
+            return self._rings[key]
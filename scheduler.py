@@ -0,0 +1,643 @@
+# Import necessary libraries
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+
+from logger import *
+from metrics import RETRIES, STAGE_SECONDS
+from settings import config
+
+
+class Stage(Enum):
+    IDLE = "idle"
+    TREND = "trend"
+    CONFIRM = "confirm"
+    ORDER = "order"
+    IN_POSITION = "in position"
+    EXIT = "exit"
+
+
+class TraderPipeline:
+    def __init__(self, trader, executor=None):
+        """
+        Run the trading operation of one Trader as a coroutine.
+
+        This is the trading state machine (trend -> confirm -> order -> in
+        position -> exit), with the Trader providing every step. Waits are
+        asyncio sleeps, so many pipelines can share one event loop, and blocking
+        broker and data calls run in the given thread pool. Trader.run drives
+        a pipeline on an event loop of its own.
+
+        Args:
+            trader (Trader): The trader of the symbol.
+            executor (Executor, optional): Where blocking calls run. Defaults to the loop's.
+        """
+        self.trader = trader
+        self.ticker = trader.ticker
+        self.executor = executor
+        self.stage = Stage.IDLE
+        self.stage_started = time.perf_counter()
+        self.trend = None
+        self.shares_qty = 0
+        self.current_price = None
+        self.stop_loss = None
+        self.take_profit = None
+        self.exit_pending = False
+
+    async def call(self, func, *args):
+        """
+        Run a blocking Trader call without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Keep the log context of the pipeline in the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor, context.run, functools.partial(func, *args)
+        )
+
+    async def call_until_answered(self, func, *args):
+        """
+        Run a blocking Trader call until it returns, waiting sleepTimeCP between
+        tries while the broker cannot be reached.
+        """
+        while True:
+            try:
+                return await self.call(func, *args)
+            except Exception as e:
+                logging.error(f"{func.__name__} failed for {self.ticker}: {e}")
+                RETRIES.inc(step=func.__name__)
+                await self.sleep(config["sleepTimeCP"])
+
+    async def sleep(self, seconds):
+        """
+        Wait without blocking the event loop. A Trader with a sleep of its own,
+        like a simulated clock, waits with it instead.
+        """
+        if self.trader.sleep is time.sleep:
+            await asyncio.sleep(seconds)
+        else:
+            await self.call(self.trader.sleep, seconds)
+
+    async def set_stage(self, stage):
+        """
+        Move to a stage, recording how long the previous one took.
+        """
+        now = time.perf_counter()
+        STAGE_SECONDS.observe(
+            now - self.stage_started, ticker=self.ticker, stage=self.stage.value
+        )
+        logging.info(f"{self.ticker}: {self.stage.value} -> {stage.value}")
+        self.stage, self.stage_started = stage, now
+        set_log_context(self.ticker, stage.value)
+        await self.checkpoint()
+
+    async def checkpoint(self):
+        """
+        Save the stage of the trade and what is needed to resume it. Nothing
+        is kept before a trend is found or once the trade is over.
+
+        The file is written in the thread pool, like the other blocking calls.
+        """
+        if self.stage in (Stage.IDLE, Stage.TREND):
+            await self.call(self.trader.clear_checkpoint)
+            return
+
+        order_id = self.trader.order_id if self.stage != Stage.CONFIRM else None
+        save = functools.partial(
+            self.trader.save_checkpoint,
+            self.stage.value,
+            trend=self.trend,
+            order_id=str(order_id) if order_id is not None else None,
+            exit_legs=self.trader.exit_legs,
+            shares_qty=self.shares_qty,
+            current_price=self.current_price,
+            stop_loss=self.stop_loss,
+            take_profit=self.take_profit,
+        )
+        await self.call(save)
+
+    async def resume(self):
+        """
+        Pick up the trade saved before a restart, as the broker reports it now.
+
+        Returns:
+            Stage: The stage to carry on from, or None to start a new trade.
+        """
+        try:
+            state = await self.call(self.trader.reconcile, self.ticker)
+        except Exception as e:
+            logging.error(f"Could not resume the saved trade of {self.ticker}: {e}")
+            return None
+        if state is None:
+            return None
+
+        self.trend = state["trend"]
+        self.shares_qty = state["shares_qty"]
+        self.current_price = state["current_price"]
+        self.stop_loss = state["stop_loss"]
+        self.take_profit = state["take_profit"]
+        self.trader.exit_legs = state.get("exit_legs")
+
+        # An exit order still working is waited for, not sent again
+        self.exit_pending = state["stage"] == "exit" and state["order_open"]
+        return Stage(state["stage"])
+
+    async def wait_next_bar(self, interval, sleep_time, deadline):
+        """
+        Wait until a check on bars of an interval is worth running again (see
+        Trader.next_evaluation_time).
+
+        Returns:
+            bool: True after waiting, False if the wait would end past the deadline.
+        """
+        wake = self.trader.next_evaluation_time(interval, sleep_time)
+        if wake > deadline:
+            return False
+
+        await self.sleep(max(0, wake - self.trader.clock()))
+        return True
+
+    async def retry(self, func, attempts, sleep_time, *args, interval=None):
+        """
+        Run a single-shot check until it passes or the attempts run out.
+
+        Args:
+            func (callable): The check, returning True when it passes.
+            attempts (int): The maximum number of attempts.
+            sleep_time (float): The seconds to wait between attempts.
+            *args: Passed to the check.
+            interval (str, optional): The bar interval the check reads. When given,
+                attempts wait for bar closes within attempts * sleep_time.
+
+        Returns:
+            bool: True if the check passed, False otherwise.
+        """
+        deadline = self.trader.clock() + attempts * sleep_time
+
+        for attempt in range(1, attempts + 1):
+            try:
+                if await self.call(func, *args):
+                    return True
+            except Exception as e:
+                logging.error(f"Error in {func.__name__} for {self.ticker}: {e}")
+
+            RETRIES.inc(step=func.__name__)
+            if interval is None:
+                await self.sleep(sleep_time)
+            elif not await self.wait_next_bar(interval, sleep_time, deadline):
+                break
+
+        logging.info(f"Timeout reached in {func.__name__} for {self.ticker}")
+        return False
+
+    async def find_trend(self):
+        """
+        Wait for a general trend.
+
+        Returns:
+            str: 'long' or 'short', or None if no trend was found in time.
+        """
+        sleep_time = config["sleepTimeGGT"] * config["maxAttemptsGGT"]
+        deadline = self.trader.clock() + config["maxAttemptsGGT"] * sleep_time
+
+        for attempt in range(1, config["maxAttemptsGGT"] + 1):
+            try:
+                trend = await self.call(self.trader.evaluate_general_trend, self.ticker)
+                if trend != "no trend":
+                    return trend
+            except Exception as e:
+                logging.error(
+                    f"Error occurred while detecting trend for {self.ticker}: {e}"
+                )
+
+            RETRIES.inc(step="general_trend")
+            if not await self.wait_next_bar("30m", sleep_time, deadline):
+                break
+
+        logging.info(f"Trend NOT detected and timeout reached for {self.ticker}")
+        return None
+
+    async def confirm_trend(self):
+        """
+        Confirm the general trend with the instant trend, RSI and Stochastic.
+
+        Returns:
+            bool: True if every filter passed, False otherwise.
+        """
+        trader, ticker, trend = self.trader, self.ticker, self.trend
+
+        if config["jointFilters"]:
+            # Every filter on the same bars, see Trader.evaluate_filters
+            return await self.retry(
+                trader.evaluate_filters,
+                config["maxAttemptsFLT"],
+                config["sleepTimeFLT"],
+                ticker,
+                trend,
+                interval="5m",
+            )
+
+        return (
+            await self.retry(
+                trader.evaluate_instant_trend,
+                config["maxAttemptsGIT"],
+                config["sleepTimeGIT"],
+                ticker,
+                trend,
+                interval="5m",
+            )
+            and await self.retry(
+                trader.evaluate_rsi,
+                config["maxAttemptsRSI"],
+                config["sleepTimeRSI"],
+                ticker,
+                trend,
+                interval="5m",
+            )
+            and await self.retry(
+                trader.evaluate_stochastic,
+                config["maxAttemptsSTC"],
+                config["sleepTimeSTC"],
+                ticker,
+                trend,
+                interval="5m",
+            )
+        )
+
+    async def place_order(self):
+        """
+        Submit the entry limit order and wait for the position to open.
+
+        Returns:
+            bool: True if the position is open, False otherwise.
+        """
+        trader, ticker = self.trader, self.ticker
+
+        self.current_price = await self.call(trader.get_last_close, ticker)
+        self.shares_qty = await self.call(trader.get_shares_amount, self.current_price)
+        logging.info(f"{ticker} DESIRED ENTRY PRICE: {self.current_price:.2f}")
+
+        if not await self.call(
+            trader.submit_order,
+            "limit",
+            self.trend,
+            ticker,
+            self.shares_qty,
+            self.current_price,
+        ):
+            return False
+        await self.checkpoint()
+
+        return await self.wait_entry()
+
+    async def wait_entry(self):
+        """
+        Wait for the entry order to fill, cancelling it if it does not in time.
+        An order that fills while it is being cancelled is kept.
+
+        Returns:
+            bool: True if the position is open, False otherwise.
+        """
+        trader, ticker = self.trader, self.ticker
+
+        if trader.orders is not None:
+            status = await self.wait_order(trader.order_id)
+            if status == "fill" or (
+                status is None and await self.call(trader.get_open_positions, ticker)
+            ):
+                return True
+        elif await self.retry(
+            # Without trade updates the position is polled sleepTimeME apart
+            trader.get_open_positions,
+            config["maxAttemptsCP"],
+            config["sleepTimeME"],
+            ticker,
+        ):
+            return True
+        elif (
+            trader.exit_legs
+            and await self.call(trader.get_order_status, trader.order_id) == "filled"
+        ):
+            # The legs of a bracket closed the position between two polls
+            return True
+
+        if await self.call(trader.cancel_pending_order, ticker):
+            return False
+
+        # The order may have filled while it was being cancelled
+        if await self.call(trader.get_order_status, trader.order_id) == "filled":
+            logging.info(f"Order {trader.order_id} filled while being cancelled")
+            trader.positions.invalidate(ticker)
+            return True
+
+        # A pending order that could not be cancelled may still fill
+        raise Exception(f"Order {trader.order_id} for {ticker} is still pending")
+
+    async def wait_order(self, order_id):
+        """
+        Wait for trade updates to report an order as filled or closed.
+
+        Returns:
+            str: The final event (e.g. 'fill', 'canceled'), or None on timeout.
+        """
+        loop = asyncio.get_running_loop()
+        done = asyncio.Event()
+
+        state = self.trader.orders.track(order_id, self.ticker)
+        state.add_callback(lambda state: loop.call_soon_threadsafe(done.set))
+
+        try:
+            await asyncio.wait_for(
+                done.wait(), config["maxAttemptsCP"] * config["sleepTimeCP"]
+            )
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.trader.positions.invalidate(self.ticker)
+
+        return state.status
+
+    async def hold_position(self):
+        """
+        Watch the open position until an exit condition is met.
+
+        Returns:
+            bool: True if conditions for exit are met, False on timeout or error.
+        """
+        trader, ticker, trend = self.trader, self.ticker, self.trend
+
+        try:
+            # The broker watches the levels of a bracket
+            if trader.exit_legs:
+                return await self.watch_exit_legs()
+
+            if self.stop_loss is None:
+                entry_price = await self.call(trader.get_avg_entry_price, ticker)
+                self.take_profit = trader.set_takeprofit(entry_price, trend)
+                self.stop_loss = trader.set_stoploss(entry_price, trend)
+                await self.checkpoint()
+            stop_loss, take_profit = self.stop_loss, self.take_profit
+
+            if trader.price_monitor is not None:
+                return await self.watch_position(stop_loss, take_profit)
+
+            for attempt in range(1, config["maxAttemptsEPM"] + 1):
+                price = await self.call(trader.get_current_price, ticker)
+
+                if trader.is_exit_price(price, trend, stop_loss, take_profit):
+                    return True
+
+                if await self.call(trader.check_stochastic_crossing, ticker, trend):
+                    logging.info(
+                        f"Stochastic curves crossed for {ticker} at {price:.2f}"
+                    )
+                    return True
+
+                await self.sleep(config["sleepTimeEPM"])
+
+            logging.info(f"Timeout reached at enter position for {ticker}, too late")
+            return False
+
+        except Exception as e:
+            logging.error(f"Error occurred while in position mode for {ticker}: {e}")
+            return False
+
+    async def watch_exit_legs(self):
+        """
+        Wait for the bracket's legs to close the position at the broker, checking
+        the stochastic crossing in between. The legs are moved to the entry
+        price on the first check.
+
+        Returns:
+            bool: True if conditions for exit are met, False on timeout.
+        """
+        trader, ticker, trend = self.trader, self.ticker, self.trend
+
+        for attempt in range(1, config["maxAttemptsEPM"] + 1):
+            position = await self.call(trader.positions.get, ticker)
+            if position is None:
+                logging.info(f"The {ticker} position was closed by an exit leg")
+                return True
+
+            if self.stop_loss is None:
+                # Move the legs to the entry price, once
+                self.stop_loss, self.take_profit = await self.call(
+                    trader.amend_exit_legs,
+                    ticker,
+                    float(position.avg_entry_price),
+                    trend,
+                )
+                await self.checkpoint()
+
+            if await self.call(trader.check_stochastic_crossing, ticker, trend):
+                logging.info(f"Stochastic curves crossed for {ticker}")
+                return True
+
+            await self.sleep(config["sleepTimeEPM"])
+
+        logging.info(f"Timeout reached at enter position for {ticker}, too late")
+        return False
+
+    async def watch_position(self, stop_loss, take_profit):
+        """
+        Wait for a streamed price to reach a level, checking the stochastic
+        crossing in between.
+
+        Returns:
+            bool: True if conditions for exit are met, False on timeout.
+        """
+        trader, ticker, trend = self.trader, self.ticker, self.trend
+        loop = asyncio.get_running_loop()
+        reached = asyncio.Event()
+
+        watch = trader.price_monitor.watch(ticker, trend, stop_loss, take_profit)
+        watch.add_callback(lambda watch: loop.call_soon_threadsafe(reached.set))
+
+        try:
+            for attempt in range(1, config["maxAttemptsEPM"] + 1):
+                if watch.triggered.is_set():
+                    return True
+
+                try:
+                    await asyncio.wait_for(reached.wait(), config["sleepTimeEPM"])
+                    return True
+                except asyncio.TimeoutError:
+                    pass
+
+                if await self.call(trader.check_stochastic_crossing, ticker, trend):
+                    logging.info(f"Stochastic curves crossed for {ticker}")
+                    return True
+
+            logging.info(f"Timeout reached at enter position for {ticker}, too late")
+            return False
+
+        finally:
+            trader.price_monitor.unwatch(ticker)
+
+    async def exit_position(self):
+        """
+        Submit the market exit order and wait for the position to be closed.
+        The exit legs of a bracket are cancelled first, unless one closed it.
+        """
+        # The position may still be open while the broker cannot be reached
+        if not self.exit_pending and await self.call_until_answered(
+            self.trader.cancel_exit_legs, self.ticker
+        ):
+            await self.call(
+                self.trader.submit_order,
+                "market",
+                self.trend,
+                self.ticker,
+                self.shares_qty,
+                self.current_price,
+                True,
+            )
+            await self.checkpoint()
+        self.exit_pending = False
+
+        if self.trader.orders is not None:
+            await self.wait_order(self.trader.order_id)
+
+        while await self.call_until_answered(
+            self.trader.get_open_positions, self.ticker
+        ):
+            logging.info(
+                f"WARNING! THE {self.ticker} POSITION SHOULD BE CLOSED! Retrying..."
+            )
+            RETRIES.inc(step="confirm_exit")
+            await self.sleep(config["sleepTimeCP"])
+
+    async def run_once(self, stage=Stage.IDLE):
+        """
+        Run one trading operation, from trend detection to exit.
+
+        Args:
+            stage (Stage, optional): Where to start, a later stage to carry on a
+                resumed trade (see resume). Defaults to a new trade.
+
+        Returns:
+            bool: True if the operation was successful, False otherwise.
+        """
+        while True:
+            if stage == Stage.IDLE:
+                self.stop_loss = self.take_profit = None
+                # Updates of the last trade's orders have all arrived by now
+                self.trader.forget_orders()
+                self.trader.order_id = self.trader.exit_legs = None
+                await self.set_stage(Stage.IDLE)
+                if await self.call(self.trader.get_open_positions, self.ticker):
+                    logging.info(
+                        f"There is already an open position with {self.ticker}!"
+                    )
+                    return False
+
+                await self.set_stage(Stage.TREND)
+                self.trend = await self.find_trend()
+                if not self.trend:
+                    return False
+                stage = Stage.CONFIRM
+
+            if stage == Stage.CONFIRM:
+                await self.set_stage(Stage.CONFIRM)
+                if not await self.confirm_trend():
+                    stage = Stage.IDLE
+                    continue
+                stage = Stage.ORDER
+
+            if stage == Stage.ORDER:
+                # A resumed order is already submitted
+                resumed = self.trader.order_id is not None
+                await self.set_stage(Stage.ORDER)
+                if not await (self.wait_entry() if resumed else self.place_order()):
+                    stage = Stage.IDLE
+                    continue
+
+            successful_operation = False
+            if stage != Stage.EXIT:
+                await self.set_stage(Stage.IN_POSITION)
+                successful_operation = await self.hold_position()
+
+            await self.set_stage(Stage.EXIT)
+            await self.exit_position()
+
+            await self.set_stage(Stage.IDLE)
+            return successful_operation
+
+    async def run_forever(self):
+        """
+        Keep trading the symbol, resting between operations like main.py does.
+        A trade saved before a restart is carried on first.
+        """
+        stage = await self.resume() or Stage.IDLE
+
+        while True:
+            try:
+                if await self.run_once(stage):
+                    logging.info(f"Trading {self.ticker} was successful!")
+                else:
+                    logging.info(
+                        f"Trading {self.ticker} was not successful, locking asset"
+                    )
+            except Exception as e:
+                logging.error(f"Trading {self.ticker} failed: {e}")
+
+            stage = Stage.IDLE
+            await self.sleep(config["sleepTimeME"])
+
+
+async def save_indicators(checkpoints, indicators, interval, executor=None):
+    """
+    Save the indicator state every interval seconds, so a restart only adds
+    the bars that closed since.
+
+    Args:
+        checkpoints (CheckpointStore): Where the state is saved.
+        indicators (IndicatorEngine): The shared indicator state.
+        interval (float): The seconds between saves.
+        executor (Executor, optional): Where the file is written. Defaults to the loop's.
+    """
+    loop = asyncio.get_running_loop()
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(
+                executor, lambda: checkpoints.save_indicators(indicators.snapshot())
+            )
+        except Exception as e:
+            logging.error(f"Could not save the indicator state: {e}")
+
+
+async def run_pipelines(traders, max_workers=None):
+    """
+    Run the pipelines of many traders concurrently on one event loop.
+
+    Args:
+        traders (list): The Trader of every symbol.
+        max_workers (int, optional): Threads for blocking calls. Defaults to config["maxWorkers"].
+
+    When the traders checkpoint their trades, the shared indicator state is
+    saved every config["checkpointInterval"] seconds as well.
+    """
+    max_workers = max_workers or config["maxWorkers"]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pipelines = [TraderPipeline(trader, executor) for trader in traders]
+        logging.info(f"Scheduling {len(pipelines)} tickers on {max_workers} workers")
+
+        tasks = [pipeline.run_forever() for pipeline in pipelines]
+        checkpoints = traders[0].checkpoints if traders else None
+        if checkpoints is not None and config["checkpointInterval"]:
+            tasks.append(
+                save_indicators(
+                    checkpoints,
+                    traders[0].indicators,
+                    config["checkpointInterval"],
+                    executor,
+                )
+            )
+        await asyncio.gather(*tasks)
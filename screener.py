@@ -0,0 +1,219 @@
+# Import necessary libraries
+import argparse
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from barstore import resample_bars
+from cache import interval_seconds, next_bar_close
+from logger import *
+from settings import config, load_config
+from signals import SignalEvaluator, default_strategy
+
+# A ticker passing every filter, with its latest readings
+Candidate = namedtuple(
+    "Candidate", ["ticker", "trend", "score", "rsi", "stoch_k", "stoch_d"]
+)
+
+
+def stack_bars(bars, tickers, window):
+    """
+    Build matrices of the last bars of many tickers, one column per ticker.
+
+    Args:
+        bars (dict): Ticker -> OHLCV arrays, oldest first.
+        tickers (list): The tickers, each with at least window bars.
+        window (int): The number of bars kept per ticker.
+
+    Returns:
+        dict: Field -> matrix of shape (window, tickers).
+    """
+    return {
+        field: np.stack([bars[ticker][field][-window:] for ticker in tickers], axis=1)
+        for field in ("open", "high", "low", "close", "volume")
+    }
+
+
+# Seconds of one regular trading session, 9:30 to 16:00
+SESSION_SECONDS = 6.5 * 3600
+
+
+def history_days(window, interval):
+    """
+    Get the number of trading days to download for window bars of an interval.
+
+    Intraday bars only cover the regular session, so 13 bars of 30 minutes
+    make a day, and two more days cover the day being built and a holiday.
+
+    Args:
+        window (int): The number of bars needed.
+        interval (str): The bar interval, e.g. '30m'.
+
+    Returns:
+        int: The days of the yfinance period, e.g. 7 for '7d'.
+    """
+    bars_per_day = SESSION_SECONDS / min(interval_seconds(interval), SESSION_SECONDS)
+    return math.ceil(window / bars_per_day) + 2
+
+
+def default_evaluator():
+    """
+    The entry rules of Trader.run with the configured periods.
+    """
+    return SignalEvaluator(
+        default_strategy(
+            config["emaPeriods"], config["rsiPeriod"], config["stochPeriods"]
+        )
+    )
+
+
+def screen_bars(bars, window=64, evaluator=None):
+    """
+    Evaluate a strategy for many tickers in one vectorized pass.
+
+    The bars of every interval are stacked into matrices, one column per
+    ticker, and every indicator of the strategy is computed once column-wise.
+    The last bar of each ticker is the one being built, like in
+    Trader.evaluate_*.
+
+    Args:
+        bars (dict): Interval -> ticker -> OHLCV arrays, for the intervals the
+            strategy reads.
+        window (int, optional): The bars read per ticker and interval. Defaults to 64.
+        evaluator (SignalEvaluator, optional): With 'long', 'short', 'score', 'rsi',
+            'stoch_k' and 'stoch_d' outputs. Defaults to the Trader rules.
+
+    Returns:
+        list: The passing Candidates, the highest score first.
+    """
+    evaluator = evaluator or default_evaluator()
+    intervals = evaluator.intervals()
+
+    # Only tickers with enough bars of every interval, in the same columns
+    tickers = [
+        ticker
+        for ticker in bars[intervals[0]]
+        if all(
+            len(bars[interval].get(ticker, {"close": ()})["close"]) >= window
+            for interval in intervals
+        )
+    ]
+    skipped = len(bars[intervals[0]]) - len(tickers)
+    if skipped:
+        logging.warning(
+            f"Skipped {skipped} of {len(bars[intervals[0]])} tickers with fewer "
+            f"than {window} bars of {', '.join(intervals)}"
+        )
+    if not tickers:
+        return []
+
+    out = evaluator.evaluate(
+        {
+            interval: stack_bars(bars[interval], tickers, window)
+            for interval in intervals
+        }
+    )
+    direction = np.where(out["long"], 1, np.where(out["short"], -1, 0))
+    score = out["score"] * direction
+
+    return [
+        Candidate(
+            tickers[i],
+            "long" if direction[i] == 1 else "short",
+            float(score[i]),
+            float(out["rsi"][i]),
+            float(out["stoch_k"][i]),
+            float(out["stoch_d"][i]),
+        )
+        for i in np.argsort(-score, kind="stable")
+        if direction[i] != 0
+    ]
+
+
+def screen(tickers, top=None, evaluator=None):
+    """
+    Load the bars of many tickers and rank the ones passing every filter.
+
+    Only the intervals the strategy reads are loaded, and the resampled ones
+    are built from the base bars loaded for the same screen.
+
+    Args:
+        tickers (list): The universe, e.g. the S&P 500 tickers.
+        top (int, optional): Keep only the best candidates. Defaults to all.
+        evaluator (SignalEvaluator, optional): Defaults to the Trader rules.
+
+    Returns:
+        list: The passing Candidates, the highest score first.
+    """
+    from PocketTrader import is_resampled, load_bars_many
+
+    evaluator = evaluator or default_evaluator()
+    window = config["screenerBars"]
+    started = time.perf_counter()
+
+    # Enough base bars for window bars of every interval resampled from them
+    base_interval = config["baseInterval"]
+    days = max(
+        history_days(window, interval)
+        for interval in [base_interval, *evaluator.intervals()]
+        if interval == base_interval or is_resampled(interval)
+    )
+    base = load_bars_many(tickers, base_interval, f"{days}d")
+    bars = {
+        interval: (
+            base
+            if interval == base_interval
+            else (
+                {
+                    ticker: resample_bars(values, interval)
+                    for ticker, values in base.items()
+                }
+                if is_resampled(interval)
+                else load_bars_many(
+                    tickers, interval, f"{history_days(window, interval)}d"
+                )
+            )
+        )
+        for interval in evaluator.intervals()
+    }
+    loaded = time.perf_counter()
+
+    candidates = screen_bars(bars, window, evaluator)[:top]
+    logging.info(
+        f"Screened {len(tickers)} tickers: {len(candidates)} candidates, "
+        f"loaded in {loaded - started:.2f}s, evaluated in {time.perf_counter() - loaded:.3f}s"
+    )
+    return candidates
+
+
+if __name__ == "__main__":
+    load_config()
+
+    parser = argparse.ArgumentParser(
+        description="Rank the tickers passing the Trader filters"
+    )
+    parser.add_argument("tickers", nargs="*", help="Defaults to screenerUniverse")
+    parser.add_argument("--top", type=int, default=config["screenerTop"])
+    parser.add_argument(
+        "--watch", action="store_true", help="Screen again after every 5 minute bar"
+    )
+    args = parser.parse_args()
+
+    initialize_logging(structured=config["logJson"])
+    universe = args.tickers or config["screenerUniverse"]
+
+    while True:
+        for rank, candidate in enumerate(screen(universe, args.top), 1):
+            print(
+                f"{rank:>3} {candidate.ticker:<6} {candidate.trend:<5} "
+                f"score {candidate.score:.4f} rsi {candidate.rsi:.1f} "
+                f"stoch {candidate.stoch_k:.1f}/{candidate.stoch_d:.1f}"
+            )
+        if not args.watch:
+            break
+
+        # Right after the next bar is published
+        wake = next_bar_close("5m", time.time()) + config["barCloseGrace"]
+        time.sleep(max(0, wake - time.time()))
@@ -0,0 +1,48 @@
+# Import necessary libraries
+import json
+
+# Where the settings are read from unless load_config() is given another file
+DEFAULT_PATH = "config.json"
+
+
+class Config(dict):
+    def __init__(self):
+        """
+        The settings of config.json, shared by every module.
+
+        Entry points read the file explicitly with load_config(). A module used
+        on its own reads it the first time a setting is looked up, never when
+        it is imported.
+        """
+        super().__init__()
+        self.path = DEFAULT_PATH
+        self.loaded = False
+
+    def __missing__(self, key):
+        if self.loaded:
+            raise KeyError(key)
+        load_config(self.path)
+        return self[key]
+
+
+config = Config()
+
+
+def load_config(path=None):
+    """
+    Read the settings file into the shared config, replacing what was there.
+
+    Args:
+        path (str, optional): The JSON file. Defaults to the last file read, or config.json.
+
+    Returns:
+        Config: The shared config.
+    """
+    path = path or config.path
+    with open(path, "r") as f:
+        values = json.load(f)
+
+    config.clear()
+    config.update(values)
+    config.path, config.loaded = path, True
+    return config
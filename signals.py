@@ -0,0 +1,447 @@
+# Import necessary libraries
+import operator
+
+import numpy as np
+
+from indicators import ema_series, rsi_series, stoch_series
+
+
+class Node:
+    """
+    Base class of the signal expressions.
+
+    A node is identified by its key, built from its type, parameters and
+    inputs, so equal expressions written twice are computed once. Every node
+    holds one row per bar and one column per ticker, comparisons and logic
+    included, so a strategy can be read on the latest bar or on every bar.
+
+    Expressions are combined with the usual operators: +, -, *, / between
+    series, <, <=, >, >= for comparisons and &, |, ~ for logic.
+    """
+
+    inputs = ()
+
+    @property
+    def key(self):
+        return (type(self).__name__, self.params(), tuple(i.key for i in self.inputs))
+
+    def params(self):
+        return ()
+
+    def compute(self, bars, *values):
+        raise NotImplementedError
+
+    def __add__(self, other):
+        return Arithmetic("+", self, other)
+
+    def __sub__(self, other):
+        return Arithmetic("-", self, other)
+
+    def __mul__(self, other):
+        return Arithmetic("*", self, other)
+
+    def __truediv__(self, other):
+        return Arithmetic("/", self, other)
+
+    def __lt__(self, other):
+        return Compare("<", self, other)
+
+    def __le__(self, other):
+        return Compare("<=", self, other)
+
+    def __gt__(self, other):
+        return Compare(">", self, other)
+
+    def __ge__(self, other):
+        return Compare(">=", self, other)
+
+    def __and__(self, other):
+        return Logic("&", self, other)
+
+    def __or__(self, other):
+        return Logic("|", self, other)
+
+    def __invert__(self):
+        return Logic("~", self)
+
+
+def _node(value):
+    return value if isinstance(value, Node) else Constant(value)
+
+
+def latest(value):
+    """
+    Get the latest bar of a series, or the value itself if it is not one.
+    """
+    value = np.asarray(value)
+    return value[-1] if value.ndim == 2 else value
+
+
+class Constant(Node):
+    def __init__(self, value):
+        self.value = value
+
+    def params(self):
+        return (self.value,)
+
+    def compute(self, bars):
+        return np.asarray(self.value, dtype=float)
+
+
+class Price(Node):
+    def __init__(self, interval, field="close"):
+        """
+        A column of the bars, e.g. Price('5m', 'close').
+        """
+        self.interval = interval
+        self.field = field
+
+    def params(self):
+        return (self.interval, self.field)
+
+    def compute(self, bars):
+        return bars[self.interval][self.field]
+
+
+class EMA(Node):
+    def __init__(self, source, period):
+        self.inputs = (source,)
+        self.period = period
+
+    def params(self):
+        return (self.period,)
+
+    def compute(self, bars, source):
+        return ema_series(source, self.period)
+
+
+class RSI(Node):
+    def __init__(self, source, period=14):
+        self.inputs = (source,)
+        self.period = period
+
+    def params(self):
+        return (self.period,)
+
+    def compute(self, bars, source):
+        return rsi_series(source, self.period)
+
+
+class Stochastic(Node):
+    def __init__(self, interval, k_period=9, k_slowing=6, d_period=9):
+        """
+        The slow %K and %D of an interval's bars, read as .k and .d.
+        """
+        self.inputs = tuple(
+            Price(interval, field) for field in ("high", "low", "close")
+        )
+        self.periods = (k_period, k_slowing, d_period)
+
+    def params(self):
+        return self.periods
+
+    def compute(self, bars, high, low, close):
+        return stoch_series(high, low, close, *self.periods)
+
+    @property
+    def k(self):
+        return Item(self, 0)
+
+    @property
+    def d(self):
+        return Item(self, 1)
+
+
+class Item(Node):
+    def __init__(self, source, index):
+        self.inputs = (source,)
+        self.index = index
+
+    def params(self):
+        return (self.index,)
+
+    def compute(self, bars, source):
+        return source[self.index]
+
+
+class Arithmetic(Node):
+    OPERATORS = {
+        "+": operator.add,
+        "-": operator.sub,
+        "*": operator.mul,
+        "/": operator.truediv,
+    }
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.inputs = (_node(left), _node(right))
+
+    def params(self):
+        return (self.op,)
+
+    def compute(self, bars, left, right):
+        return self.OPERATORS[self.op](left, right)
+
+
+class Compare(Node):
+    OPERATORS = {
+        "<": operator.lt,
+        "<=": operator.le,
+        ">": operator.gt,
+        ">=": operator.ge,
+    }
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.inputs = (_node(left), _node(right))
+
+    def params(self):
+        return (self.op,)
+
+    def compute(self, bars, left, right):
+        # NaN (still warming up) compares False
+        return self.OPERATORS[self.op](left, right)
+
+
+class Logic(Node):
+    def __init__(self, op, *inputs):
+        self.op = op
+        self.inputs = inputs
+
+    def params(self):
+        return (self.op,)
+
+    def compute(self, bars, *values):
+        if self.op == "~":
+            return ~values[0]
+        if self.op == "&":
+            return values[0] & values[1]
+        return values[0] | values[1]
+
+
+def between(value, low, high):
+    """
+    True where a value is strictly inside a band.
+    """
+    return (value > low) & (value < high)
+
+
+def aligned(*series):
+    """
+    True where the values are in strictly decreasing order, e.g.
+    aligned(ema9, ema26, ema50) for an up trend.
+    """
+    condition = series[0] > series[1]
+    for higher, lower in zip(series[1:], series[2:]):
+        condition = condition & (higher > lower)
+    return condition
+
+
+class Crosses(Node):
+    def __init__(self, left, right, direction="above"):
+        """
+        True on the bars where left crossed right.
+
+        Args:
+            left (Node): A series.
+            right (Node): A series or a constant.
+            direction (str, optional): 'above' or 'below'. Defaults to 'above'.
+        """
+        self.inputs = (_node(left), _node(right))
+        self.direction = direction
+
+    def params(self):
+        return (self.direction,)
+
+    def compute(self, bars, left, right):
+        left, right = np.asarray(left), np.broadcast_to(right, np.shape(left))
+        crossed = np.zeros(left.shape, dtype=bool)
+
+        if self.direction == "above":
+            crossed[1:] = (left[:-1] <= right[:-1]) & (left[1:] > right[1:])
+        else:
+            crossed[1:] = (left[:-1] >= right[:-1]) & (left[1:] < right[1:])
+        return crossed
+
+
+class SignalEvaluator:
+    def __init__(self, outputs):
+        """
+        Compile named signal expressions into one evaluation plan.
+
+        Every distinct node (by key) is computed once per evaluation, however
+        many outputs share it, in an order where inputs come first.
+
+        Args:
+            outputs (dict): Name -> Node.
+        """
+        self.slots = {}  # key -> position in the plan
+        self.plan = []  # (node, input positions), inputs first
+        self._steps_cache = {}  # known positions -> positions to compute
+
+        def visit(node):
+            key = node.key
+            if key in self.slots:
+                return self.slots[key]
+            sources = [visit(source) for source in node.inputs]
+            self.slots[key] = len(self.plan)
+            self.plan.append((node, sources))
+            return self.slots[key]
+
+        self.outputs = {name: visit(node) for name, node in outputs.items()}
+
+    def intervals(self):
+        """
+        Get the bar intervals the expressions read, the only data to load.
+        """
+        return sorted(
+            {node.interval for node, _ in self.plan if isinstance(node, Price)}
+        )
+
+    def _steps(self, given):
+        """
+        Get the positions to compute when the given ones are known: the nodes
+        an output still needs, inputs first.
+        """
+        steps = self._steps_cache.get(given)
+        if steps is None:
+            needed = set(self.outputs.values())
+            for slot in range(len(self.plan) - 1, -1, -1):
+                if slot in needed and slot not in given:
+                    needed.update(self.plan[slot][1])
+            steps = [slot for slot in sorted(needed) if slot not in given]
+            self._steps_cache[given] = steps
+        return steps
+
+    def evaluate_series(self, bars, known=None):
+        """
+        Evaluate every output on every bar for a batch of tickers.
+
+        Args:
+            bars (dict): Interval -> field -> matrix of shape (bars, tickers),
+                oldest bar first, the same tickers in the same columns.
+            known (dict, optional): Node -> value already computed elsewhere,
+                e.g. the readings of a streaming indicator, used instead of
+                computing the node (and the inputs only it reads) from the bars.
+
+        Returns:
+            dict: Name -> matrix of shape (bars, tickers).
+        """
+        values = [None] * len(self.plan)
+        given = []
+        for node, value in (known or {}).items():
+            slot = self.slots.get(node.key)
+            if slot is not None:
+                values[slot] = value
+                given.append(slot)
+
+        # NaN (still warming up) compares False, dividing by it gives NaN
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for slot in self._steps(frozenset(given)):
+                node, sources = self.plan[slot]
+                values[slot] = node.compute(
+                    bars, *(values[source] for source in sources)
+                )
+        return {name: values[slot] for name, slot in self.outputs.items()}
+
+    def evaluate(self, bars, known=None):
+        """
+        Evaluate every output on the latest bar for a batch of tickers.
+
+        Args:
+            bars (dict): See evaluate_series.
+            known (dict, optional): See evaluate_series.
+
+        Returns:
+            dict: Name -> array with the latest value of every ticker.
+        """
+        return {
+            name: latest(value)
+            for name, value in self.evaluate_series(bars, known).items()
+        }
+
+
+def emas(ema_periods=(9, 26, 50), interval="30m"):
+    """
+    The EMAs of an interval's closes, the fastest first.
+    """
+    return [EMA(Price(interval, "close"), period) for period in ema_periods]
+
+
+def trend_rules(ema_periods=(9, 26, 50), interval="30m"):
+    """
+    The general trend of Trader.run: the EMAs aligned one way or the other.
+
+    Returns:
+        dict: 'long' and 'short' conditions.
+    """
+    lines = emas(ema_periods, interval)
+    return {"long": aligned(*lines), "short": aligned(*reversed(lines))}
+
+
+def filter_rules(
+    ema_periods=(9, 26, 50), rsi_period=14, stoch_periods=(9, 6, 9), interval="5m"
+):
+    """
+    The confirmation filters of Trader.run, read on the base bars.
+
+    Returns:
+        dict: The 'instant_trend', 'rsi' and 'stochastic' filters of each side
+            (e.g. 'rsi_long'), their conjunction as 'long' and 'short', and the
+            'rsi', 'stoch_k' and 'stoch_d' readings.
+    """
+    instant = trend_rules(ema_periods, interval)
+    rsi = RSI(Price(interval, "close"), rsi_period)
+    stoch = Stochastic(interval, *stoch_periods)
+    k, d = stoch.k, stoch.d
+
+    filters = {
+        "instant_trend_long": instant["long"],
+        "instant_trend_short": instant["short"],
+        "rsi_long": between(rsi, 50, 80),
+        "rsi_short": between(rsi, 20, 50),
+        "stochastic_long": (k > d) & (k < 80) & (d < 80),
+        "stochastic_short": (k < d) & (k > 20) & (d > 20),
+    }
+    for side in ("long", "short"):
+        filters[side] = (
+            filters[f"instant_trend_{side}"]
+            & filters[f"rsi_{side}"]
+            & filters[f"stochastic_{side}"]
+        )
+
+    return {**filters, "rsi": rsi, "stoch_k": k, "stoch_d": d}
+
+
+def default_strategy(
+    ema_periods=(9, 26, 50),
+    rsi_period=14,
+    stoch_periods=(9, 6, 9),
+    trend_interval="30m",
+    base_interval="5m",
+):
+    """
+    The entry rules of Trader.run as signal expressions.
+
+    Returns:
+        dict: 'long' and 'short' conditions, the 'score' the screener ranks by
+            and the 'rsi', 'stoch_k' and 'stoch_d' readings.
+    """
+    trend = trend_rules(ema_periods, trend_interval)
+    filters = filter_rules(ema_periods, rsi_period, stoch_periods, base_interval)
+    trend_emas = emas(ema_periods, trend_interval)
+
+    long = trend["long"] & filters["long"]
+    short = trend["short"] & filters["short"]
+
+    # How far apart the fast and slow EMAs of the general trend are
+    spread = (trend_emas[0] - trend_emas[-1]) / Price(trend_interval, "close")
+
+    return {
+        "long": long,
+        "short": short,
+        "score": spread,
+        "rsi": filters["rsi"],
+        "stoch_k": filters["stoch_k"],
+        "stoch_d": filters["stoch_d"],
+    }
@@ -0,0 +1,448 @@
+# Import necessary libraries
+import itertools
+import json
+import types
+
+import numpy as np
+
+# Importing API
+from alpaca.common.exceptions import APIError
+
+from barstore import FIELDS, period_start
+from cache import BarCache, interval_seconds
+from logger import *
+from ringbuffer import Bars
+
+
+class ReplayFinished(BaseException):
+    """
+    Raised when a simulated session runs past the end of the replayed bars.
+
+    It derives from BaseException so the Trader's own error handling does not
+    swallow it and the session stops where the data ends.
+    """
+
+
+def _not_found(message):
+    response = types.SimpleNamespace(status_code=404)
+    return APIError(
+        json.dumps({"code": 40410000, "message": message}),
+        types.SimpleNamespace(response=response, request=None),
+    )
+
+
+def _side(value):
+    return str(getattr(value, "value", value)).lower()
+
+
+class SimulatedBroker:
+    def __init__(
+        self,
+        bars,
+        start=None,
+        cash=100000.0,
+        latency=0.0,
+        slippage=0.0,
+        base_interval="5m",
+        trade_updates=None,
+    ):
+        """
+        In-memory broker filling orders against replayed bars.
+
+        It implements the TradingClient calls used by Trader and main.py and a
+        replay clock: sleep() moves the clock forward and fills the pending
+        orders against every bar that opened in between, so a whole session
+        runs without network access or real waiting.
+
+        Args:
+            bars (dict): (ticker, interval) -> OHLCV arrays, oldest first.
+            start (float, optional): Replay start time. Defaults to the 60th base bar.
+            cash (float, optional): Starting cash. Defaults to 100000.
+            latency (float, optional): Seconds before an order reaches the market.
+            slippage (float, optional): Fraction of price lost on fills at the open.
+            base_interval (str, optional): The interval orders are filled on. Defaults to '5m'.
+            trade_updates (LocalTradeUpdates, optional): Where fills and cancels are emitted.
+        """
+        self.bars = bars
+        self.cash = cash
+        self.latency = latency
+        self.slippage = slippage
+        self.base_interval = base_interval
+        self.trade_updates = trade_updates
+        self.orders = {}  # order_id -> order
+        self.positions = {}  # ticker -> [qty, avg_entry_price]
+        self.fills = []
+        self._ids = itertools.count(1)
+
+        base_times = [
+            values["time"]
+            for (ticker, interval), values in bars.items()
+            if interval == base_interval
+        ]
+        self.end = max(int(times[-1]) for times in base_times) + interval_seconds(
+            base_interval
+        )
+        self.now = (
+            start if start is not None else min(int(times[60]) for times in base_times)
+        )
+
+    # Replay clock
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """
+        Move the replay clock forward, filling orders on the bars passed.
+
+        Raises:
+            ReplayFinished: If the clock runs past the last bar.
+        """
+        previous, self.now = self.now, self.now + seconds
+        for ticker, values in self._base_bars():
+            times = values["time"]
+            first = np.searchsorted(times, previous, side="right")
+            last = np.searchsorted(times, self.now, side="right")
+            for index in range(first, last):
+                self._fill_on_bar(ticker, values, index)
+
+        if self.now >= self.end:
+            raise ReplayFinished(f"Replay ended at {self.end}")
+
+    def _base_bars(self):
+        return [
+            (ticker, values)
+            for (ticker, interval), values in self.bars.items()
+            if interval == self.base_interval
+        ]
+
+    def last_price(self, ticker):
+        """
+        Get the latest known price: the close of the last closed bar, or the
+        open of the bar being built.
+        """
+        values = self.bars[(ticker, self.base_interval)]
+        index = np.searchsorted(values["time"], self.now, side="right") - 1
+        if index < 0:
+            raise _not_found(f"No price for {ticker} yet")
+        if values["time"][index] + interval_seconds(self.base_interval) <= self.now:
+            return float(values["close"][index])
+        return float(values["open"][index])
+
+    def load_historical_data(self, ticker, interval, period):
+        """
+        Get the bars known at the replay time, like Trader.load_historical_data.
+        """
+        values = self.bars[(ticker, interval)]
+        times = values["time"]
+        closed = np.searchsorted(times + interval_seconds(interval), self.now, "right")
+        first = np.searchsorted(times, period_start(period, self.now), side="left")
+        return Bars(*(values[field][first:closed] for field in FIELDS))
+
+    def bar_cache(self, max_size=64):
+        """
+        Get a bar cache reading from the replay instead of downloading.
+        """
+        return BarCache(self.load_historical_data, max_size=max_size, clock=self.time)
+
+    # TradingClient surface
+
+    def get_account(self):
+        equity = self.cash + sum(
+            qty * self.last_price(ticker) for ticker, (qty, _) in self.positions.items()
+        )
+        return types.SimpleNamespace(
+            status="ACTIVE", equity=equity, cash=self.cash, buying_power=self.cash
+        )
+
+    def get_asset(self, ticker):
+        if (ticker, self.base_interval) not in self.bars:
+            raise _not_found(f"Asset {ticker} not found")
+        return types.SimpleNamespace(symbol=ticker, tradable=True)
+
+    def get_open_position(self, ticker):
+        if ticker not in self.positions:
+            raise _not_found(f"Position {ticker} does not exist")
+
+        qty, avg_entry_price = self.positions[ticker]
+        return types.SimpleNamespace(
+            symbol=ticker,
+            qty=abs(qty),
+            side="long" if qty > 0 else "short",
+            avg_entry_price=avg_entry_price,
+            current_price=self.last_price(ticker),
+        )
+
+    def _new_order(self, symbol, qty, side, type, status="new", **prices):
+        order = types.SimpleNamespace(
+            id=f"sim-{next(self._ids)}",
+            symbol=symbol,
+            qty=float(qty),
+            side=side,
+            type=type,
+            limit_price=prices.get("limit_price"),
+            stop_price=prices.get("stop_price"),
+            status=status,
+            filled_qty=0.0,
+            filled_avg_price=None,
+            active_at=self.now + self.latency,
+            legs=None,
+            parent_id=None,
+        )
+        self.orders[order.id] = order
+        return order
+
+    def submit_order(self, order_data):
+        order = self._new_order(
+            order_data.symbol,
+            order_data.qty,
+            _side(order_data.side),
+            _side(order_data.type),
+            limit_price=getattr(order_data, "limit_price", None),
+        )
+
+        if _side(getattr(order_data, "order_class", None)) == "bracket":
+            # Exit legs held until the entry fills, the stop loss matched first
+            exit_side = "sell" if order.side == "buy" else "buy"
+            order.legs = [
+                self._new_order(
+                    order.symbol,
+                    order.qty,
+                    exit_side,
+                    "stop",
+                    status="held",
+                    stop_price=order_data.stop_loss.stop_price,
+                ),
+                self._new_order(
+                    order.symbol,
+                    order.qty,
+                    exit_side,
+                    "limit",
+                    status="held",
+                    limit_price=order_data.take_profit.limit_price,
+                ),
+            ]
+            for leg in order.legs:
+                leg.parent_id = order.id
+
+        self._emit("new", order)
+        return order
+
+    def get_order_by_id(self, order_id):
+        order = self.orders.get(str(order_id))
+        if order is None:
+            raise _not_found(f"Order {order_id} not found")
+        return order
+
+    def get_orders(self):
+        # Bracket legs are listed as orders of their own, like Alpaca does
+        return [
+            order for order in self.orders.values() if order.status in ("new", "held")
+        ]
+
+    def replace_order_by_id(self, order_id, order_data):
+        old = self.orders.get(str(order_id))
+        if old is None or old.status not in ("new", "held"):
+            raise _not_found(f"Order {order_id} is not open")
+
+        order = self._new_order(
+            old.symbol,
+            order_data.qty or old.qty,
+            old.side,
+            old.type,
+            status=old.status,
+            limit_price=order_data.limit_price or old.limit_price,
+            stop_price=order_data.stop_price or old.stop_price,
+        )
+        order.active_at, order.parent_id = old.active_at, old.parent_id
+        old.status = "replaced"
+
+        if old.parent_id is not None:
+            legs = self.orders[old.parent_id].legs
+            legs[legs.index(old)] = order
+        self._emit("replaced", old)
+        return order
+
+    def cancel_order_by_id(self, order_id):
+        order = self.orders.get(str(order_id))
+        if order is None or order.status not in ("new", "held"):
+            raise _not_found(f"Order {order_id} is not open")
+        order.status = "canceled"
+        self._emit("canceled", order)
+
+        # Cancelling an entry or an exit leg cancels the legs that go with it
+        parent = self.orders.get(order.parent_id) if order.parent_id else order
+        for leg in parent.legs or ():
+            if leg.status in ("new", "held"):
+                leg.status = "canceled"
+                self._emit("canceled", leg)
+
+    def cancel_orders(self):
+        for order in self.get_orders():
+            # Legs are cancelled with their entry
+            if order.status in ("new", "held"):
+                self.cancel_order_by_id(order.id)
+
+    # Matching
+
+    def _fill_on_bar(self, ticker, values, index):
+        bar_time = values["time"][index]
+        for order in list(self.orders.values()):
+            if (
+                order.symbol != ticker
+                or order.status != "new"
+                or order.active_at > bar_time
+            ):
+                continue
+
+            buying = order.side == "buy"
+            open_price = float(values["open"][index])
+            slipped = open_price * (1 + self.slippage if buying else 1 - self.slippage)
+
+            if order.type == "market":
+                self._fill(order, slipped)
+            elif order.type == "stop":
+                if buying and values["high"][index] >= order.stop_price:
+                    self._fill(order, max(slipped, order.stop_price))
+                elif not buying and values["low"][index] <= order.stop_price:
+                    self._fill(order, min(slipped, order.stop_price))
+            elif buying and open_price <= order.limit_price:
+                self._fill(order, min(slipped, order.limit_price))
+            elif not buying and open_price >= order.limit_price:
+                self._fill(order, max(slipped, order.limit_price))
+            elif buying and values["low"][index] <= order.limit_price:
+                self._fill(order, order.limit_price)
+            elif not buying and values["high"][index] >= order.limit_price:
+                self._fill(order, order.limit_price)
+
+    def _fill(self, order, price):
+        signed = order.qty if order.side == "buy" else -order.qty
+        qty, avg_entry_price = self.positions.get(order.symbol, [0.0, 0.0])
+        new_qty = qty + signed
+
+        if qty == 0 or (qty > 0) == (signed > 0):
+            # Opening or adding to the position
+            avg_entry_price = (qty * avg_entry_price + signed * price) / new_qty
+        elif new_qty != 0 and (new_qty > 0) != (qty > 0):
+            # Flipped to the other side
+            avg_entry_price = price
+
+        self.cash -= signed * price
+        if new_qty == 0:
+            self.positions.pop(order.symbol, None)
+        else:
+            self.positions[order.symbol] = [new_qty, avg_entry_price]
+
+        order.status = "filled"
+        order.filled_qty = order.qty
+        order.filled_avg_price = price
+        self.fills.append((self.now, order.symbol, signed, price))
+        self._emit("fill", order)
+
+        if order.legs:
+            # The exit legs work from the current replay time on
+            for leg in order.legs:
+                leg.status, leg.active_at = "new", self.now
+        elif order.parent_id is not None:
+            # One exit leg filled, the other one is cancelled
+            for leg in self.orders[order.parent_id].legs:
+                if leg.status in ("new", "held"):
+                    leg.status = "canceled"
+                    self._emit("canceled", leg)
+
+    def _emit(self, event, order):
+        if self.trade_updates is not None:
+            self.trade_updates.emit(
+                event, order.id, order.symbol, order.filled_qty, order.filled_avg_price
+            )
+
+
+def synthetic_bars(ticker, days=10, seed=0, start=1700006400):
+    """
+    Make a random walk of 5 minute bars and the matching 30 minute bars.
+
+    Used when no recorded bars are at hand. Bars run around the clock, one
+    trading day being 78 bars.
+
+    Args:
+        ticker (str): The ticker the bars are keyed under.
+        days (int, optional): The number of 78 bar days. Defaults to 10.
+        seed (int, optional): The random seed. Defaults to 0.
+        start (int, optional): The first bar time, aligned on 30 minutes.
+
+    Returns:
+        dict: (ticker, interval) -> OHLCV arrays, for SimulatedBroker.
+    """
+    rng = np.random.default_rng(seed)
+    size = days * 78 - days * 78 % 6
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.002, size)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    bars = {
+        "time": start + 300 * np.arange(size, dtype="int64"),
+        "open": open_,
+        "high": np.maximum(open_, close) * 1.0005,
+        "low": np.minimum(open_, close) * 0.9995,
+        "close": close,
+        "volume": np.full(size, 1000.0),
+    }
+
+    blocks = {field: values.reshape(-1, 6) for field, values in bars.items()}
+    trend_bars = {
+        "time": blocks["time"][:, 0],
+        "open": blocks["open"][:, 0],
+        "high": blocks["high"].max(axis=1),
+        "low": blocks["low"].min(axis=1),
+        "close": blocks["close"][:, -1],
+        "volume": blocks["volume"].sum(axis=1),
+    }
+
+    return {(ticker, "5m"): bars, (ticker, "30m"): trend_bars}
+
+
+def simulated_trader(broker, ticker):
+    """
+    Build a Trader wired to a simulated broker: its own bar cache, indicators,
+    quotes, sleep and clock, so nothing is shared with live traders.
+    """
+    from indicators import IndicatorEngine
+    from PocketTrader import Trader
+    from settings import config
+
+    return Trader(
+        ticker,
+        broker,
+        cache=broker.bar_cache(),
+        indicators=IndicatorEngine(
+            ema_periods=config["emaPeriods"],
+            rsi_period=config["rsiPeriod"],
+            stoch_periods=config["stochPeriods"],
+        ),
+        last_price=broker.last_price,
+        sleep=broker.sleep,
+        clock=broker.time,
+    )
+
+
+def run_session(bars, ticker, **broker_options):
+    """
+    Run one Trader.run operation against a simulated broker.
+
+    Args:
+        bars (dict): (ticker, interval) -> OHLCV arrays, with '5m' and '30m' bars.
+        ticker (str): The ticker to trade.
+        **broker_options: Passed to SimulatedBroker.
+
+    Returns:
+        tuple: The result of Trader.run (None if the replay ended) and the broker.
+    """
+    broker = SimulatedBroker(bars, **broker_options)
+    trader = simulated_trader(broker, ticker)
+
+    try:
+        return trader.run(ticker), broker
+    except ReplayFinished:
+        return None, broker
+    except Exception as e:
+        # Trader.run raises when a pending order cannot be cancelled
+        logging.info(f"Simulated session for {ticker} ended: {e}")
+        return False, broker
@@ -0,0 +1,195 @@
+# Import necessary libraries
+import threading
+
+# Importing API
+from alpaca.data.live import StockDataStream
+
+from logger import *
+
+
+class AlpacaTransport:
+    def __init__(self, api_key, secret_key, quotes=False):
+        """
+        Price transport over Alpaca's real time stock data websocket.
+
+        Args:
+            api_key (str): The Alpaca API key.
+            secret_key (str): The Alpaca secret API key.
+            quotes (bool, optional): Also use quote midpoints as prices. Defaults to False.
+        """
+        self.stream = StockDataStream(api_key, secret_key)
+        self.quotes = quotes
+
+    def subscribe(self, symbols, handler):
+        """
+        Call handler(symbol, price) for every trade (and quote) of the symbols.
+        """
+
+        async def on_trade(trade):
+            handler(trade.symbol, float(trade.price))
+
+        async def on_quote(quote):
+            if quote.bid_price and quote.ask_price:
+                handler(quote.symbol, (quote.bid_price + quote.ask_price) / 2)
+
+        self.stream.subscribe_trades(on_trade, *symbols)
+        if self.quotes:
+            self.stream.subscribe_quotes(on_quote, *symbols)
+
+    def run(self):
+        self.stream.run()
+
+    def stop(self):
+        self.stream.stop()
+
+
+class LocalTransport:
+    def __init__(self):
+        """
+        In-process stand-in for the websocket, prices are pushed with publish().
+        """
+        self.handlers = []
+        self._stopped = threading.Event()
+
+    def subscribe(self, symbols, handler):
+        self.handlers.append((set(symbols), handler))
+
+    def publish(self, symbol, price):
+        """
+        Deliver a trade price to every handler subscribed to the symbol.
+        """
+        for symbols, handler in self.handlers:
+            if symbol in symbols:
+                handler(symbol, price)
+
+    def run(self):
+        self._stopped.wait()
+
+    def stop(self):
+        self._stopped.set()
+
+
+class PriceWatch:
+    def __init__(self, symbol, trend, stop_loss, take_profit):
+        """
+        Stop loss and take profit levels of one open position.
+
+        Args:
+            symbol (str): The ticker symbol of the position.
+            trend (str): The trade direction - 'long' or 'short'.
+            stop_loss (float): The stop loss price.
+            take_profit (float): The take profit price.
+        """
+        self.symbol = symbol
+        self.trend = trend
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.price = None
+        self.triggered = threading.Event()
+        self.callbacks = []
+
+    def add_callback(self, callback):
+        """
+        Call callback(watch) once when a level is reached.
+        """
+        self.callbacks.append(callback)
+
+    def check(self, price):
+        """
+        Check a new price against the levels.
+
+        Args:
+            price (float): The latest trade price.
+
+        Returns:
+            bool: True if this price reached the stop loss or the take profit.
+        """
+        if self.triggered.is_set():
+            return False
+
+        if self.trend == "long":
+            hit = price >= self.take_profit or price <= self.stop_loss
+        else:
+            hit = price <= self.take_profit or price >= self.stop_loss
+
+        if hit:
+            self.price = price
+            self.triggered.set()
+            for callback in self.callbacks:
+                callback(self)
+
+        return hit
+
+    def wait(self, timeout=None):
+        """
+        Block until a level is reached.
+
+        Args:
+            timeout (float, optional): The maximum seconds to wait.
+
+        Returns:
+            bool: True if a level was reached, False on timeout.
+        """
+        return self.triggered.wait(timeout)
+
+
+class PriceMonitor:
+    def __init__(self, transport, symbols):
+        """
+        Check every streamed price against the levels of the open positions.
+
+        Args:
+            transport: AlpacaTransport, LocalTransport or anything with subscribe/run/stop.
+            symbols (list): The ticker symbols to stream.
+        """
+        self.transport = transport
+        self.symbols = list(symbols)
+        self.last_prices = {}
+        self._watches = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.transport.subscribe(self.symbols, self.on_price)
+
+    def start(self):
+        """
+        Run the transport in a background thread.
+        """
+        self._thread = threading.Thread(
+            target=self.transport.run, name="PriceMonitor", daemon=True
+        )
+        self._thread.start()
+        logging.info(f"Streaming prices for {', '.join(self.symbols)}")
+
+    def stop(self):
+        self.transport.stop()
+
+    def watch(self, symbol, trend, stop_loss, take_profit):
+        """
+        Start checking the levels of a position.
+
+        Returns:
+            PriceWatch: Set as soon as a streamed price reaches a level.
+        """
+        watch = PriceWatch(symbol, trend, stop_loss, take_profit)
+        with self._lock:
+            self._watches[symbol] = watch
+        return watch
+
+    def unwatch(self, symbol):
+        with self._lock:
+            self._watches.pop(symbol, None)
+
+    def last_price(self, symbol):
+        """
+        Get the latest streamed price of a symbol, or None if none arrived yet.
+        """
+        return self.last_prices.get(symbol)
+
+    def on_price(self, symbol, price):
+        self.last_prices[symbol] = price
+
+        with self._lock:
+            watch = self._watches.get(symbol)
+
+        if watch is not None and watch.check(price):
+            logging.info(f"{symbol} streamed price {price:.2f} reached a level")
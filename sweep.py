@@ -0,0 +1,143 @@
+# Import necessary libraries
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import run_backtest
+from settings import load_config
+
+# Values tried for every knob when no grid is given
+DEFAULT_GRID = {
+    "stopLossMargin": [0.005, 0.01, 0.02, 0.05],
+    "takeProfitMargin": [0.005, 0.01, 0.02, 0.05],
+    "maxVar": [0.001, 0.005, 0.01],
+    "emaPeriods": [(5, 13, 34), (9, 26, 50), (12, 26, 60)],
+    "rsiPeriod": [9, 14, 21],
+    "stochPeriods": [(9, 6, 9), (14, 3, 3)],
+}
+
+# Bars attached from shared memory in each worker process
+_worker_bars = None
+_worker_blocks = []
+
+
+def param_grid(grid):
+    """
+    Expand a grid of knob values into every combination.
+
+    Args:
+        grid (dict): Knob name -> list of values to try.
+
+    Returns:
+        list: One params dict per combination.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def share_bars(bars):
+    """
+    Copy OHLCV arrays into shared memory blocks.
+
+    Args:
+        bars (dict): Field name -> NumPy array.
+
+    Returns:
+        tuple: The created blocks and a picklable spec to attach to them.
+    """
+    blocks, spec = [], {}
+    for field, values in bars.items():
+        values = np.ascontiguousarray(values)
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+        blocks.append(block)
+        spec[field] = (block.name, values.shape, values.dtype.str)
+    return blocks, spec
+
+
+def attach_bars(spec):
+    """
+    Map shared OHLCV arrays without copying them.
+
+    Args:
+        spec (dict): The spec returned by share_bars.
+
+    Returns:
+        tuple: The attached blocks and the field name -> NumPy array views.
+    """
+    blocks, bars = [], {}
+    for field, (name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        bars[field] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    return blocks, bars
+
+
+def _init_worker(bars_spec, trend_spec):
+    global _worker_bars, _worker_blocks
+    bars_blocks, bars = attach_bars(bars_spec)
+    trend_blocks, trend_bars = attach_bars(trend_spec)
+    _worker_blocks = bars_blocks + trend_blocks
+    _worker_bars = (bars, trend_bars)
+
+
+def _run_one(params):
+    result = run_backtest(*_worker_bars, params)
+    return {**params, **result.summary()}
+
+
+def run_sweep(bars, trend_bars, grid=None, max_workers=None, rank_by="total_return"):
+    """
+    Backtest every combination of a grid over a pool of processes.
+
+    The bars are placed in shared memory once and every worker maps them, so
+    nothing but the params and the summaries is pickled per backtest.
+
+    Args:
+        bars (dict): The 5 minute OHLCV arrays.
+        trend_bars (dict): The 30 minute OHLCV arrays.
+        grid (dict, optional): Knob name -> values to try. Defaults to DEFAULT_GRID.
+        max_workers (int, optional): The number of processes. Defaults to the CPU count.
+        rank_by (str, optional): The summary column to rank by. Defaults to 'total_return'.
+
+    Returns:
+        DataFrame: One row per combination, best first.
+    """
+    combinations = param_grid(grid or DEFAULT_GRID)
+    max_workers = max_workers or os.cpu_count()
+    chunksize = max(1, len(combinations) // (max_workers * 4))
+
+    bars_blocks, bars_spec = share_bars(bars)
+    trend_blocks, trend_spec = share_bars(trend_bars)
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(bars_spec, trend_spec),
+        ) as executor:
+            rows = list(executor.map(_run_one, combinations, chunksize=chunksize))
+    finally:
+        for block in bars_blocks + trend_blocks:
+            block.close()
+            block.unlink()
+
+    table = pd.DataFrame(rows)
+    return table.sort_values(rank_by, ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    from PocketTrader import load_stored_bars
+
+    load_config()
+    ticker = sys.argv[1] if len(sys.argv) > 1 else "SPY"
+    table = run_sweep(
+        load_stored_bars(ticker, "5m", "60d"),
+        load_stored_bars(ticker, "30m", "60d"),
+    )
+    print(table.head(20).to_string())
@@ -0,0 +1,12 @@
+# Import necessary libraries
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules live at the top of the repository, next to config.json
+sys.path.insert(0, ROOT)
+
+from settings import load_config
+
+load_config(os.path.join(ROOT, "config.json"))
@@ -0,0 +1,102 @@
+# Import necessary libraries
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from barstore import BarStore, period_start, resample_bars
+
+
+def make_bars(times, close=None):
+    times = np.asarray(times, dtype=np.int64)
+    close = np.asarray(times if close is None else close, dtype=float)
+    return {
+        "time": times,
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": np.ones(len(times)),
+    }
+
+
+def test_appends_only_the_bars_newer_than_the_stored_ones(tmp_path):
+    store = BarStore(str(tmp_path))
+    assert store.last_time("AAPL", "5m") is None
+    assert store.read("AAPL", "5m")["time"].tolist() == []
+
+    assert store.append("AAPL", "5m", make_bars([0, 300, 600])) == 3
+    assert store.append("AAPL", "5m", make_bars([300, 600, 900], [1, 2, 3])) == 1
+
+    bars = store.read("AAPL", "5m")
+    assert bars["time"].tolist() == [0, 300, 600, 900]
+    assert bars["close"].tolist() == [0.0, 300.0, 600.0, 3.0]
+    assert store.last_time("AAPL", "5m") == 900
+    assert store.read("AAPL", "5m", start=300, end=900)["time"].tolist() == [300, 600]
+
+
+def test_sync_downloads_from_the_newest_stored_bar(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.append("AAPL", "5m", make_bars([0, 300]))
+    requested = []
+
+    def fetch(since):
+        requested.append(since)
+        return make_bars([300, 600, 900])
+
+    # The 900 bar closes at 1200, it is returned but not stored
+    bars = store.sync("AAPL", "5m", fetch, start=300, now=1000)
+
+    assert requested == [300]
+    assert bars["time"].tolist() == [300, 600, 900]
+    assert store.last_time("AAPL", "5m") == 600
+
+    # Once closed it is stored like the others
+    store.sync("AAPL", "5m", lambda since: make_bars([900]), now=1200)
+    assert store.read("AAPL", "5m")["time"].tolist() == [0, 300, 600, 900]
+
+
+def test_resampled_bars_keep_the_bucket_being_built():
+    # 5 minute bars from 9:30 to 10:10, the 10:00 bucket only half built
+    times = 34200 + 300 * np.arange(9)
+    bars = make_bars(times, np.arange(9.0))
+    bars["high"] = bars["close"] + 1
+    bars["volume"] = np.full(9, 10.0)
+
+    resampled = resample_bars(bars, "30m")
+    assert resampled["time"].tolist() == [34200, 36000]
+    assert resampled["open"].tolist() == [0.0, 6.0]
+    assert resampled["high"].tolist() == [6.0, 9.0]
+    assert resampled["low"].tolist() == [0.0, 6.0]
+    assert resampled["close"].tolist() == [5.0, 8.0]
+    assert resampled["volume"].tolist() == [60.0, 30.0]
+
+    # Hourly bars start at half past
+    hourly = resample_bars(bars, "1h")
+    assert hourly["time"].tolist() == [34200]
+    assert resample_bars(make_bars([]), "30m")["time"].tolist() == []
+
+
+def timestamp(*day):
+    return int(datetime(*day, tzinfo=timezone.utc).timestamp())
+
+
+@pytest.mark.parametrize(
+    "period, start",
+    [
+        ("1d", (2024, 3, 8, 15)),  # business days skip the weekend
+        ("5d", (2024, 3, 4, 15)),
+        ("1wk", (2024, 3, 4, 15)),
+        ("1mo", (2024, 2, 11, 15)),
+        ("ytd", (2024, 1, 1)),
+    ],
+)
+def test_period_start(period, start):
+    now = timestamp(2024, 3, 11, 15)
+    assert period_start(period, now) == timestamp(*start)
+
+
+def test_period_start_of_max_and_unknown_periods():
+    assert period_start("max", 0) is None
+    with pytest.raises(ValueError):
+        period_start("3q", 0)
@@ -0,0 +1,73 @@
+# Import necessary libraries
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import BarCache
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_misses_share_one_download():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def loader(ticker, interval, period):
+        calls.append((ticker, interval, period))
+        started.set()
+        release.wait(5)
+        return [ticker]
+
+    cache = BarCache(loader)
+    with ThreadPoolExecutor(4) as pool:
+        first = pool.submit(cache.get, "AAPL", "5m", "1d")
+        started.wait(5)
+        others = [pool.submit(cache.get, "AAPL", "5m", "1d") for _ in range(3)]
+        release.set()
+        results = [first.result(5)] + [other.result(5) for other in others]
+
+    assert calls == [("AAPL", "5m", "1d")]
+    assert all(result is results[0] for result in results)
+    assert cache.misses == 1 and cache.hits == 3
+
+
+def test_least_recently_used_entries_are_evicted():
+    calls = []
+    cache = BarCache(
+        lambda ticker, *_: calls.append(ticker) or ticker,
+        max_size=2,
+        clock=Clock(1000),
+    )
+    cache.get("AAPL", "5m", "1d")
+    cache.get("MSFT", "5m", "1d")
+    cache.get("AAPL", "5m", "1d")  # MSFT is now the oldest
+    cache.get("NVDA", "5m", "1d")
+
+    cache.get("AAPL", "5m", "1d")
+    cache.get("MSFT", "5m", "1d")
+    assert calls == ["AAPL", "MSFT", "NVDA", "MSFT"]
+
+
+def test_entries_expire_when_their_bar_closes():
+    clock = Clock(1000)
+    calls = []
+    cache = BarCache(lambda *key: calls.append(clock.now) or clock.now, clock=clock)
+
+    # Downloaded within the 5 minute bar that closes at 1200
+    assert cache.get("AAPL", "5m", "1d") == 1000
+    clock.now = 1199
+    assert cache.get("AAPL", "5m", "1d") == 1000
+    clock.now = 1200
+    assert cache.get("AAPL", "5m", "1d") == 1200
+
+    # A 30 minute bar keeps its entry longer
+    clock.now = 1201
+    cache.get("AAPL", "30m", "5d")
+    clock.now = 1799
+    cache.get("AAPL", "30m", "5d")
+    assert calls == [1000, 1200, 1201]
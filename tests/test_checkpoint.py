@@ -0,0 +1,109 @@
+# Import necessary libraries
+import asyncio
+import threading
+
+import pytest
+
+from checkpoint import CheckpointStore
+from scheduler import Stage, TraderPipeline
+from simbroker import SimulatedBroker, simulated_trader, synthetic_bars
+
+
+def test_trades_survive_a_restart(tmp_path):
+    store = CheckpointStore(str(tmp_path), clock=lambda: 1000.0)
+    store.save("AAPL", "order", order_id="a", trend="long")
+    store.save("MSFT", "in position", order_id="b", exit_legs={"stop_loss": "c"})
+    store.save_indicators({"AAPL": [1.0]})
+    store.clear("MSFT")
+    store.save("NVDA", "in position", order_id="d", exit_legs={"take_profit": "e"})
+
+    restarted = CheckpointStore(str(tmp_path))
+    assert restarted.tickers() == ["AAPL", "NVDA"]
+    assert restarted.get("AAPL") == {
+        "order_id": "a",
+        "trend": "long",
+        "stage": "order",
+        "saved_at": 1000.0,
+    }
+    assert restarted.get("MSFT") is None
+    assert restarted.order_ids() == {"a", "d", "e"}
+    assert restarted.indicators() == {"AAPL": [1.0]}
+
+
+def test_unreadable_checkpoints_are_ignored(tmp_path):
+    (tmp_path / "trades.json").write_text("{not json")
+    store = CheckpointStore(str(tmp_path))
+    assert store.tickers() == []
+    assert store.indicators() is None
+
+
+@pytest.fixture
+def restart(tmp_path):
+    """
+    A trader on a simulated broker with a checkpoint store on its clock.
+    """
+    broker = SimulatedBroker(synthetic_bars("SIM"))
+    trader = simulated_trader(broker, "SIM")
+    trader.checkpoints = CheckpointStore(str(tmp_path), clock=broker.time)
+    return broker, trader
+
+
+@pytest.mark.parametrize("filled", [False, True])
+def test_entry_orders_resume_as_they_are_at_the_broker(restart, filled):
+    broker, trader = restart
+    price = broker.last_price("SIM")
+    # Far enough from the price to stay open
+    limit_price = price if filled else round(price * 0.5, 2)
+    assert trader.submit_order("limit", "long", "SIM", 10, limit_price)
+    trader.checkpoints.save("SIM", "order", order_id=trader.order_id, trend="long")
+    broker.sleep(600)
+
+    trader.order_id = None
+    state = trader.reconcile("SIM")
+    assert trader.order_id == state["order_id"]
+    if filled:
+        assert state["stage"] == "in position" and state["shares_qty"] == 10
+        assert not state["order_open"]
+    else:
+        assert state["stage"] == "order" and state["order_open"]
+
+
+def test_closed_positions_start_over(restart):
+    broker, trader = restart
+    # The entry filled, but the position was closed while the bot was down
+    entry = broker._new_order("SIM", 10, "buy", "market", "filled")
+    trader.checkpoints.save("SIM", "in position", order_id=entry.id, trend="long")
+
+    assert trader.reconcile("SIM") is None
+    assert trader.checkpoints.get("SIM") is None
+
+
+def test_confirm_resumes_until_the_trend_bar_closes(restart):
+    broker, trader = restart
+    # Save right after a 30 minute bar opened
+    broker.sleep(1800 - broker.time() % 1800 + 60)
+    trader.checkpoints.save("SIM", "confirm", trend="long")
+
+    broker.sleep(600)
+    assert trader.reconcile("SIM")["stage"] == "confirm"
+
+    broker.sleep(1200)
+    assert trader.reconcile("SIM") is None
+
+
+def test_stages_are_saved_off_the_event_loop(restart):
+    broker, trader = restart
+    pipeline = TraderPipeline(trader)
+    pipeline.trend = "long"
+    threads = []
+    save_checkpoint = trader.save_checkpoint
+
+    def save(stage, **state):
+        threads.append(threading.current_thread())
+        save_checkpoint(stage, **state)
+
+    trader.save_checkpoint = save
+    asyncio.run(pipeline.set_stage(Stage.CONFIRM))
+
+    assert threads and threading.main_thread() not in threads
+    assert trader.checkpoints.get("SIM")["stage"] == "confirm"
@@ -0,0 +1,97 @@
+# Import necessary libraries
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from datasource import AlpacaSource, regular_hours
+
+
+def day_of_bars(year, month, day, minutes=30):
+    """
+    Bars around the clock of one UTC day.
+    """
+    first = int(datetime(year, month, day, tzinfo=timezone.utc).timestamp())
+    times = first + minutes * 60 * np.arange(24 * 60 // minutes, dtype="int64")
+    return {"time": times, "close": np.arange(len(times), dtype=float)}
+
+
+@pytest.mark.parametrize(
+    "day, first, last",
+    [
+        ((2024, 3, 8), "14:30", "20:30"),  # standard time
+        ((2024, 3, 11), "13:30", "19:30"),  # daylight saving time
+    ],
+)
+def test_regular_hours_keeps_the_new_york_session(day, first, last):
+    bars = regular_hours(day_of_bars(*day))
+
+    opens = [
+        datetime.fromtimestamp(int(t), tz=timezone.utc).strftime("%H:%M")
+        for t in bars["time"]
+    ]
+    assert len(opens) == 13
+    assert (opens[0], opens[-1]) == (first, last)
+    assert len(bars["close"]) == len(bars["time"])
+
+
+def row(time, price):
+    return {"t": time, "o": price, "h": price, "l": price, "c": price, "v": 100}
+
+
+def test_alpaca_bars_follow_pages_and_drop_extended_hours(monkeypatch):
+    source = AlpacaSource("key", "secret")
+    pages = [
+        {
+            "bars": {
+                "AAPL": [
+                    row("2024-03-11T12:00:00Z", 1.0),  # pre-market
+                    row("2024-03-11T13:30:00Z", 2.0),
+                ]
+            },
+            "next_page_token": "next",
+        },
+        {
+            "bars": {
+                "AAPL": [row("2024-03-11T19:55:00Z", 3.0)],
+                "MSFT": [row("2024-03-11T20:00:00Z", 4.0)],  # post-market
+            },
+            "next_page_token": None,
+        },
+    ]
+    requested = []
+
+    def get(params):
+        requested.append(dict(params))
+        return pages[len(requested) - 1]
+
+    monkeypatch.setattr(source, "_get", get)
+    start = datetime(2024, 3, 11, tzinfo=timezone.utc)
+    bars = source.bars_many(["AAPL", "MSFT"], "5m", "1d", start=start)
+
+    assert list(bars) == ["AAPL"]
+    assert bars["AAPL"]["close"].tolist() == [2.0, 3.0]
+    assert requested[0]["symbols"] == "AAPL,MSFT"
+    assert requested[0]["timeframe"] == "5Min"
+    assert requested[0]["start"] == "2024-03-11T00:00:00Z"
+    assert "page_token" not in requested[0]
+    assert requested[1]["page_token"] == "next"
+
+
+def test_alpaca_last_price_reads_the_latest_trade(monkeypatch):
+    source = AlpacaSource("key", "secret", feed="sip")
+    requested = []
+
+    def get(params, url):
+        requested.append((url, params))
+        return {"symbol": "AAPL", "trade": {"p": 187.25, "s": 100}}
+
+    monkeypatch.setattr(source, "_get", get)
+
+    assert source.last_price("AAPL") == 187.25
+    assert requested == [
+        (
+            "https://data.alpaca.markets/v2/stocks/AAPL/trades/latest",
+            {"feed": "sip"},
+        )
+    ]
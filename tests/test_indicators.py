@@ -0,0 +1,79 @@
+# Import necessary libraries
+import numpy as np
+import pytest
+import tulipy as ti
+
+from indicators import IndicatorSet, ema_series, rsi_series, stoch_series
+
+EMA_PERIODS = (9, 26, 50)
+RSI_PERIOD = 14
+STOCH_PERIODS = (9, 6, 9)
+
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, 400)))
+    high = close * (1 + np.abs(rng.normal(0, 0.002, 400)))
+    low = close * (1 - np.abs(rng.normal(0, 0.002, 400)))
+    return high, low, close
+
+
+def tail(values, count):
+    """
+    The last count values, tulipy's outputs being aligned to the end.
+    """
+    return np.asarray(values)[len(values) - count :]
+
+
+def test_series_match_tulipy(bars):
+    high, low, close = bars
+
+    for period in EMA_PERIODS:
+        np.testing.assert_allclose(ema_series(close, period), ti.ema(close, period))
+
+    expected = ti.rsi(close, RSI_PERIOD)
+    np.testing.assert_allclose(
+        tail(rsi_series(close, RSI_PERIOD), len(expected)), expected
+    )
+
+    expected_k, expected_d = ti.stoch(high, low, close, *STOCH_PERIODS)
+    stoch_k, stoch_d = stoch_series(high, low, close, *STOCH_PERIODS)
+    np.testing.assert_allclose(tail(stoch_k, len(expected_k)), expected_k)
+    np.testing.assert_allclose(tail(stoch_d, len(expected_d)), expected_d)
+
+
+def test_series_of_many_tickers_match_one_by_one(bars):
+    highs, lows, closes = (np.stack([a, a * 1.01, a[::-1]], axis=1) for a in bars)
+
+    for column in range(3):
+        np.testing.assert_allclose(
+            rsi_series(closes, RSI_PERIOD)[:, column],
+            rsi_series(closes[:, column], RSI_PERIOD),
+        )
+        for many, one in zip(
+            stoch_series(highs, lows, closes, *STOCH_PERIODS),
+            stoch_series(
+                highs[:, column], lows[:, column], closes[:, column], *STOCH_PERIODS
+            ),
+        ):
+            np.testing.assert_allclose(many[:, column], one)
+
+
+def test_streaming_updates_match_tulipy(bars):
+    high, low, close = bars
+    indicators = IndicatorSet(EMA_PERIODS, RSI_PERIOD, STOCH_PERIODS)
+    indicators.warm_up(high[:-1], low[:-1], close[:-1])
+
+    # The bar being built is read without being kept
+    peeked = indicators.peek(high[-1], low[-1], close[-1])
+    values = indicators.update(high[-1], low[-1], close[-1])
+    assert peeked == pytest.approx(values)
+
+    stoch_k, stoch_d = ti.stoch(high, low, close, *STOCH_PERIODS)
+    expected = [ti.ema(close, period)[-1] for period in EMA_PERIODS] + [
+        ti.rsi(close, RSI_PERIOD)[-1],
+        stoch_k[-1],
+        stoch_d[-1],
+    ]
+    assert list(values) == pytest.approx(expected, rel=1e-12)
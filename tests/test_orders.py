@@ -0,0 +1,80 @@
+# Import necessary libraries
+import threading
+import time
+
+import pytest
+
+from orders import LocalTradeUpdates, OrderTracker
+
+
+@pytest.fixture
+def updates():
+    updates = LocalTradeUpdates()
+    tracker = OrderTracker(updates)
+    tracker.start()
+    yield updates, tracker
+    tracker.stop()
+
+
+def wait_in_thread(tracker, order_id, timeout=5):
+    """
+    Start tracker.wait in a thread, the result goes into the returned list.
+    """
+    result = []
+    thread = threading.Thread(
+        target=lambda: result.append(tracker.wait(order_id, timeout))
+    )
+    thread.start()
+    return thread, result
+
+
+@pytest.mark.parametrize("event", ["fill", "canceled", "replaced"])
+def test_final_events_release_waiters(updates, event):
+    updates, tracker = updates
+    tracker.track("order-1", "AAPL")
+    thread, result = wait_in_thread(tracker, "order-1")
+
+    started = time.perf_counter()
+    updates.emit(event, "order-1", "AAPL", filled_qty=10 if event == "fill" else 0)
+    thread.join(1)
+
+    assert result == [event]
+    assert time.perf_counter() - started < 0.5
+
+
+def test_partial_fill_keeps_waiting(updates):
+    updates, tracker = updates
+    thread, result = wait_in_thread(tracker, "order-1", timeout=0.2)
+
+    updates.emit("partial_fill", "order-1", "AAPL", filled_qty=5)
+    thread.join(1)
+
+    assert result == [None]
+    assert tracker.track("order-1", "AAPL").filled_qty == 5
+
+
+def test_callbacks_and_listeners(updates):
+    updates, tracker = updates
+    seen, done = [], []
+    tracker.add_listener(lambda state: seen.append(state.status))
+    state = tracker.track("order-1", "AAPL")
+    state.add_callback(lambda state: done.append(state.status))
+
+    updates.emit("new", "order-1", "AAPL")
+    assert done == []
+
+    updates.emit("fill", "order-1", "AAPL", filled_qty=10, filled_avg_price=101.5)
+    assert seen == ["new", "fill"]
+    assert done == ["fill"]
+    assert state.filled_avg_price == 101.5
+
+    # Added once the order is done, it is called right away
+    state.add_callback(lambda state: done.append("late"))
+    assert done == ["fill", "late"]
+
+
+def test_updates_before_tracking_are_kept(updates):
+    updates, tracker = updates
+    updates.emit("rejected", "order-1", "AAPL")
+
+    assert tracker.wait("order-1", timeout=0) == "rejected"
@@ -0,0 +1,122 @@
+# Import necessary libraries
+import pytest
+
+from resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    RetryPolicy,
+    retry,
+)
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def failing(times, error=ConnectionError):
+    """
+    A call raising the error the given number of times before it succeeds.
+    """
+    calls = []
+
+    def call():
+        calls.append(None)
+        if len(calls) <= times:
+            raise error("down")
+        return "ok"
+
+    return call, calls
+
+
+def test_backoff_waits_grow_and_stay_under_the_cap(monkeypatch):
+    monkeypatch.setattr("random.uniform", lambda low, high: high)
+    policy = RetryPolicy(attempts=6, base_delay=0.5, max_delay=3.0)
+
+    assert [policy.delay(retry) for retry in range(5)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+
+
+def test_transient_failures_are_retried_until_the_attempts_run_out():
+    clock = Clock()
+    call, calls = failing(2)
+    policy = RetryPolicy(attempts=3, base_delay=0.1)
+    assert retry(call, policy, sleep=clock.sleep, clock=clock) == "ok"
+    assert len(calls) == 3
+
+    call, calls = failing(3)
+    with pytest.raises(ConnectionError):
+        retry(call, policy, sleep=clock.sleep, clock=clock)
+    assert len(calls) == 3
+
+    # A refused request is not tried again
+    call, calls = failing(1, ValueError)
+    with pytest.raises(ValueError):
+        retry(call, policy, sleep=clock.sleep, clock=clock)
+    assert len(calls) == 1
+
+
+def test_no_retry_starts_past_the_budget(monkeypatch):
+    monkeypatch.setattr("random.uniform", lambda low, high: high)
+    clock = Clock()
+    call, calls = failing(10)
+    policy = RetryPolicy(attempts=10, base_delay=1.0, budget=4.0)
+
+    with pytest.raises(ConnectionError):
+        retry(call, policy, sleep=clock.sleep, clock=clock)
+    # Waits of 1 and 2 seconds fit in the budget, the next one of 4 does not
+    assert len(calls) == 3 and clock.now == 3.0
+
+
+def test_breaker_opens_lets_one_trial_through_and_closes():
+    clock = Clock()
+    breaker = CircuitBreaker("broker.get_order", failures=2, reset_time=30, clock=clock)
+
+    breaker.failed()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failed()
+    assert breaker.state == "open" and not breaker.allow()
+
+    # A failed trial opens it again for another reset time
+    clock.now = 30
+    assert breaker.allow() and breaker.state == "half-open"
+    assert not breaker.allow()
+    breaker.failed()
+    assert breaker.state == "open" and breaker.retry_in() == 30
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.succeeded()
+    assert breaker.state == "closed" and breaker.failed_calls == 0
+    assert breaker.allow()
+
+
+def test_open_breakers_fail_calls_without_making_them():
+    clock = Clock()
+    resilience = Resilience(
+        RetryPolicy(attempts=1),
+        failures=1,
+        reset_time=10,
+        sleep=clock.sleep,
+        clock=clock,
+    )
+    call, calls = failing(1)
+
+    with pytest.raises(ConnectionError):
+        resilience.call("broker.get_account", call)
+    with pytest.raises(CircuitOpenError):
+        resilience.call("broker.get_account", call)
+    assert len(calls) == 1
+
+    # Other endpoints have breakers of their own
+    assert resilience.call("broker.get_clock", lambda: "ok") == "ok"
+
+    clock.now = 10
+    assert resilience.call("broker.get_account", call) == "ok"
+    assert resilience.breaker("broker.get_account").state == "closed"
@@ -0,0 +1,90 @@
+# Import necessary libraries
+import numpy as np
+
+import PocketTrader
+from ringbuffer import BarRing, BarRings
+
+
+def make_bars(times, close=None):
+    times = np.asarray(times, dtype=np.int64)
+    close = np.asarray(times if close is None else close, dtype=float)
+    return {
+        "time": times,
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": np.ones(len(times)),
+    }
+
+
+def test_wraparound_keeps_the_last_bars_in_order():
+    ring = BarRing(4)
+    ring.extend(make_bars([1, 2, 3]))
+    ring.extend(make_bars([4, 5, 6]))
+    ring.extend(make_bars([7]))
+
+    bars = ring.view()
+    assert bars.time.tolist() == [4, 5, 6, 7]
+    assert bars.close.tolist() == [4.0, 5.0, 6.0, 7.0]
+    assert len(ring) == 4 and ring.last_time() == 7
+    assert ring.view(since=6).time.tolist() == [6, 7]
+
+
+def test_the_bar_being_built_is_replaced():
+    ring = BarRing(4)
+    ring.extend(make_bars([1, 2, 3], [10.0, 20.0, 30.0]))
+    ring.extend(make_bars([3, 4], [31.0, 40.0]))
+
+    bars = ring.view()
+    assert bars.time.tolist() == [1, 2, 3, 4]
+    assert bars.close.tolist() == [10.0, 20.0, 31.0, 40.0]
+
+
+def test_snapshots_do_not_change_when_the_ring_is_extended():
+    ring = BarRing(8)
+    ring.extend(make_bars(range(10)))
+    snapshot = ring.snapshot()
+
+    ring.extend(make_bars(range(10, 18)))
+    assert snapshot.time.tolist() == list(range(2, 10))
+    assert ring.snapshot().time.tolist() == list(range(10, 18))
+
+
+def test_covers_the_period_it_was_loaded_for():
+    ring = BarRing(4)
+    assert not ring.covers(0)
+
+    ring.extend(make_bars([10, 11]), complete_from=5)
+    assert ring.covers(5) and ring.covers(8)
+    assert not ring.covers(4)
+
+    # Tails keep the coverage until older bars are overwritten
+    ring.extend(make_bars([12, 13]))
+    assert ring.covers(5)
+    ring.extend(make_bars([14]))
+    assert not ring.covers(10) and ring.covers(11)
+
+    # A whole period starting after the kept bars leaves a gap
+    ring.extend(make_bars([20, 21]), complete_from=20)
+    assert not ring.covers(11) and ring.covers(20)
+
+
+def test_loads_read_only_the_tail_once_the_period_is_buffered(monkeypatch):
+    rings = BarRings(16)
+    starts = []
+
+    def load_stored_bars(ticker, interval, period, start=None):
+        starts.append(start)
+        return make_bars([t for t in range(100, 112) if t >= start])
+
+    monkeypatch.setattr(PocketTrader, "get_bar_rings", lambda: rings)
+    monkeypatch.setattr(PocketTrader, "load_stored_bars", load_stored_bars)
+    monkeypatch.setattr(PocketTrader, "period_start", lambda period, now: 100)
+
+    first = PocketTrader.load_recent_bars("AAPL", "5m", "1d")
+    second = PocketTrader.load_recent_bars("AAPL", "5m", "1d")
+
+    assert starts == [100, 111]
+    assert first.time.tolist() == second.time.tolist() == list(range(100, 112))
+    assert first.close is not second.close
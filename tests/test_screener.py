@@ -0,0 +1,32 @@
+# Import necessary libraries
+import logging
+
+import pytest
+
+from barstore import resample_bars
+from screener import history_days, screen_bars
+from simbroker import synthetic_bars
+
+
+@pytest.mark.parametrize("interval", ["5m", "30m", "1h"])
+def test_history_days_hold_the_window(interval):
+    # Base bars of 78 regular-session bars a day, the last day still being built
+    days = history_days(64, interval)
+    bars = synthetic_bars("AAPL", days=days - 1)[("AAPL", "5m")]
+
+    assert len(resample_bars(bars, interval)["close"]) >= 64
+
+
+def test_screen_bars_logs_the_skipped_tickers(caplog):
+    bars = {"5m": {}, "30m": {}}
+    for seed, ticker in enumerate(["AAPL", "MSFT", "NVDA"]):
+        days = 6 if ticker != "NVDA" else 4
+        generated = synthetic_bars(ticker, days=days, seed=seed)
+        bars["5m"][ticker] = generated[(ticker, "5m")]
+        bars["30m"][ticker] = generated[(ticker, "30m")]
+
+    with caplog.at_level(logging.INFO):
+        candidates = screen_bars(bars, window=64)
+
+    assert "NVDA" not in [candidate.ticker for candidate in candidates]
+    assert "Skipped 1 of 3 tickers with fewer than 64 bars" in caplog.text
@@ -0,0 +1,51 @@
+# Import necessary libraries
+import numpy as np
+
+from signals import (
+    EMA,
+    RSI,
+    Price,
+    SignalEvaluator,
+    aligned,
+    default_strategy,
+    emas,
+    trend_rules,
+)
+
+
+def test_shared_expressions_get_one_slot():
+    evaluator = SignalEvaluator(default_strategy())
+    nodes = [node for node, _ in evaluator.plan]
+
+    # The trend and the score read the same 30m EMAs
+    assert len({node.key for node in nodes}) == len(nodes) == len(evaluator.slots)
+    assert sum(isinstance(node, EMA) for node in nodes) == 6
+    assert sum(isinstance(node, RSI) for node in nodes) == 1
+    assert evaluator.intervals() == ["30m", "5m"]
+
+    # Inputs come before the nodes reading them
+    for slot, (_, sources) in enumerate(evaluator.plan):
+        assert all(source < slot for source in sources)
+
+    # Expressions written twice are still one node
+    twice = SignalEvaluator(
+        {"a": aligned(*emas()), "b": aligned(*emas()), "c": trend_rules()["long"]}
+    )
+    assert len(set(twice.outputs.values())) == 1
+
+
+def test_known_nodes_skip_the_inputs_only_they_read():
+    rsi = RSI(Price("5m", "close"), 14)
+    fast, slow = EMA(Price("30m", "close"), 9), EMA(Price("30m", "close"), 26)
+    evaluator = SignalEvaluator({"rsi": rsi > 50, "trend": fast > slow})
+
+    # Without the 5m bars, the RSI can only come from the known readings
+    bars = {"30m": {"close": np.linspace(100, 110, 60).reshape(-1, 1)}}
+    result = evaluator.evaluate(bars, known={rsi: np.array([[40.0], [60.0]])})
+    assert result["rsi"].tolist() == [True]
+    assert result["trend"].tolist() == [True]
+
+    # A known EMA still leaves the 30m closes to the other one
+    steps = evaluator._steps(frozenset([evaluator.slots[fast.key]]))
+    assert evaluator.slots[fast.key] not in steps
+    assert evaluator.slots[Price("30m", "close").key] in steps
@@ -0,0 +1,271 @@
+# Import necessary libraries
+import asyncio
+import json
+import types
+
+import pytest
+from alpaca.common.exceptions import APIError
+from alpaca.trading.requests import (
+    LimitOrderRequest,
+    ReplaceOrderRequest,
+    StopLossRequest,
+    TakeProfitRequest,
+)
+
+from checkpoint import CheckpointStore
+from main import cancel_all_orders
+from orders import LocalTradeUpdates, OrderTracker
+from scheduler import TraderPipeline
+from settings import config
+from simbroker import SimulatedBroker, run_session, simulated_trader, synthetic_bars
+
+
+@pytest.fixture
+def brackets(monkeypatch):
+    monkeypatch.setitem(config, "bracketOrders", True)
+
+
+def _unavailable(message):
+    response = types.SimpleNamespace(status_code=503)
+    return APIError(
+        json.dumps({"code": 50300000, "message": message}),
+        types.SimpleNamespace(response=response, request=None),
+    )
+
+
+def order_types(broker):
+    return [(order.type, order.status) for order in broker.orders.values()]
+
+
+def bracket_order(broker, limit_price, stop_price, take_profit):
+    return broker.submit_order(
+        LimitOrderRequest(
+            symbol="SIM",
+            qty=10,
+            side="buy",
+            type="limit",
+            time_in_force="gtc",
+            limit_price=limit_price,
+            order_class="bracket",
+            stop_loss=StopLossRequest(stop_price=stop_price),
+            take_profit=TakeProfitRequest(limit_price=take_profit),
+        )
+    )
+
+
+@pytest.mark.parametrize("bracket_orders", [False, True])
+@pytest.mark.parametrize("seed", range(4))
+def test_sessions_enter_and_exit(monkeypatch, seed, bracket_orders):
+    monkeypatch.setitem(config, "bracketOrders", bracket_orders)
+    result, broker = run_session(
+        synthetic_bars("SIM", seed=seed), "SIM", slippage=0.0005, latency=1
+    )
+
+    assert result is True
+    (_, _, bought, _), (_, _, sold, _) = broker.fills
+    assert bought == -sold == 2
+    assert broker.positions == {}
+    assert broker.get_orders() == []
+
+
+def test_sessions_without_brackets_exit_with_a_market_order(monkeypatch):
+    monkeypatch.setitem(config, "bracketOrders", False)
+    result, broker = run_session(synthetic_bars("SIM", seed=0), "SIM")
+
+    assert result is True
+    assert order_types(broker) == [("limit", "filled"), ("market", "filled")]
+
+
+@pytest.mark.parametrize(
+    "seed, orders",
+    [
+        # Take profit reached before the legs were moved to the entry price
+        (4, [("limit", "filled"), ("stop", "canceled"), ("limit", "filled")]),
+        # Take profit reached after the legs were moved
+        (
+            11,
+            [
+                ("limit", "filled"),
+                ("stop", "replaced"),
+                ("limit", "replaced"),
+                ("stop", "canceled"),
+                ("limit", "filled"),
+            ],
+        ),
+    ],
+)
+def test_bracket_legs_exit_at_the_broker(monkeypatch, brackets, seed, orders):
+    monkeypatch.setitem(config, "stopLossMargin", 0.003)
+    monkeypatch.setitem(config, "takeProfitMargin", 0.003)
+    monkeypatch.setitem(config, "maxVar", 0.001)
+    result, broker = run_session(
+        synthetic_bars("SIM", seed=seed), "SIM", slippage=0.0005, latency=1
+    )
+
+    # No market order, the take profit leg closed the position
+    assert result is True
+    assert order_types(broker) == orders
+    assert broker.positions == {}
+
+    entry, exit = broker.fills
+    take_profit = broker.orders[list(broker.orders)[-1]].limit_price
+    # At the limit, or better when the bar opens past it
+    assert exit[2] == -entry[2] and exit[3] >= take_profit
+    if seed == 11:
+        assert take_profit == round(entry[3] * 1.003, 2)
+
+
+def test_replace_and_cancel_legs():
+    broker = SimulatedBroker(synthetic_bars("SIM"))
+    price = broker.last_price("SIM")
+    entry = bracket_order(broker, price * 1.01, price * 0.9, price * 1.1)
+    stop, take_profit = entry.legs
+    assert (stop.status, take_profit.status) == ("held", "held")
+
+    # Legs are listed as orders of their own, like Alpaca does
+    assert broker.get_orders() == [entry, stop, take_profit]
+
+    broker.sleep(600)
+    assert entry.status == "filled"
+    assert (stop.status, take_profit.status) == ("new", "new")
+
+    moved = broker.replace_order_by_id(stop.id, ReplaceOrderRequest(stop_price=90.0))
+    assert stop.status == "replaced"
+    assert moved.stop_price == 90.0 and moved.parent_id == entry.id
+    assert entry.legs == [moved, take_profit]
+
+    # One leg cancelled, the other goes with it
+    broker.cancel_order_by_id(moved.id)
+    assert (moved.status, take_profit.status) == ("canceled", "canceled")
+    assert broker.get_orders() == []
+
+
+def test_restart_keeps_the_orders_of_saved_trades(brackets, tmp_path):
+    broker = SimulatedBroker(synthetic_bars("SIM"))
+    trader = simulated_trader(broker, "SIM")
+    trader.submit_order("limit", "long", "SIM", 10, broker.last_price("SIM"))
+    broker.sleep(600)
+    other = bracket_order(broker, 1.0, 0.5, 2.0)
+
+    checkpoints = CheckpointStore(str(tmp_path))
+    checkpoints.save(
+        "SIM", "in position", order_id=trader.order_id, exit_legs=trader.exit_legs
+    )
+    cancel_all_orders(broker, keep=checkpoints.order_ids())
+
+    # The exits of the saved trade stay at the broker, the rest is cancelled
+    assert {order.id for order in broker.get_orders()} == set(trader.exit_legs.values())
+    assert other.status == "canceled"
+
+
+@pytest.mark.parametrize("trend", ["long", "short"])
+def test_bracket_legs_are_set_past_the_limit_price(brackets, trend):
+    broker = SimulatedBroker(synthetic_bars("SIM"))
+    trader = simulated_trader(broker, "SIM")
+    price = broker.last_price("SIM")
+    assert trader.submit_order("limit", trend, "SIM", 10, price)
+
+    entry = broker.get_order_by_id(trader.order_id)
+    stop, take_profit = entry.legs
+    # Alpaca wants the take profit at least a cent past the entry price
+    sign = 1 if trend == "long" else -1
+    assert sign * (take_profit.limit_price - entry.limit_price) >= 0.01
+    assert sign * (entry.limit_price - stop.stop_price) >= 0.01
+    assert take_profit.limit_price == round(
+        entry.limit_price * (1 + sign * config["takeProfitMargin"]), 2
+    )
+
+
+def test_position_checks_fail_while_the_broker_is_unreachable():
+    broker = SimulatedBroker(synthetic_bars("SIM"))
+    trader = simulated_trader(broker, "SIM")
+    assert trader.get_open_positions("SIM") is False
+
+    def get_open_position(ticker):
+        raise _unavailable("Service unavailable")
+
+    broker.get_open_position = get_open_position
+    with pytest.raises(APIError):
+        trader.get_open_positions("MSFT")
+
+
+def test_exits_are_confirmed_once_the_broker_answers(monkeypatch):
+    monkeypatch.setitem(config, "bracketOrders", False)
+    broker = SimulatedBroker(synthetic_bars("SIM", seed=0))
+    get_open_position = broker.get_open_position
+    failures = []
+
+    def flaky(ticker):
+        # The broker goes down right after the exit order is sent
+        if len(broker.fills) > 1 and len(failures) < 3:
+            failures.append(ticker)
+            raise _unavailable("Service unavailable")
+        return get_open_position(ticker)
+
+    broker.get_open_position = flaky
+    trader = simulated_trader(broker, "SIM")
+    trader.positions.ttl = 0
+
+    assert trader.run("SIM") is True
+    assert len(failures) == 3
+    assert broker.positions == {}
+
+
+def test_entries_filled_while_being_cancelled_are_kept(brackets):
+    broker = SimulatedBroker(synthetic_bars("SIM"))
+    trader = simulated_trader(broker, "SIM")
+    price = broker.last_price("SIM")
+    # Too far below the price to fill while it is waited for
+    assert trader.submit_order("limit", "long", "SIM", 10, round(price * 0.5, 2))
+    entry = broker.get_order_by_id(trader.order_id)
+    cancel_order_by_id = broker.cancel_order_by_id
+
+    def fill_first(order_id):
+        broker._fill(entry, entry.limit_price)
+        cancel_order_by_id(order_id)
+
+    broker.cancel_order_by_id = fill_first
+
+    # The position and its exit legs are handed over to position mode
+    assert asyncio.run(TraderPipeline(trader).wait_entry()) is True
+    assert trader.get_open_positions("SIM")
+    assert [leg.status for leg in entry.legs] == ["new", "new"]
+
+
+def test_entry_prices_are_live_quotes():
+    broker = SimulatedBroker(synthetic_bars("SIM"))
+    trader = simulated_trader(broker, "SIM")
+    # The cached bars stop at the last closed bar
+    bars = trader.load_historical_data("SIM", interval="5m", period="1d")
+
+    trader.last_price = lambda ticker: 123.456
+    assert trader.get_last_close("SIM") == 123.46
+
+    # Streamed prices come first, the bars only without any quote
+    trader.price_monitor = types.SimpleNamespace(last_price=lambda ticker: 120.0)
+    assert trader.get_last_close("SIM") == 120.0
+    trader.price_monitor = None
+    trader.last_price = lambda ticker: None
+    assert trader.get_last_close("SIM") == round(float(bars.close[-1]), 2)
+
+
+def test_orders_of_past_trades_are_forgotten(brackets):
+    updates = LocalTradeUpdates()
+    tracker = OrderTracker(updates)
+    broker = SimulatedBroker(synthetic_bars("SIM"), trade_updates=updates)
+    trader = simulated_trader(broker, "SIM")
+    trader.orders = tracker
+
+    assert trader.submit_order("limit", "long", "SIM", 10, broker.last_price("SIM"))
+    broker.sleep(600)
+    assert tracker.wait(trader.order_id, 0) == "fill"
+    assert trader.cancel_exit_legs("SIM")
+    assert trader.submit_order(
+        "market", "long", "SIM", 10, broker.last_price("SIM"), True
+    )
+    broker.sleep(600)
+    assert len(tracker._orders) == 4
+
+    # Forgotten when the next trade starts
+    trader.forget_orders()
+    assert tracker._orders == {} and trader.trade_orders == []
@@ -0,0 +1,62 @@
+# Import necessary libraries
+import pytest
+
+from stream import LocalTransport, PriceMonitor
+
+
+@pytest.fixture
+def transport():
+    transport = LocalTransport()
+    monitor = PriceMonitor(transport, ["AAPL", "MSFT"])
+    monitor.start()
+    yield transport, monitor
+    monitor.stop()
+
+
+@pytest.mark.parametrize(
+    "trend, prices, level",
+    [
+        ("long", [100.0, 99.0, 94.9, 94.0], 94.9),  # stop loss
+        ("long", [100.0, 104.0, 105.2, 106.0], 105.2),  # take profit
+        ("short", [100.0, 101.0, 105.1, 106.0], 105.1),  # stop loss
+        ("short", [100.0, 96.0, 94.8, 94.0], 94.8),  # take profit
+    ],
+)
+def test_watch_fires_once_when_a_level_is_crossed(transport, trend, prices, level):
+    transport, monitor = transport
+    stop_loss, take_profit = (95.0, 105.0) if trend == "long" else (105.0, 95.0)
+    watch = monitor.watch("AAPL", trend, stop_loss, take_profit)
+    fired = []
+    watch.add_callback(lambda watch: fired.append(watch.price))
+
+    for price in prices:
+        transport.publish("AAPL", price)
+
+    assert watch.wait(0)
+    assert fired == [level]
+    assert watch.price == level
+    assert monitor.last_price("AAPL") == prices[-1]
+
+
+def test_prices_between_the_levels_and_of_other_symbols_do_not_fire(transport):
+    transport, monitor = transport
+    watch = monitor.watch("AAPL", "long", 95.0, 105.0)
+
+    for price in (100.0, 96.0, 104.0):
+        transport.publish("AAPL", price)
+    transport.publish("MSFT", 50.0)
+    transport.publish("NVDA", 200.0)  # not subscribed
+
+    assert not watch.wait(0)
+    assert monitor.last_price("MSFT") == 50.0
+    assert monitor.last_price("NVDA") is None
+
+
+def test_unwatched_positions_are_not_checked(transport):
+    transport, monitor = transport
+    watch = monitor.watch("AAPL", "long", 95.0, 105.0)
+    monitor.unwatch("AAPL")
+
+    transport.publish("AAPL", 90.0)
+
+    assert not watch.wait(0)